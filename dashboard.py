@@ -1,7 +1,8 @@
 import ibis
 import plotly.express as px
 
-from shiny import reactive, render
+from shiny import reactive, render, req
+from shiny.session import get_current_session
 from shinyswatch import theme
 from shinywidgets import render_plotly
 from shiny.express import input, ui
@@ -21,11 +22,33 @@ from ibis_analytics.tables import (
     docs_t,
     zulip_members_t,
     zulip_messages_t,
+    stars_daily_t,
+    docs_daily_t,
+    downloads_daily_t,
+    manifest,
+    cached,
+    warm_up,
+)
+from ibis_analytics.config import (
+    GH_REPOS,
+    PYPI_PACKAGES,
+    GH_PRS_TABLE,
+    GH_FORKS_TABLE,
+    GH_STARS_TABLE,
+    GH_ISSUES_TABLE,
+    GH_COMMITS_TABLE,
+    DOCS_TABLE,
+    ZULIP_MEMBERS_TABLE,
+    ZULIP_MESSAGES_TABLE,
+    PYPI_DOWNLOADS_TABLE,
 )
-from ibis_analytics.config import GH_REPOS, PYPI_PACKAGES
 
 gh_repos = [gh_repo.split("/")[1] for gh_repo in GH_REPOS]
 
+# tables load on first use; prefetch the rest once the first page is out;
+# assigned so express doesn't render the returned callback
+_ = get_current_session().on_flushed(warm_up, once=True)
+
 # dark themes
 px.defaults.template = "plotly_dark"
 ui.page_opts(theme=theme.darkly)
@@ -79,35 +102,50 @@ with ui.nav_panel("GitHub metrics"):
 
             @render.express
             def total_stars():
-                f"{metrics.total(stars_data()):,}"
+                val = metrics.total_in_range(
+                    stars_data(), repo_months(GH_STARS_TABLE), *date_range()
+                )
+                f"{val:,}"
 
         with ui.value_box():
             "Total pulls"
 
             @render.express
             def total_pulls():
-                f"{metrics.total(pulls_data()):,}"
+                val = metrics.total_in_range(
+                    pulls_data(), repo_months(GH_PRS_TABLE), *date_range()
+                )
+                f"{val:,}"
 
         with ui.value_box():
             "Total issues"
 
             @render.express
             def total_issues():
-                f"{metrics.total(issues_data()):,}"
+                val = metrics.total_in_range(
+                    issues_data(), repo_months(GH_ISSUES_TABLE), *date_range()
+                )
+                f"{val:,}"
 
         with ui.value_box():
             "Total forks"
 
             @render.express
             def total_forks():
-                f"{metrics.total(forks_data()):,}"
+                val = metrics.total_in_range(
+                    forks_data(), repo_months(GH_FORKS_TABLE), *date_range()
+                )
+                f"{val:,}"
 
         with ui.value_box():
             "Total commits"
 
             @render.express
             def total_commits():
-                f"{metrics.total(commits_data()):,}"
+                val = metrics.total_in_range(
+                    commits_data(), repo_months(GH_COMMITS_TABLE), *date_range()
+                )
+                f"{val:,}"
 
     with ui.layout_columns():
         with ui.card(full_screen=True):
@@ -127,10 +165,10 @@ with ui.nav_panel("GitHub metrics"):
                 start_date, end_date = input.date_range()
                 repo_name = input.repo_name()
 
-                t = stars_t
+                t = stars_daily_t
                 t = t.filter(t["repo_name"] == repo_name)
                 t = metrics.stars_rolling(t, days=28)
-                t = t.filter(t["timestamp"] >= start_date, t["timestamp"] <= end_date)
+                t = metrics.in_range(t, "timestamp", start_date, end_date)
 
                 c = plots.line(
                     t,
@@ -163,11 +201,8 @@ with ui.nav_panel("GitHub metrics"):
             truncate_by = input.truncate_by_stars()
             group_by = input.group_by_stars()
 
-            t = stars_data().order_by("starred_at")
-            t = t.mutate(starred_at=t["starred_at"].truncate(truncate_by))
-            t = t.group_by(["starred_at", group_by] if group_by else "starred_at").agg(
-                stars=ibis._.count()
-            )
+            t = stars_daily_data()
+            t = metrics.counts(t, "starred_at", "stars", unit=truncate_by, by=group_by)
             # this is for plotly legend display reasons
             if group_by == "company":
                 t = t.mutate(company=t["company"][:16])
@@ -198,7 +233,9 @@ with ui.nav_panel("PyPI metrics"):
 
             @render.express
             def total_downloads():
-                val = downloads_data()["count"].sum().to_pyarrow().as_py()
+                t = downloads_daily_data()
+                t = cached(t.agg(downloads=t["downloads"].sum()))
+                val = t["downloads"].to_pyarrow()[0].as_py() or 0
                 f"{val:,}"
 
         with ui.value_box(full_screen=True):
@@ -206,7 +243,10 @@ with ui.nav_panel("PyPI metrics"):
 
             @render.express
             def total_versions():
-                val = metrics.get_categories(downloads_data(), "version")
+                val = metrics.get_categories(
+                    cached(downloads_daily_data().select("version").distinct()),
+                    "version",
+                )
                 f"{len(val):,}"
 
     with ui.card(full_screen=True):
@@ -214,7 +254,7 @@ with ui.nav_panel("PyPI metrics"):
 
         @render.data_frame
         def downloads_by_version():
-            t = downloads_data()
+            t = downloads_daily_data()
 
             t = (
                 t.mutate(
@@ -222,11 +262,11 @@ with ui.nav_panel("PyPI metrics"):
                 )
                 .filter(~ibis._["version"].startswith("v"))
                 .group_by("version")
-                .agg(downloads=ibis._["count"].sum())
+                .agg(downloads=ibis._["downloads"].sum())
                 .order_by(ibis.desc("downloads"))
             )
 
-            return render.DataGrid(t.to_polars())
+            return render.DataGrid(cached(t).to_polars())
 
     with ui.layout_columns():
         with ui.card(full_screen=True):
@@ -236,14 +276,14 @@ with ui.nav_panel("PyPI metrics"):
             def downloads_roll():
                 package_name = input.package_name()
 
-                t = downloads_t
+                t = downloads_daily_t
                 t = t.filter(t["project"] == package_name)
                 min_date, max_date = input.date_range()
 
                 t = metrics.downloads_rolling(t, days=28)
-                t = t.filter(
-                    t["timestamp"] >= min_date, t["timestamp"] <= max_date
-                ).order_by("timestamp")
+                t = metrics.in_range(t, "timestamp", min_date, max_date)
+                t = t.order_by("timestamp")
+                t = cached(t)
 
                 c = px.line(
                     t,
@@ -273,15 +313,15 @@ with ui.nav_panel("PyPI metrics"):
                 version_style = input.version_style()
                 min_date, max_date = input.date_range()
 
-                t = downloads_t
+                t = downloads_daily_t
                 t = t.filter(t["project"] == package_name)
 
                 t = metrics.downloads_rolling_by_version(
                     t, version_style=version_style, days=28
                 )
-                t = t.filter(
-                    t["timestamp"] >= min_date, t["timestamp"] <= max_date
-                ).order_by("timestamp")
+                t = metrics.in_range(t, "timestamp", min_date, max_date)
+                t = t.order_by("timestamp")
+                t = cached(t)
 
                 c = px.line(
                     t,
@@ -320,14 +360,16 @@ with ui.nav_panel("PyPI metrics"):
         def downloads_flex():
             group_by = input.group_by_downloads()
 
-            t = downloads_data()
+            # the daily rollup is by version; other groups need the records
+            if group_by in [None, "version"]:
+                t = downloads_daily_data()
+            else:
+                t = downloads_data()
             t = t.mutate(timestamp=t["date"].cast("timestamp"))
             t = t.filter(~t["version"].startswith("v"))
             t = t.mutate(version=t["version"].split(".")[0])
-            t = t.group_by(["timestamp", group_by] if group_by else "timestamp").agg(
-                downloads=ibis._["count"].sum()
-            )
-            t = t.order_by("timestamp", ibis.desc("downloads"))
+            t = metrics.counts(t, "timestamp", "downloads", by=group_by, column="count")
+            t = cached(t.order_by("timestamp", ibis.desc("downloads")))
 
             c = px.bar(
                 t,
@@ -359,7 +401,7 @@ with ui.nav_panel("Docs metrics"):
 
             @render.express
             def total_docs():
-                val = docs_t.count().to_pyarrow().as_py()
+                val = metrics.total(docs_t, manifest().get(DOCS_TABLE))
                 f"{val:,}"
 
     with ui.layout_columns():
@@ -368,13 +410,12 @@ with ui.nav_panel("Docs metrics"):
 
             @render_plotly
             def docs_roll():
-                t = docs_t
+                t = docs_daily_t
                 min_date, max_date = input.date_range()
 
                 t = metrics.docs_rolling(t, days=28)
-                t = t.filter(
-                    t["timestamp"] >= min_date, t["timestamp"] <= max_date
-                ).order_by("timestamp")
+                t = metrics.in_range(t, "timestamp", min_date, max_date)
+                t = t.order_by("timestamp")
 
                 c = px.line(
                     t,
@@ -389,13 +430,12 @@ with ui.nav_panel("Docs metrics"):
 
             @render_plotly
             def docs_by_path_roll():
-                t = docs_t
+                t = docs_daily_t
                 min_date, max_date = input.date_range()
 
                 t = metrics.docs_rolling_by_path(t, days=28)
-                t = t.filter(
-                    t["timestamp"] >= min_date, t["timestamp"] <= max_date
-                ).order_by("timestamp")
+                t = metrics.in_range(t, "timestamp", min_date, max_date)
+                t = t.order_by("timestamp")
 
                 c = px.line(
                     t,
@@ -438,11 +478,12 @@ with ui.nav_panel("Docs metrics"):
             group_by = input.group_by_docs()
             truncate_to = input.truncate_to_docs()
 
-            t = docs_data()
-            t = t.mutate(timestamp=t["timestamp"].truncate(truncate_to))
-            t = t.group_by(["timestamp", group_by] if group_by else "timestamp").agg(
-                count=ibis._.count()
-            )
+            # the daily rollup is by path; other groups need the records
+            if group_by in [None, "path"]:
+                t = docs_daily_data().rename(count="docs")
+            else:
+                t = docs_data()
+            t = metrics.counts(t, "timestamp", "count", unit=truncate_to, by=group_by)
             t = t.order_by("timestamp", ibis.desc("count"))
 
             if group_by in ["path", "referrer"]:
@@ -465,25 +506,27 @@ with ui.nav_panel("Docs metrics"):
         "Referrer by path"
 
         with ui.layout_columns():
-            paths = (
-                docs_t.group_by("path")
-                .agg(count=ibis._.count())
-                .mutate(rank=ibis.row_number().over(order_by=ibis.desc("count")))[
-                    "path"
-                ]
-                .to_pyarrow()
-                .to_pylist()
-            )
-            ui.input_select(
-                "docs_path",
-                "Doc page:",
-                paths,
-                selected=paths[0],
-            )
+            # listed when the card is first shown, not while building the page
+            @render.ui
+            def docs_path_select():
+                paths = (
+                    docs_daily_t.group_by("path")
+                    .agg(count=ibis._["docs"].sum())
+                    .order_by(ibis.desc("count"))["path"]
+                    .to_pyarrow()
+                    .to_pylist()
+                )
+
+                return ui.input_select(
+                    "docs_path",
+                    "Doc page:",
+                    paths,
+                    selected=paths[0] if paths else None,
+                )
 
         @render.data_frame
         def docs_referrer_table():
-            path = input.docs_path()
+            path = req(input.docs_path())
 
             t = docs_data()
             t = t.filter(t["path"] == path)
@@ -500,7 +543,9 @@ with ui.nav_panel("Zulip metrics"):
 
             @render.express
             def total_messages():
-                val = zulip_messages_t.count().to_pyarrow().as_py()
+                val = metrics.total(
+                    zulip_messages_t, manifest().get(ZULIP_MESSAGES_TABLE)
+                )
                 f"{val:,}"
 
         with ui.value_box(full_screen=True):
@@ -508,7 +553,9 @@ with ui.nav_panel("Zulip metrics"):
 
             @render.express
             def total_members():
-                val = zulip_members_t.count().to_pyarrow().as_py()
+                val = metrics.total(
+                    zulip_members_t, manifest().get(ZULIP_MEMBERS_TABLE)
+                )
                 f"{val:,}"
 
     with ui.card(full_screen=True):
@@ -548,14 +595,34 @@ def date_range():
     return start_date, end_date
 
 
+def repo_months(table_name):
+    # monthly row counts of the selected repo from the catalog manifest
+    if table_name not in manifest():
+        return None
+
+    repo = manifest()[table_name]["repos"].get(input.repo_name(), {})
+
+    return repo.get("months", {})
+
+
 @reactive.calc
 def stars_data(stars_t=stars_t):
     start_date, end_date = input.date_range()
     repo_name = input.repo_name()
 
-    t = stars_t.filter(
-        stars_t["starred_at"] >= start_date, stars_t["starred_at"] <= end_date
-    ).filter(stars_t["repo_name"] == repo_name)
+    t = stars_t.filter(stars_t["repo_name"] == repo_name)
+    t = metrics.in_range(t, "starred_at", start_date, end_date)
+
+    return t
+
+
+@reactive.calc
+def stars_daily_data(stars_daily_t=stars_daily_t):
+    start_date, end_date = input.date_range()
+    repo_name = input.repo_name()
+
+    t = stars_daily_t.filter(stars_daily_t["repo_name"] == repo_name)
+    t = metrics.in_range(t, "starred_at", start_date, end_date)
 
     return t
 
@@ -565,9 +632,8 @@ def pulls_data(pulls_t=pulls_t):
     start_date, end_date = input.date_range()
     repo_name = input.repo_name()
 
-    t = pulls_t.filter(
-        pulls_t["created_at"] >= start_date, pulls_t["created_at"] <= end_date
-    ).filter(pulls_t["repo_name"] == repo_name)
+    t = pulls_t.filter(pulls_t["repo_name"] == repo_name)
+    t = metrics.in_range(t, "created_at", start_date, end_date)
 
     return t
 
@@ -577,9 +643,8 @@ def forks_data(forks_t=forks_t):
     start_date, end_date = input.date_range()
     repo_name = input.repo_name()
 
-    t = forks_t.filter(
-        forks_t["created_at"] >= start_date, forks_t["created_at"] <= end_date
-    ).filter(forks_t["repo_name"] == repo_name)
+    t = forks_t.filter(forks_t["repo_name"] == repo_name)
+    t = metrics.in_range(t, "created_at", start_date, end_date)
 
     return t
 
@@ -590,9 +655,7 @@ def downloads_data(downloads_t=downloads_t):
     package_name = input.package_name()
 
     t = (
-        downloads_t.filter(
-            downloads_t["date"] >= start_date, downloads_t["date"] <= end_date
-        )
+        metrics.in_range(downloads_t, "date", start_date, end_date)
         .filter(downloads_t["project"] == package_name)
         .mutate(system=ibis.ifelse(ibis._["system"] == "", "unknown", ibis._["system"]))
     )
@@ -600,13 +663,31 @@ def downloads_data(downloads_t=downloads_t):
     return t
 
 
+@reactive.calc
+def downloads_daily_data(downloads_daily_t=downloads_daily_t):
+    start_date, end_date = input.date_range()
+    package_name = input.package_name()
+
+    t = downloads_daily_t.filter(downloads_daily_t["project"] == package_name)
+    t = metrics.in_range(t, "date", start_date, end_date)
+
+    return t
+
+
 @reactive.calc
 def docs_data(docs_t=docs_t):
     start_date, end_date = input.date_range()
 
-    t = docs_t.filter(
-        docs_t["timestamp"] >= start_date, docs_t["timestamp"] <= end_date
-    )
+    t = metrics.in_range(docs_t, "timestamp", start_date, end_date)
+
+    return t
+
+
+@reactive.calc
+def docs_daily_data(docs_daily_t=docs_daily_t):
+    start_date, end_date = input.date_range()
+
+    t = metrics.in_range(docs_daily_t, "timestamp", start_date, end_date)
 
     return t
 
@@ -616,9 +697,8 @@ def issues_data(issues_t=issues_t):
     start_date, end_date = input.date_range()
     repo_name = input.repo_name()
 
-    t = issues_t.filter(
-        issues_t["created_at"] >= start_date, issues_t["created_at"] <= end_date
-    ).filter(issues_t["repo_name"] == repo_name)
+    t = issues_t.filter(issues_t["repo_name"] == repo_name)
+    t = metrics.in_range(t, "created_at", start_date, end_date)
 
     return t
 
@@ -628,10 +708,8 @@ def commits_data(commits_t=commits_t):
     start_date, end_date = input.date_range()
     repo_name = input.repo_name()
 
-    t = commits_t.filter(
-        commits_t["committed_date"] >= start_date,
-        commits_t["committed_date"] <= end_date,
-    ).filter(commits_t["repo_name"] == repo_name)
+    t = commits_t.filter(commits_t["repo_name"] == repo_name)
+    t = metrics.in_range(t, "committed_date", start_date, end_date)
 
     return t
 
@@ -640,10 +718,7 @@ def commits_data(commits_t=commits_t):
 def zulip_messages_data(zulip_messages_t=zulip_messages_t):
     start_date, end_date = input.date_range()
 
-    t = zulip_messages_t.filter(
-        zulip_messages_t["timestamp"] >= start_date,
-        zulip_messages_t["timestamp"] <= end_date,
-    )
+    t = metrics.in_range(zulip_messages_t, "timestamp", start_date, end_date)
 
     return t
 
@@ -652,10 +727,7 @@ def zulip_messages_data(zulip_messages_t=zulip_messages_t):
 def zulip_members_data(zulip_members_t=zulip_members_t):
     start_date, end_date = input.date_range()
 
-    t = zulip_members_t.filter(
-        zulip_members_t["date_joined"].cast("date") >= start_date,
-        zulip_members_t["date_joined"].cast("date") <= end_date,
-    )
+    t = metrics.in_range(zulip_members_t, "date_joined", start_date, end_date)
 
     return t
 
@@ -715,19 +787,32 @@ def _():
 @reactive.effect
 @reactive.event(input.last_all)
 def _():
-    # TODO: pretty hacky
+    # the earliest timestamps of the lake tables are in the catalog manifest
     min_all_tables = [
-        (col, t[col].cast("timestamp").min().to_pyarrow().as_py())
-        for t in [stars_t, pulls_t, forks_t, issues_t, commits_t, downloads_t]
-        for col in t.columns
-        if (
-            str(t[col].type()).startswith("timestamp")
-            or str(t[col].type()).startswith("date")
-        )
+        datetime.fromisoformat(col["min"])
+        for table_name in [
+            GH_STARS_TABLE,
+            GH_PRS_TABLE,
+            GH_FORKS_TABLE,
+            GH_ISSUES_TABLE,
+            GH_COMMITS_TABLE,
+            PYPI_DOWNLOADS_TABLE,
+        ]
+        for col_name, col in manifest().get(table_name, {}).get("columns", {}).items()
+        if manifest()[table_name]["schema"][col_name].startswith(("timestamp", "date"))
         # this in particular should be cleaned up in the DAG
-        and "created_at" not in col
+        and "created_at" not in col_name
+        and col["min"] is not None
     ]
-    min_all_tables = min([x[1] for x in min_all_tables]) - timedelta(days=1)
+    # downloads not yet in the lake are queried from ClickHouse
+    if PYPI_DOWNLOADS_TABLE not in manifest():
+        t = cached(downloads_t.agg(date=downloads_t["date"].min()))
+        min_all_tables.append(
+            datetime.combine(t["date"].to_pyarrow()[0].as_py(), datetime.min.time())
+        )
+    min_all_tables = min(ts.replace(tzinfo=None) for ts in min_all_tables) - timedelta(
+        days=1
+    )
     max_now = datetime.now() + timedelta(days=1)
 
     ui.update_date_range(
@@ -0,0 +1,191 @@
+# imports
+import os
+import ibis
+import time
+import tempfile
+import statistics
+
+import pyarrow.compute as pc
+
+from datetime import timedelta
+from deltalake import DeltaTable
+
+import ibis_analytics.metrics as metrics
+
+from ibis_analytics.cache import DiskCache, mirror_delta_table
+from ibis_analytics.catalog import table_layout, write_delta
+from ibis_analytics.config import (
+    ROLLUPS,
+    GH_STARS_TABLE,
+    TABLE_PARTITIONS,
+    DATA_QUALITY_CHECKS,
+)
+
+# candidate layouts, as changes to a table's configured layout; "sorted"
+# layouts cluster records by the table's timestamp
+CANDIDATE_LAYOUTS = {
+    "current": {},
+    "uncompressed": {"compression": None},
+    "zstd": {"compression": "zstd", "compression_level": 3},
+    "zstd-9": {"compression": "zstd", "compression_level": 9},
+    "lz4": {"compression": "lz4_raw"},
+    "no-dictionary": {"dictionary": False},
+    "small-row-groups": {"row_group_size": 16 * 1024},
+    "sorted": {"sort_by": "timestamp"},
+    "zstd-sorted": {
+        "compression": "zstd",
+        "compression_level": 3,
+        "sort_by": "timestamp",
+    },
+}
+
+
+# functions
+def timestamp_column(table_name: str) -> str:
+    """Return the timestamp the dashboard filters and plots a table by, if any."""
+
+    # rollups keep their table's timestamp column, truncated to days
+    if table_name in ROLLUPS:
+        return ROLLUPS[table_name][1]
+
+    timestamps = DATA_QUALITY_CHECKS.get(table_name, {}).get("timestamps")
+    return timestamps[0] if timestamps else None
+
+
+def candidate_layout(table_name: str, name: str) -> dict:
+    """Apply a candidate's changes to a table's configured layout."""
+
+    layout = {**table_layout(table_name), **CANDIDATE_LAYOUTS[name]}
+    if layout["sort_by"] == "timestamp":
+        layout["sort_by"] = [timestamp_column(table_name)]
+
+    return layout
+
+
+def query_mix(t: ibis.Table, table_name: str, repo_name=None, end=None) -> dict:
+    """
+    Build the dashboard's queries against a table.
+
+    Like the dashboard, queries filter partitioned tables to one repo and
+    select the last 28 days or all data, as of `end`. Returns callables that
+    run each query to completion.
+    """
+
+    ts = timestamp_column(table_name)
+    if repo_name is not None:
+        t = t.filter(t["repo_name"] == repo_name)
+    recent = t.filter(t[ts] >= end - timedelta(days=28), t[ts] <= end)
+
+    queries = {
+        # value boxes
+        "total_28d": lambda: metrics.total(recent),
+        # line plots
+        "line_28d": lambda: recent.order_by(ts).to_pyarrow(),
+        "line_all": lambda: t.order_by(ts).to_pyarrow(),
+        # rolling plots
+        "daily_all": lambda: (
+            t.group_by(day=t[ts].cast("timestamp").truncate("D"))
+            .agg(n=ibis._.count())
+            .to_pyarrow()
+        ),
+    }
+    if table_name == GH_STARS_TABLE:
+        queries["rolling_all"] = lambda: metrics.stars_rolling(t).to_pyarrow()
+
+    return queries
+
+
+def file_size(dt: DeltaTable) -> int:
+    """Sum the sizes of a Delta table's current data files."""
+
+    return sum(dt.get_add_actions().column("size_bytes").to_pylist())
+
+
+def bench_layout(
+    data, table_name: str, layout: dict, target: str = "file", repeat: int = 3
+) -> dict:
+    """
+    Write a table with a layout and time the dashboard's queries against it.
+
+    The table is written to a temporary directory. With the "memory" target
+    it is then copied into an in-memory fsspec filesystem, standing in for
+    GCS, and read back through the disk cache like the dashboard does in
+    cloud mode. Returns the file size, write time, fetch time and each
+    query's median latency in seconds.
+    """
+
+    import fsspec
+
+    ts = timestamp_column(table_name)
+    partition_by = TABLE_PARTITIONS.get(table_name)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        table_uri = os.path.join(tmp, f"{table_name}.delta")
+        t = ibis.memtable(data)
+
+        start = time.perf_counter()
+        write_delta(t, table_uri, partition_by=partition_by, layout=layout)
+        result = {
+            "size": file_size(DeltaTable(table_uri)),
+            "write": time.perf_counter() - start,
+        }
+
+        if target == "memory":
+            fs = fsspec.filesystem("memory")
+            remote_path = f"/bench/{table_name}.delta"
+            fs.put(table_uri, remote_path, recursive=True)
+
+            # a cold read fetches every file into an empty cache
+            start = time.perf_counter()
+            cache = DiskCache(fs, os.path.join(tmp, "cache"))
+            table_uri, _ = mirror_delta_table(fs, remote_path, cache=cache)
+            result["fetch"] = time.perf_counter() - start
+            fs.rm(remote_path, recursive=True)
+
+        con = ibis.duckdb.connect()
+        t = con.read_delta(table_uri)
+
+        # query as of the latest record, in the repo with the most records
+        end = pc.max(data[ts]).as_py()
+        repo_name = None
+        if "repo_name" in t.columns:
+            repo_name = (
+                t.group_by("repo_name")
+                .agg(n=ibis._.count())
+                .order_by(ibis.desc("n"))
+                .limit(1)
+                .to_pyarrow()["repo_name"][0]
+                .as_py()
+            )
+
+        for name, query in query_mix(t, table_name, repo_name, end).items():
+            latencies = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                query()
+                latencies.append(time.perf_counter() - start)
+            result[name] = statistics.median(latencies)
+
+        con.disconnect()
+
+    return result
+
+
+def bench_storage(
+    catalog, table_name: str, layouts: list = None, target="file", repeat=3
+) -> dict:
+    """Benchmark candidate layouts of a lake table, by layout name."""
+
+    # every candidate is written from the same in-memory copy of the table
+    data = catalog.table(table_name).to_pyarrow()
+
+    return {
+        name: bench_layout(
+            data,
+            table_name,
+            candidate_layout(table_name, name),
+            target=target,
+            repeat=repeat,
+        )
+        for name in layouts or CANDIDATE_LAYOUTS
+    }
@@ -0,0 +1,191 @@
+# imports
+import os
+import json
+import time
+import uuid
+import fcntl
+
+from datetime import datetime
+from deltalake import DeltaTable
+
+from ibis_analytics.config import CACHE_DIR, CACHE_MAX_BYTES
+
+
+# functions
+def generation(info: dict) -> str:
+    """Return the identity of a remote object's current contents."""
+
+    # GCS objects get a new generation on every write; other filesystems fall
+    # back to whatever change marker they report
+    for key in ("generation", "etag", "md5Hash", "mtime", "updated", "created"):
+        if info.get(key) is not None:
+            return str(info[key])
+
+    return str(info["size"])
+
+
+def modified_at(info: dict):
+    """Return a remote object's modification time in epoch seconds."""
+
+    mtime = info.get("mtime") or info.get("updated") or info.get("created")
+    if isinstance(mtime, str):
+        mtime = datetime.fromisoformat(mtime.replace("Z", "+00:00"))
+    if isinstance(mtime, datetime):
+        mtime = mtime.timestamp()
+
+    return mtime
+
+
+def mirror_delta_table(fs, table_path: str, version=None, cache=None, data=True):
+    """
+    Mirror a version of a remote Delta table into the local disk cache.
+
+    The table is revalidated with a single listing of its objects. Changed
+    log files are downloaded, then only the data files of the requested
+    version that are missing or stale locally, unless `data` is False.
+    Returns the local table path and the resolved version, None when the
+    table has no log yet.
+    """
+
+    cache = cache or DiskCache(fs)
+    objects = {info["name"]: info for info in fs.find(table_path, detail=True).values()}
+    table_path = fs._strip_protocol(table_path)
+
+    # the transaction log decides which data files make up the version
+    log_files = [
+        name for name in objects if name.startswith(f"{table_path}/_delta_log/")
+    ]
+    for name in log_files:
+        cache.get(name, objects[name])
+
+    local_path = cache.local_path(table_path)
+    if not log_files:
+        return local_path, None
+
+    dt = DeltaTable(local_path)
+    if version is not None:
+        dt.load_as_version(version)
+
+    data_files = [f"{table_path}/{path}" for path in dt.files()] if data else []
+    for name in data_files:
+        cache.get(name, objects.get(name))
+
+    cache.evict(keep=set(log_files) | set(data_files))
+    cache.save()
+
+    return local_path, dt.version()
+
+
+# classes
+class DiskCache:
+    """
+    Read-through local disk cache of remote objects.
+
+    Each object is cached under its remote path and keyed by its generation,
+    so a copy is reused until the remote object changes. An index of cached
+    objects tracks their generation, size and last use; least recently used
+    objects are evicted once the cache grows past `max_bytes`.
+    """
+
+    def __init__(
+        self, fs, cache_dir: str = CACHE_DIR, max_bytes: int = CACHE_MAX_BYTES
+    ):
+        self.fs = fs
+        self.cache_dir = os.path.expanduser(cache_dir)
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(self.cache_dir, "_index.json")
+
+        # the index is shared with other processes using the same cache
+        self.index = self.read_index()
+        self.evicted = set()
+
+    def read_index(self) -> dict:
+        """Read the cache index as last saved by any process."""
+
+        try:
+            with open(self.index_path) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def local_path(self, path: str) -> str:
+        """Return the local path of a cached remote object."""
+
+        return os.path.join(self.cache_dir, self.fs._strip_protocol(path).lstrip("/"))
+
+    def get(self, path: str, info: dict = None) -> str:
+        """Return the local copy of a remote object, downloading it if stale."""
+
+        # revalidate with object metadata only
+        info = info or self.fs.info(path)
+        local_path = self.local_path(path)
+        entry = self.index.get(path)
+
+        if (
+            entry is None
+            or entry["generation"] != generation(info)
+            or not os.path.exists(local_path)
+        ):
+            # download under a name of its own, so concurrent downloads of
+            # the same object never write to the same file
+            os.makedirs(os.path.dirname(local_path), exist_ok=True)
+            tmp_path = f"{local_path}.{uuid.uuid4().hex}.tmp"
+            self.fs.get_file(path, tmp_path)
+            os.replace(tmp_path, local_path)
+
+            # keep the remote modification time, which Delta time travel uses
+            mtime = modified_at(info)
+            if mtime is not None:
+                os.utime(local_path, (mtime, mtime))
+
+            entry = {"generation": generation(info), "size": info["size"]}
+            self.index[path] = entry
+
+        entry["used_at"] = time.time()
+
+        return local_path
+
+    def evict(self, keep=()):
+        """Evict least recently used objects until the cache fits its size."""
+
+        size = sum(entry["size"] for entry in self.index.values())
+        for path, entry in sorted(self.index.items(), key=lambda e: e[1]["used_at"]):
+            if size <= self.max_bytes:
+                break
+            if path in keep:
+                continue
+
+            local_path = self.local_path(path)
+            if os.path.exists(local_path):
+                os.remove(local_path)
+            del self.index[path]
+            self.evicted.add(path)
+            size -= entry["size"]
+
+    def save(self):
+        """
+        Write the cache index, merged with the index other processes saved.
+
+        Threads and processes sharing the cache save in turn under a lock on
+        the index. Each object keeps its most recently used entry, so saves
+        never drop each other's downloads.
+        """
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(f"{self.index_path}.lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+
+            index = self.read_index()
+            for path in self.evicted:
+                index.pop(path, None)
+            for path, entry in self.index.items():
+                if index.get(path, {}).get("used_at", 0) <= entry["used_at"]:
+                    index[path] = entry
+
+            tmp_path = f"{self.index_path}.{uuid.uuid4().hex}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(index, f)
+            os.replace(tmp_path, self.index_path)
+
+        self.index = index
+        self.evicted = set()
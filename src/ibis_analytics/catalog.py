@@ -1,8 +1,34 @@
 # imports
 import os
+import re
+import glob
 import ibis
+import json
+import uuid
+import shutil
+import hashlib
 
-from ibis_analytics.config import CLOUD_STORAGE, CLOUD_BUCKET, DATA_DIR
+import pyarrow as pa
+
+from datetime import date, datetime
+from deltalake import ColumnProperties, DeltaTable, WriterProperties
+
+from ibis_analytics.cache import mirror_delta_table
+from ibis_analytics.upload import write_remote_delta
+from ibis_analytics.config import (
+    CLOUD_STORAGE,
+    CLOUD_BUCKET,
+    CACHE_TABLE_DATA,
+    DATA_DIR,
+    TABLE_PARTITIONS,
+    TABLE_MONTH_COLUMNS,
+    CLOUD_UPLOAD_FILE_SIZE,
+    TABLE_RETENTION_HOURS,
+    SNAPSHOT_DIR,
+    TABLE_LAYOUTS,
+    DEFAULT_TABLE_LAYOUT,
+    COLD_COLUMNS,
+)
 
 
 # functions
@@ -14,46 +40,709 @@ def delta_table_path(table_name: str) -> str:
     return os.path.join(DATA_DIR, delta_table_filename(table_name))
 
 
-def read_table(table_name: str) -> ibis.Table:
+def metadata_path(table_name: str) -> str:
+    return os.path.join(DATA_DIR, "_catalog", f"{table_name}.json")
+
+
+def manifest_path() -> str:
+    return os.path.join(DATA_DIR, "_catalog", "manifest.json")
+
+
+def key_index_path(table_name: str) -> str:
+    return os.path.join(DATA_DIR, "_catalog", f"{table_name}.keys")
+
+
+def cold_table_name(table_name: str) -> str:
+    return f"{table_name}_cold"
+
+
+def delta_table_uri(table_name: str) -> str:
+    if CLOUD_STORAGE:
+        return f"gs://{CLOUD_BUCKET}/{delta_table_path(table_name)}"
+
+    return delta_table_path(table_name)
+
+
+def add_partitions(t: ibis.Table, table_name: str) -> ibis.Table:
+    """Add a table's derived partition columns."""
+
+    column = TABLE_MONTH_COLUMNS.get(table_name)
+    if column is not None:
+        t = t.mutate(month=t[column].strftime("%Y-%m"))
+
+    return t
+
+
+def cloud_filesystem():
+    """Return a filesystem to read the public lake bucket with."""
+
+    import gcsfs
+    import warnings
+
+    warnings.filterwarnings("ignore")
+
+    return gcsfs.GCSFileSystem(token="anon")
+
+
+def local_table(table_name: str, version=None, data: bool = None):
+    """
+    Return the local path of a lake table, and the version to read.
+
+    Cloud tables are mirrored into a local disk cache first, downloading only
+    changed objects: the transaction log, plus every data file of the
+    version when `data` is set, by default when configured to.
+    """
+
+    if not CLOUD_STORAGE:
+        return delta_table_path(table_name), version
+
+    if data is None:
+        data = CACHE_TABLE_DATA
+
+    return mirror_delta_table(
+        cloud_filesystem(),
+        f"{CLOUD_BUCKET}/{delta_table_path(table_name)}",
+        version=version,
+        data=data,
+    )
+
+
+def table_exists(table_name: str) -> bool:
+    """Check whether a lake table has been written, without creating it."""
+
+    # opening a missing local table creates an empty directory for it
+    if not CLOUD_STORAGE and not os.path.exists(delta_table_path(table_name)):
+        return False
+
+    return DeltaTable.is_deltatable(delta_table_uri(table_name))
+
+
+def table_version(table_name: str) -> int:
+    """Return the current version of a lake table."""
+
+    table_uri, version = local_table(table_name)
+    if version is None:
+        version = DeltaTable(table_uri).version()
+
+    return version
+
+
+def read_table(table_name: str, con=None, version=None) -> ibis.Table:
+    """
+    Read a table from the lake, optionally as of an earlier version.
+
+    `version` is a Delta table version number, or a datetime (or ISO 8601
+    string) to read the table as it was at that time. The table is read
+    lazily: filters on partition columns skip whole partitions, and filters
+    on other columns skip files using the statistics in the Delta log.
+    """
+
+    con = con or ibis.get_backend()
+    table_uri, version = local_table(table_name, version=version)
+
+    # resolve a point in time to the version current at that time
+    if version is not None and not isinstance(version, int):
+        dt = DeltaTable(table_uri)
+        dt.load_as_version(version)
+        version = dt.version()
+
+    if CLOUD_STORAGE and not CACHE_TABLE_DATA:
+        return read_remote_files(table_name, table_uri, version, con)
+
+    return con.read_delta(table_uri, version=version)
+
+
+def read_remote_files(table_name: str, table_uri: str, version: int, con) -> ibis.Table:
+    """
+    Read a version of a cloud table's data files where they are.
+
+    The files come from the locally mirrored transaction log. DuckDB only
+    fetches the files a query's partition filters select, and the row groups
+    its other filters can't skip, rather than every file of the version.
+    """
+
+    dt = DeltaTable(table_uri, version=version)
+    files = dt.files()
+    if not files:
+        return con.read_delta(table_uri, version=version)
+
+    fs = cloud_filesystem()
+    con.register_filesystem(fs)
+    table_path = f"{CLOUD_BUCKET}/{delta_table_path(table_name)}"
+    partition_by = dt.metadata().partition_columns
+    t = con.read_parquet(
+        [fs.unstrip_protocol(f"{table_path}/{path}") for path in files],
+        hive_partitioning=bool(partition_by),
+    )
+
+    # partition values are parsed from the paths, in the table's column order
+    schema = ibis.Schema.from_pyarrow(dt.schema().to_pyarrow())
+    t = t.mutate(**{name: t[name].cast(schema[name]) for name in partition_by})
+
+    return t.select(*schema.names)
+
+
+def projection_id(columns: list) -> str:
+    """Identify a column projection in the names of tables derived from it."""
+
+    return hashlib.sha256(",".join(columns).encode()).hexdigest()[:8]
+
+
+def snapshot_path(table_name: str, version, columns: list = None) -> str:
+    name = f"{table_name}__v{version}"
+    if columns:
+        name = f"{name}__{projection_id(columns)}"
+
+    return os.path.join(os.path.expanduser(SNAPSHOT_DIR), f"{name}.arrow")
+
+
+def export_snapshot(table_name: str, version: int, columns: list = None) -> str:
+    """
+    Export a version of a lake table as an Arrow IPC file, returning its path.
+
+    Snapshots hold the `columns` given, or all of them, and are written once
+    per machine, version and projection, uncompressed so readers can map
+    them without copying; older versions of the same projection are removed.
+    """
+
+    path = snapshot_path(table_name, version, columns)
+    if os.path.exists(path):
+        return path
+
+    # the snapshot holds every row, so every data file is needed
+    table_uri, _ = local_table(table_name, version=version, data=True)
+    dataset = DeltaTable(table_uri, version=version).to_pyarrow_dataset()
+    schema = dataset.schema
+    if columns:
+        schema = pa.schema([schema.field(col) for col in columns])
+
+    # stream batches so exporting doesn't hold the table in memory, and
+    # rename into place so readers never see a partial file
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with pa.OSFile(tmp_path, "wb") as sink:
+        with pa.ipc.new_file(sink, schema) as writer:
+            for batch in dataset.to_batches(columns=schema.names):
+                writer.write_batch(batch)
+    os.replace(tmp_path, path)
+
+    # other projections and newer versions may still be read by other
+    # workers; processes still mapping an old snapshot keep it until done
+    suffix = f"__{projection_id(columns)}" if columns else ""
+    pattern = re.compile(rf"{re.escape(table_name)}__v(\d+){suffix}\.arrow")
+    for old_path in glob.glob(snapshot_path(table_name, "*", columns)):
+        match = pattern.fullmatch(os.path.basename(old_path))
+        if match and int(match.group(1)) < version:
+            try:
+                os.remove(old_path)
+            except FileNotFoundError:
+                # removed by another worker in the meantime
+                pass
+
+    return path
+
+
+def read_snapshot(table_name: str, version: int, columns: list = None) -> ibis.Table:
+    """
+    Read a version of a lake table from its memory-mapped snapshot.
+
+    The table's buffers point into the mapped file, so every process reading
+    the snapshot shares the one copy in the page cache.
+    """
+
+    source = pa.memory_map(export_snapshot(table_name, version, columns))
+
+    return ibis.memtable(pa.ipc.open_file(source).read_all())
+
+
+def table_layout(table_name: str) -> dict:
+    """Return a table's Parquet layout, with defaults for unset options."""
+
+    return {**DEFAULT_TABLE_LAYOUT, **TABLE_LAYOUTS.get(table_name, {})}
+
+
+def writer_properties(layout: dict) -> WriterProperties:
+    """Translate a table layout into Delta writer properties."""
+
+    return WriterProperties(
+        compression=(layout["compression"] or "uncompressed").upper(),
+        compression_level=layout["compression_level"],
+        max_row_group_size=layout["row_group_size"],
+        default_column_properties=ColumnProperties(
+            dictionary_enabled=layout["dictionary"]
+        ),
+    )
+
+
+def write_table(
+    t: ibis.Table,
+    table_name: str,
+    mode: str = "overwrite",
+    partition_by: list = None,
+    merge_on: list = None,
+    layout: dict = None,
+    check=None,
+) -> int:
+    """
+    Write a table to the lake as a Delta table, returning the new version.
+
+    `mode` is one of "overwrite", "append", or "merge", which upserts records
+    matching on the `merge_on` columns. Partition columns and the Parquet
+    layout default to the table's configured ones.
+
+    `check` is called with the statistics of the new version and raises to
+    reject it. Cloud writes are checked in staging, before anything is
+    uploaded; local writes are rolled back to the previous version.
+    """
+
+    if partition_by is None:
+        partition_by = TABLE_PARTITIONS.get(table_name)
+    t = add_partitions(t, table_name)
+    layout = layout or table_layout(table_name)
+
+    def write(table_uri, **options):
+        version = write_delta(
+            t,
+            table_uri,
+            mode=mode,
+            partition_by=partition_by,
+            merge_on=merge_on,
+            layout=layout,
+            **options,
+        )
+        if check is not None:
+            check(delta_stats(DeltaTable(table_uri)))
+
+        return version
+
     if CLOUD_STORAGE:
         import gcsfs
-        import warnings
 
-        warnings.filterwarnings("ignore")
+        # write locally, upload the files concurrently, then commit
+        return write_remote_delta(
+            gcsfs.GCSFileSystem(),
+            f"{CLOUD_BUCKET}/{delta_table_path(table_name)}",
+            lambda table_uri: write(table_uri, target_file_size=CLOUD_UPLOAD_FILE_SIZE),
+            data=(mode == "merge"),
+        )
+
+    table_uri = delta_table_path(table_name)
+    previous = None
+    if DeltaTable.is_deltatable(table_uri):
+        previous = DeltaTable(table_uri).version()
+
+    try:
+        return write(table_uri)
+    except Exception:
+        restore_table(table_name, previous)
+        raise
+
+
+def restore_table(table_name: str, version) -> int:
+    """
+    Restore a lake table to an earlier version, returning the new version.
+
+    Restoring to None removes a table that had no earlier version.
+    """
+
+    if CLOUD_STORAGE:
+        import gcsfs
+
+        fs = gcsfs.GCSFileSystem()
+        table_path = f"{CLOUD_BUCKET}/{delta_table_path(table_name)}"
+        if version is None:
+            fs.rm(table_path, recursive=True)
+            return None
 
-        fs = gcsfs.GCSFileSystem(token="anon")
-        ibis.get_backend().register_filesystem(fs)
+        def restore(table_uri):
+            # the staged log is enough; the restored files are still remote
+            dt = DeltaTable(table_uri)
+            dt.restore(version, ignore_missing_files=True)
+            return dt.version()
 
-        table_path = f"gs://{CLOUD_BUCKET}/{delta_table_path(table_name)}"
+        return write_remote_delta(fs, table_path, restore)
+
+    table_uri = delta_table_path(table_name)
+    if version is None:
+        shutil.rmtree(table_uri, ignore_errors=True)
+        return None
+
+    dt = DeltaTable(table_uri)
+    if dt.version() != version:
+        dt.restore(version)
+
+    return dt.version()
+
+
+def write_delta(
+    t: ibis.Table,
+    table_uri: str,
+    mode: str = "overwrite",
+    partition_by: list = None,
+    merge_on: list = None,
+    layout: dict = DEFAULT_TABLE_LAYOUT,
+    target_file_size: int = None,
+) -> int:
+    """
+    Write a table to a Delta table with a Parquet layout, returning its version.
+
+    Appends and overwrites are split into data files of about
+    `target_file_size` bytes when it is set.
+    """
+
+    # records are clustered within each write, so row group statistics of
+    # the sort columns stay narrow and filters on them skip more data
+    if layout["sort_by"]:
+        t = t.order_by(layout["sort_by"])
+    properties = writer_properties(layout)
+
+    if mode == "merge":
+        predicate = " AND ".join(f"target.{col} = source.{col}" for col in merge_on)
+        with t.to_pyarrow_batches() as batches:
+            (
+                DeltaTable(table_uri)
+                .merge(
+                    source=batches,
+                    predicate=predicate,
+                    source_alias="source",
+                    target_alias="target",
+                    writer_properties=properties,
+                )
+                .when_matched_update_all()
+                .when_not_matched_insert_all()
+                .execute()
+            )
+    elif mode == "append":
+        t.to_delta(
+            table_uri,
+            mode="append",
+            partition_by=partition_by,
+            writer_properties=properties,
+            target_file_size=target_file_size,
+        )
     else:
-        table_path = delta_table_path(table_name)
+        # a full write may change the table's schema or partitioning
+        t.to_delta(
+            table_uri,
+            mode="overwrite",
+            partition_by=partition_by,
+            schema_mode="overwrite",
+            writer_properties=properties,
+            target_file_size=target_file_size,
+        )
+
+    return DeltaTable(table_uri).version()
+
+
+def maintain_table(table_name: str, compact: bool = False) -> dict:
+    """
+    Vacuum a lake table's unreferenced files, compacting small files first.
+
+    Compaction merges the small files appends leave behind; vacuuming then
+    deletes files no version has read for TABLE_RETENTION_HOURS. Returns the
+    compaction metrics and the files deleted.
+    """
+
+    dt = DeltaTable(delta_table_uri(table_name))
+
+    compacted = {}
+    if compact:
+        compacted = dt.optimize.compact(
+            target_size=CLOUD_UPLOAD_FILE_SIZE,
+            writer_properties=writer_properties(table_layout(table_name)),
+        )
+    vacuumed = dt.vacuum(
+        retention_hours=TABLE_RETENTION_HOURS,
+        dry_run=False,
+        enforce_retention_duration=False,
+    )
+
+    return {"compacted": compacted, "vacuumed": vacuumed}
+
+
+def split_cold_columns(t: ibis.Table, table_name: str) -> tuple:
+    """
+    Split a table into its hot and cold columns.
+
+    Returns the table without its cold columns and the side table of record
+    ids and cold columns, None when the table has no cold columns.
+    """
+
+    if table_name not in COLD_COLUMNS:
+        return t, None
+
+    key, columns = COLD_COLUMNS[table_name]
+
+    return t.drop(*columns), t.select(*key, *columns)
+
+
+def write_cold_table(t: ibis.Table, table_name: str, mode: str = "overwrite") -> int:
+    """Write the side table of a table's cold columns, returning its version."""
+
+    # clustered by id, so joining a few records back reads few row groups
+    key, _ = COLD_COLUMNS[table_name]
+
+    return write_table(
+        t,
+        cold_table_name(table_name),
+        mode=mode,
+        layout={**DEFAULT_TABLE_LAYOUT, "sort_by": key},
+    )
+
+
+def join_cold_columns(
+    t: ibis.Table, table_name: str, columns: list = None, con=None
+) -> ibis.Table:
+    """
+    Join a table's cold columns, or only `columns` of them, back on its records.
+
+    `t` is the table, or any selection of its records with their ids; the
+    side table is read lazily, so only the records joined are looked up.
+    """
+
+    key, cold_columns = COLD_COLUMNS[table_name]
+    cold = read_table(cold_table_name(table_name), con=con or ibis.get_backend(t))
+    cold = cold.select(*key, *(columns or cold_columns))
+
+    return t.left_join(cold, key).drop(*[f"{col}_right" for col in key])
+
+
+def write_parts(t: ibis.Table, path: str, fs, mode: str = "overwrite") -> str:
+    """
+    Write a table as a directory of Parquet files, returning the file written.
+
+    A full write replaces the directory's contents with `data.parquet`; an
+    append adds a timestamped part file next to it.
+    """
+
+    if mode == "append":
+        part = datetime.utcnow().strftime("%Y%m%dT%H%M%S%f")
+        t.to_parquet(f"{path}/part-{part}.parquet")
+        return f"{path}/part-{part}.parquet"
+
+    t.to_parquet(f"{path}/data.parquet", overwrite=True)
+
+    # a full write replaces any appended parts
+    for part in fs.glob(f"{path}/part-*.parquet"):
+        fs.rm(part)
+
+    return f"{path}/data.parquet"
+
+
+def delta_stats(dt: DeltaTable) -> dict:
+    """
+    Gather table statistics from a Delta table's transaction log.
+
+    Returns the row count plus null count, min and max of every top-level
+    column, summed over the per-file statistics the writer already recorded
+    in the log. No data files are read.
+    """
+
+    actions = dt.get_add_actions(flatten=True).to_pydict()
+    num_records = [n or 0 for n in actions["num_records"]]
+
+    columns = {}
+    for name in dt.schema().to_pyarrow().names:
+        if f"partition.{name}" in actions:
+            # partition values live in the log rather than in file statistics
+            values = actions[f"partition.{name}"]
+            null_counts = [n if v is None else 0 for v, n in zip(values, num_records)]
+            mins = maxs = values
+        else:
+            null_counts = actions.get(f"null_count.{name}", [None])
+            mins = actions.get(f"min.{name}", [])
+            maxs = actions.get(f"max.{name}", [])
+
+        mins = [v for v in mins if v is not None]
+        maxs = [v for v in maxs if v is not None]
+        columns[name] = {
+            "null_count": None if None in null_counts else sum(null_counts),
+            "min": min(mins) if mins else None,
+            "max": max(maxs) if maxs else None,
+        }
+
+    return {"num_rows": sum(num_records), "columns": columns}
+
+
+def table_stats(table_name: str) -> dict:
+    """Read a table's statistics from its Delta transaction log."""
+
+    return delta_stats(DeltaTable(delta_table_uri(table_name)))
+
+
+def jsonable(value):
+    """Convert a statistics value into a JSON-serializable one."""
+
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, bytes):
+        return value.hex()
+
+    return value
+
+
+def delta_manifest(dt: DeltaTable, month_column: str = None) -> dict:
+    """
+    Summarize a Delta table for the catalog manifest from its transaction log.
+
+    Holds the table's version, schema, row count and per-column statistics.
+    Tables partitioned by repo also get per-repo row counts, broken down by
+    month with the range of the month column when there is one.
+    """
+
+    stats = delta_stats(dt)
+    schema = ibis.Schema.from_pyarrow(dt.schema().to_pyarrow())
+
+    manifest = {
+        "version": dt.version(),
+        "num_rows": stats["num_rows"],
+        "schema": {name: str(dtype) for name, dtype in schema.items()},
+        "columns": {
+            name: {key: jsonable(value) for key, value in col.items()}
+            for name, col in stats["columns"].items()
+        },
+    }
+
+    actions = dt.get_add_actions(flatten=True).to_pydict()
+    if "partition.repo_name" not in actions:
+        return manifest
+
+    repos = {}
+    num_files = len(actions["num_records"])
+    months = actions.get("partition.month", [None] * num_files)
+    mins = actions.get(f"min.{month_column}", [None] * num_files)
+    maxs = actions.get(f"max.{month_column}", [None] * num_files)
+    for repo_name, month, num_records, min_value, max_value in zip(
+        actions["partition.repo_name"], months, actions["num_records"], mins, maxs
+    ):
+        repo = repos.setdefault(repo_name, {"num_rows": 0, "months": {}})
+        repo["num_rows"] += num_records or 0
+
+        # records without a timestamp have no month and are never in range
+        if month_column is None or month is None:
+            continue
+
+        entry = repo["months"].setdefault(
+            month, {"num_rows": 0, "min": None, "max": None}
+        )
+        entry["num_rows"] += num_records or 0
+        if min_value is not None and (entry["min"] is None or min_value < entry["min"]):
+            entry["min"] = min_value
+        if max_value is not None and (entry["max"] is None or max_value > entry["max"]):
+            entry["max"] = max_value
+
+    for repo in repos.values():
+        for entry in repo["months"].values():
+            entry["min"], entry["max"] = jsonable(entry["min"]), jsonable(entry["max"])
+    manifest["repos"] = repos
+
+    return manifest
+
+
+def table_manifest(table_name: str) -> dict:
+    """Summarize a table for the catalog manifest, without reading its data."""
+
+    return delta_manifest(
+        DeltaTable(delta_table_uri(table_name)), TABLE_MONTH_COLUMNS.get(table_name)
+    )
 
-    # TODO: remove parquet hack once https://github.com/delta-io/delta-rs/issues/2859 fixed
-    return ibis.read_parquet(f"{table_path}/data.parquet")
 
+def metadata_filesystem():
+    """Return the filesystem and root of the catalog's table metadata."""
 
-def write_table(t: ibis.Table, table_name: str) -> None:
     if CLOUD_STORAGE:
         import gcsfs
         import warnings
 
         warnings.filterwarnings("ignore")
 
-        fs = gcsfs.GCSFileSystem()
-        ibis.get_backend().register_filesystem(fs)
+        return gcsfs.GCSFileSystem(), f"{CLOUD_BUCKET}/"
+
+    import fsspec
+
+    return fsspec.filesystem("file"), ""
+
+
+def read_catalog_file(path: str) -> dict:
+    """Read a JSON file of the catalog, empty if it doesn't exist."""
+
+    fs, root = metadata_filesystem()
+    path = f"{root}{path}"
+
+    if not fs.exists(path):
+        return {}
+
+    with fs.open(path, "r") as f:
+        return json.load(f)
+
+
+def write_catalog_file(path: str, contents: dict) -> None:
+    """Write a JSON file of the catalog."""
+
+    fs, root = metadata_filesystem()
+    path = f"{root}{path}"
+
+    if not CLOUD_STORAGE:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    with fs.open(path, "w") as f:
+        json.dump(contents, f, indent=4)
+
+
+def read_metadata(table_name: str) -> dict:
+    """Read a table's metadata, empty if the table has none."""
+
+    return read_catalog_file(metadata_path(table_name))
+
+
+def write_metadata(table_name: str, metadata: dict) -> None:
+    """Write a table's metadata next to the other tables' metadata."""
+
+    write_catalog_file(metadata_path(table_name), metadata)
+
+
+def read_manifest() -> dict:
+    """Read the catalog manifest, empty if the ETL hasn't written one."""
+
+    return read_catalog_file(manifest_path())
+
+
+def write_manifest(manifest: dict) -> None:
+    """Write the catalog manifest of every table."""
+
+    write_catalog_file(manifest_path(), manifest)
+
+
+def read_key_index(table_name: str, con=None):
+    """Read a table's key index, None if the table has none."""
+
+    con = con or ibis.get_backend()
+    fs, root = metadata_filesystem()
+    path = f"{root}{key_index_path(table_name)}"
 
-        table_path = f"gs://{CLOUD_BUCKET}/{delta_table_path(table_name)}"
+    if not fs.exists(f"{path}/data.parquet"):
+        return None
+
+    if CLOUD_STORAGE:
+        con.register_filesystem(fs)
+        path = f"gs://{path}"
+
+    return con.read_parquet(f"{path}/*.parquet")
+
+
+def write_key_index(t: ibis.Table, table_name: str, mode: str = "overwrite") -> str:
+    """Write a table's key index, or append the keys of newly loaded records."""
+
+    fs, root = metadata_filesystem()
+    path = f"{root}{key_index_path(table_name)}"
+
+    if CLOUD_STORAGE:
+        ibis.get_backend(t).register_filesystem(fs)
+        path = f"gs://{path}"
     else:
-        table_path = delta_table_path(table_name)
-        os.makedirs(table_path, exist_ok=True)
-
-    # TODO: remove parquet hack once https://github.com/delta-io/delta-rs/issues/2859 fixed
-    t.to_parquet(
-        f"{table_path}/data.parquet",
-        overwrite=True,
-        # mode="overwrite",
-        # partition_by=["extracted_at"],
-    )
+        os.makedirs(path, exist_ok=True)
+
+    return write_parts(t, path, fs, mode=mode)
 
 
 # classes
@@ -65,8 +754,76 @@ class Catalog:
             if not (d.startswith("_") or d.startswith("."))
         ]
 
-    def table(self, table_name):
-        return read_table(table_name)
+    def table(self, table_name, con=None, version=None):
+        return read_table(table_name, con=con, version=version)
+
+    def prefetch(self, table_name):
+        local_table(table_name)
+
+    def exists(self, table_name):
+        return table_exists(table_name)
+
+    def version(self, table_name):
+        return table_version(table_name)
+
+    def export_snapshot(self, table_name, version, columns=None):
+        return export_snapshot(table_name, version, columns=columns)
+
+    def snapshot(self, table_name, version, columns=None):
+        return read_snapshot(table_name, version, columns=columns)
+
+    def write_table(
+        self,
+        t,
+        table_name,
+        mode="overwrite",
+        partition_by=None,
+        merge_on=None,
+        layout=None,
+        check=None,
+    ):
+        return write_table(
+            t,
+            table_name,
+            mode=mode,
+            partition_by=partition_by,
+            merge_on=merge_on,
+            layout=layout,
+            check=check,
+        )
+
+    def restore_table(self, table_name, version):
+        return restore_table(table_name, version)
+
+    def maintain_table(self, table_name, compact=False):
+        return maintain_table(table_name, compact=compact)
+
+    def write_cold_table(self, t, table_name, mode="overwrite"):
+        return write_cold_table(t, table_name, mode=mode)
+
+    def cold_columns(self, t, table_name, columns=None, con=None):
+        return join_cold_columns(t, table_name, columns=columns, con=con)
+
+    def table_stats(self, table_name):
+        return table_stats(table_name)
+
+    def table_manifest(self, table_name):
+        return table_manifest(table_name)
+
+    def manifest(self):
+        return read_manifest()
+
+    def write_manifest(self, manifest):
+        write_manifest(manifest)
+
+    def metadata(self, table_name):
+        return read_metadata(table_name)
+
+    def write_metadata(self, table_name, metadata):
+        write_metadata(table_name, metadata)
+
+    def key_index(self, table_name, con=None):
+        return read_key_index(table_name, con=con)
 
-    def write_table(self, t, table_name):
-        write_table(t, table_name)
+    def write_key_index(self, t, table_name, mode="overwrite"):
+        return write_key_index(t, table_name, mode=mode)
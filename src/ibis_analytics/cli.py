@@ -3,11 +3,20 @@ import httpx
 import typer
 import subprocess
 
-from ibis_analytics.catalog import delta_table_path
-from ibis_analytics.etl.run import main as etl_main
+from ibis_analytics.bench import CANDIDATE_LAYOUTS, bench_storage, timestamp_column
+from ibis_analytics.catalog import (
+    Catalog,
+    cold_table_name,
+    delta_table_path,
+    key_index_path,
+    manifest_path,
+    metadata_path,
+)
+from ibis_analytics.etl.run import main as etl_main, verify as verify_main
 from ibis_analytics.ingest.run import main as ingest_main
 
 from ibis_analytics.config import (
+    ETL_JOBS,
     DATA_DIR,
     RAW_DATA_DIR,
     GH_PRS_TABLE,
@@ -19,6 +28,8 @@ from ibis_analytics.config import (
     DOCS_TABLE,
     ZULIP_MEMBERS_TABLE,
     ZULIP_MESSAGES_TABLE,
+    PYPI_DOWNLOADS_TABLE,
+    ROLLUPS,
 )
 
 TYPER_KWARGS = {
@@ -28,9 +39,11 @@ TYPER_KWARGS = {
 }
 app = typer.Typer(help="ia", **TYPER_KWARGS)
 clean_app = typer.Typer(help="Clean the data lake.", **TYPER_KWARGS)
+bench_app = typer.Typer(help="Benchmark the data lake.", **TYPER_KWARGS)
 
 ## add subcommands
 app.add_typer(clean_app, name="clean")
+app.add_typer(bench_app, name="bench")
 
 ## add subcommand aliases
 app.add_typer(clean_app, name="c", hidden=True)
@@ -46,11 +59,40 @@ def ingest(
     docs: bool = typer.Option(
         False, "--docs", help="Ingest docs data", show_default=True
     ),
+    pypi: bool = typer.Option(
+        False, "--pypi", help="Ingest PyPI data", show_default=True
+    ),
+    full_refresh: bool = typer.Option(
+        False,
+        "--full-refresh",
+        help="Ignore high-water marks and re-ingest full history",
+        show_default=True,
+    ),
+    updated: bool = typer.Option(
+        False,
+        "--updated",
+        help="Order GitHub issues and PRs by last update to pick up state changes",
+        show_default=True,
+    ),
+    resume: bool = typer.Option(
+        False,
+        "--resume",
+        help="Continue GitHub streams from the last checkpoint",
+        show_default=True,
+    ),
 ):
     """Ingest source data."""
     # ensure project config exists
     try:
-        ingest_main(gh=gh, zulip=zulip, docs=docs)
+        ingest_main(
+            gh=gh,
+            zulip=zulip,
+            docs=docs,
+            pypi=pypi,
+            full_refresh=full_refresh,
+            updated=updated,
+            resume=resume,
+        )
     except KeyboardInterrupt:
         typer.echo("stopping...")
 
@@ -66,11 +108,58 @@ def run(
         True, "--zulip", help="Run Zulip ETL", show_default=True
     ),
     docs: bool = typer.Option(False, "--docs", help="Run docs ETL", show_default=True),
+    pypi: bool = typer.Option(False, "--pypi", help="Run PyPI ETL", show_default=True),
+    jobs: int = typer.Option(
+        ETL_JOBS,
+        "--jobs",
+        "-j",
+        help="Number of table pipelines to run at once",
+        show_default=True,
+    ),
+    force: bool = typer.Option(
+        False,
+        "--force",
+        help="Rebuild tables even if their inputs are unchanged",
+        show_default=True,
+    ),
+    incremental: bool = typer.Option(
+        False,
+        "--incremental",
+        help="Append only new records to tables with running totals",
+        show_default=True,
+    ),
 ):
     """Run ETL."""
 
     try:
-        etl_main(gh=gh, zulip=zulip, docs=docs)
+        etl_main(
+            gh=gh,
+            zulip=zulip,
+            docs=docs,
+            pypi=pypi,
+            jobs=jobs,
+            force=force,
+            incremental=incremental,
+        )
+    except KeyboardInterrupt:
+        typer.echo("stopping...")
+    except Exception as e:
+        typer.echo(f"error: {e}")
+
+
+@app.command()
+def verify(
+    gh: bool = typer.Option(
+        True, "--gh", help="Verify GitHub tables", show_default=True
+    ),
+    zulip: bool = typer.Option(
+        True, "--zulip", help="Verify Zulip tables", show_default=True
+    ),
+):
+    """Verify incremental ETL against a full rebuild."""
+
+    try:
+        verify_main(gh=gh, zulip=zulip)
     except KeyboardInterrupt:
         typer.echo("stopping...")
     except Exception as e:
@@ -105,6 +194,56 @@ def dashboard():
     subprocess.call(cmd, shell=True)
 
 
+@bench_app.command("storage")
+def bench_storage_layouts(
+    tables: list[str] = typer.Option(
+        None, "--table", "-t", help="Tables to benchmark, all by default"
+    ),
+    layouts: list[str] = typer.Option(
+        None,
+        "--layout",
+        "-l",
+        help=f"Candidate layouts, all by default: {', '.join(CANDIDATE_LAYOUTS)}",
+    ),
+    target: str = typer.Option(
+        "file",
+        "--target",
+        help="Read from the local filesystem (file) or a GCS stand-in (memory)",
+        show_default=True,
+    ),
+    repeat: int = typer.Option(
+        3, "--repeat", "-r", help="Runs of each query", show_default=True
+    ),
+):
+    """Compare Parquet layouts of lake tables on the dashboard's queries."""
+
+    catalog = Catalog()
+    for table in tables or catalog.manifest():
+        # the dashboard's queries filter by time
+        if timestamp_column(table) is None:
+            typer.echo(f"Skipping {table}, it has no timestamp column")
+            continue
+
+        typer.echo(f"Benchmarking {table}...")
+        try:
+            results = bench_storage(
+                catalog, table, layouts=layouts, target=target, repeat=repeat
+            )
+        except Exception as e:
+            typer.echo(f"error: {e}")
+            continue
+
+        # sizes in MB and times in ms, one row per layout
+        columns = list(next(iter(results.values())))
+        typer.echo(f"{'layout':<18}" + "".join(f"{col:>12}" for col in columns))
+        for name, result in results.items():
+            values = [
+                result[col] / 1024**2 if col == "size" else result[col] * 1000
+                for col in columns
+            ]
+            typer.echo(f"{name:<18}" + "".join(f"{value:>12.2f}" for value in values))
+
+
 @clean_app.command("lake")
 def clean_lake():
     """Clean the data lake."""
@@ -118,13 +257,25 @@ def clean_lake():
         DOCS_TABLE,
         ZULIP_MEMBERS_TABLE,
         ZULIP_MESSAGES_TABLE,
+        PYPI_DOWNLOADS_TABLE,
+        *ROLLUPS,
     ]
 
     for table in tables:
-        cmd = f"rm -rf {delta_table_path(table)}/"
+        paths = [
+            f"{delta_table_path(table)}/",
+            f"{delta_table_path(cold_table_name(table))}/",
+            metadata_path(table),
+            f"{key_index_path(table)}/",
+        ]
+        cmd = f"rm -rf {' '.join(paths)}"
         typer.echo(f"running: {cmd}...")
         subprocess.call(cmd, shell=True)
 
+    cmd = f"rm -f {manifest_path()}"
+    typer.echo(f"running: {cmd}...")
+    subprocess.call(cmd, shell=True)
+
 
 @clean_app.command("ingest")
 def clean_ingest(
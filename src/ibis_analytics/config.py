@@ -7,15 +7,68 @@ GH_REPOS = [
 PYPI_PACKAGES = ["ibis-framework", "ibis-substrait", "ibis-ml", "ibis-analytics"]
 ZULIP_URL = "https://ibis-project.zulipchat.com"
 DOCS_URL = "https://ibis.goatcounter.com"
+# PyPI download counts in the ClickHouse Cloud playground, mirrored into the
+# lake one Parquet file per package and week, this many weeks at a time
+PYPI_CLICKHOUSE = {
+    "host": "clickpy-clickhouse.clickhouse.com",
+    "port": 443,
+    "user": "play",
+    "database": "pypi",
+}
+PYPI_SOURCE_TABLE = "pypi_downloads_per_day_by_version_by_system_by_country"
+PYPI_INGEST_JOBS = 8
+
+GH_MAX_CONCURRENCY = 8
+GH_RATE_LIMIT_RESERVE = 100
+GH_MAX_RETRIES = 5
+GH_BACKOFF_BASE = 1.0
+GH_BACKOFF_MAX = 60.0
+
+ETL_JOBS = 4
 
 CLOUD_STORAGE = True
 CLOUD_BUCKET = "ibis-analytics"
+CACHE_DIR = "~/.cache/ibis-analytics"
+CACHE_MAX_BYTES = 10 * 1024 * 1024 * 1024
+# cloud reads mirror only a table's transaction log and fetch the data files
+# a query touches; set to mirror every data file of the version instead
+CACHE_TABLE_DATA = False
+# cloud writes are split into data files of about this size, uploaded this
+# many at a time
+CLOUD_UPLOAD_FILE_SIZE = 128 * 1024 * 1024
+CLOUD_UPLOAD_CONCURRENCY = 8
+# times a cloud write is retried on top of a version another writer
+# committed first
+CLOUD_COMMIT_RETRIES = 3
+# files replaced by later versions of a lake table are vacuumed after this
+# many hours, so readers and time travel within the window still find them
+TABLE_RETENTION_HOURS = 7 * 24
+# how the dashboard keeps lake tables: "memory" caches them per process,
+# "database" materializes them into a persistent DuckDB database reused
+# across restarts until the lake version changes, and "snapshot" exports
+# them as Arrow IPC files that every worker on the machine memory-maps. A
+# memory limit lets DuckDB page the database from disk
+DASHBOARD_CACHE = "database"
+DASHBOARD_DATABASE = "~/.cache/ibis-analytics/dashboard.ddb"
+DASHBOARD_MEMORY_LIMIT = None
+SNAPSHOT_DIR = "~/.cache/ibis-analytics/snapshots"
+# results of queries to remote sources are cached on disk, keyed by their
+# SQL, for this many seconds and up to this size, least recently used first
+# out; the PyPI source is updated once a day
+RESULT_CACHE_DIR = "~/.cache/ibis-analytics/results"
+RESULT_CACHE_TTL = 24 * 60 * 60
+RESULT_CACHE_MAX_BYTES = 1024 * 1024 * 1024
 
 DATA_DIR = "datalake"
 RAW_DATA_DIR = "_raw"
 RAW_DATA_GH_DIR = "github"
 RAW_DATA_DOCS_DIR = "docs"
 RAW_DATA_ZULIP_DIR = "zulip"
+RAW_DATA_PYPI_DIR = "pypi"
+RAW_SEGMENT_TARGET_BYTES = 64 * 1024 * 1024
+# GitHub streams rarely fill a segment, so they also commit one, and
+# checkpoint, every this many pages
+GH_CHECKPOINT_PAGES = 10
 
 GH_PRS_TABLE = "gh_prs"
 GH_FORKS_TABLE = "gh_forks"
@@ -26,3 +79,191 @@ GH_WATCHERS_TABLE = "gh_watchers"
 DOCS_TABLE = "docs"
 ZULIP_MEMBERS_TABLE = "zulip_members"
 ZULIP_MESSAGES_TABLE = "zulip_messages"
+PYPI_DOWNLOADS_TABLE = "pypi_downloads"
+GH_STARS_DAILY_TABLE = "gh_stars_daily"
+DOCS_DAILY_TABLE = "docs_daily"
+PYPI_DOWNLOADS_DAILY_TABLE = "pypi_downloads_daily"
+
+# data quality checks per table: the minimum row count, the maximum null rate
+# of columns, and timestamp columns that must have a range that is not in the
+# future; checks run on the statistics of the written output
+DATA_QUALITY_CHECKS = {
+    GH_PRS_TABLE: {
+        "min_rows": 1,
+        "max_null_rate": {"id": 0, "created_at": 0},
+        "timestamps": ["created_at"],
+    },
+    GH_FORKS_TABLE: {
+        "min_rows": 1,
+        "max_null_rate": {"created_at": 0},
+        "timestamps": ["created_at"],
+    },
+    GH_STARS_TABLE: {
+        "min_rows": 1,
+        "max_null_rate": {"starred_at": 0},
+        "timestamps": ["starred_at"],
+    },
+    GH_ISSUES_TABLE: {
+        "min_rows": 1,
+        "max_null_rate": {"id": 0, "created_at": 0},
+        "timestamps": ["created_at"],
+    },
+    GH_COMMITS_TABLE: {
+        "min_rows": 1,
+        "max_null_rate": {"id": 0, "committed_date": 0},
+        "timestamps": ["committed_date"],
+    },
+    GH_WATCHERS_TABLE: {
+        "min_rows": 1,
+        "max_null_rate": {"updated_at": 0},
+        "timestamps": ["updated_at"],
+    },
+    DOCS_TABLE: {
+        "min_rows": 1,
+        "max_null_rate": {"timestamp": 0},
+        "timestamps": ["timestamp"],
+    },
+    ZULIP_MEMBERS_TABLE: {
+        "min_rows": 1,
+        "max_null_rate": {"date_joined": 0},
+        "timestamps": ["date_joined"],
+    },
+    ZULIP_MESSAGES_TABLE: {
+        "min_rows": 1,
+        "max_null_rate": {"id": 0, "timestamp": 0},
+        "timestamps": ["timestamp"],
+    },
+    PYPI_DOWNLOADS_TABLE: {
+        "min_rows": 1,
+        "max_null_rate": {"date": 0, "version": 0},
+        "timestamps": ["date"],
+    },
+}
+
+# Delta partition columns of each table, laid out hive-style; GitHub tables
+# are split by repo and by the year-month ("YYYY-MM") of their main timestamp
+TABLE_PARTITIONS = {
+    GH_PRS_TABLE: ["repo_name", "month"],
+    GH_FORKS_TABLE: ["repo_name", "month"],
+    GH_STARS_TABLE: ["repo_name", "month"],
+    GH_ISSUES_TABLE: ["repo_name", "month"],
+    GH_COMMITS_TABLE: ["repo_name", "month"],
+    GH_WATCHERS_TABLE: ["repo_name", "month"],
+    PYPI_DOWNLOADS_TABLE: ["project", "month"],
+}
+TABLE_MONTH_COLUMNS = {
+    GH_PRS_TABLE: "created_at",
+    GH_FORKS_TABLE: "created_at",
+    GH_STARS_TABLE: "starred_at",
+    GH_ISSUES_TABLE: "created_at",
+    GH_COMMITS_TABLE: "committed_date",
+    GH_WATCHERS_TABLE: "updated_at",
+    PYPI_DOWNLOADS_TABLE: "date",
+}
+
+# Parquet layout of each table's data files: codec, codec level, rows per row
+# group, columns to sort (cluster) records by within each write and whether
+# to dictionary-encode columns; tables without an entry use the default, the
+# Delta writer's own settings. Compare layouts with `ia bench storage`
+DEFAULT_TABLE_LAYOUT = {
+    "compression": "snappy",
+    "compression_level": None,
+    "row_group_size": None,
+    "sort_by": [],
+    "dictionary": True,
+}
+
+# tables are clustered by the columns the dashboard filters on, so each row
+# group covers a narrow range of them and date filters skip the others; the
+# unpartitioned tables get smaller row groups for finer skipping
+TABLE_LAYOUTS = {
+    GH_PRS_TABLE: {"sort_by": ["repo_name", "created_at"]},
+    GH_FORKS_TABLE: {"sort_by": ["repo_name", "created_at"]},
+    GH_STARS_TABLE: {"sort_by": ["repo_name", "starred_at"]},
+    GH_ISSUES_TABLE: {"sort_by": ["repo_name", "created_at"]},
+    GH_COMMITS_TABLE: {"sort_by": ["repo_name", "committed_date"]},
+    GH_WATCHERS_TABLE: {"sort_by": ["repo_name", "updated_at"]},
+    DOCS_TABLE: {"sort_by": ["timestamp"], "row_group_size": 64 * 1024},
+    ZULIP_MEMBERS_TABLE: {"sort_by": ["date_joined"], "row_group_size": 64 * 1024},
+    ZULIP_MESSAGES_TABLE: {"sort_by": ["timestamp"], "row_group_size": 64 * 1024},
+    PYPI_DOWNLOADS_TABLE: {"sort_by": ["project", "date"]},
+    GH_STARS_DAILY_TABLE: {"sort_by": ["repo_name", "starred_at"]},
+    DOCS_DAILY_TABLE: {"sort_by": ["timestamp"]},
+    PYPI_DOWNLOADS_DAILY_TABLE: {"sort_by": ["project", "date"]},
+}
+
+# natural key of each table's records, used to deduplicate them; issues and
+# PRs keep one record per version so the latest update can be picked later
+NATURAL_KEYS = {
+    GH_PRS_TABLE: ["repo_name", "id", "updated_at"],
+    GH_FORKS_TABLE: ["repo_name", "login", "name"],
+    GH_STARS_TABLE: ["repo_name", "id"],
+    GH_ISSUES_TABLE: ["repo_name", "id", "updated_at"],
+    GH_COMMITS_TABLE: ["repo_name", "id"],
+    GH_WATCHERS_TABLE: ["repo_name", "id"],
+    DOCS_TABLE: ["session", "2_path", "date"],
+    ZULIP_MEMBERS_TABLE: ["user_id"],
+    ZULIP_MESSAGES_TABLE: ["id"],
+    PYPI_DOWNLOADS_TABLE: ["project", "date", "version", "system", "country_code"],
+}
+
+# large text and nested columns kept out of each table; they live in a side
+# table of the records' ids and these columns, joined back on demand
+COLD_COLUMNS = {
+    GH_PRS_TABLE: (["repo_name", "id"], ["labels"]),
+    GH_ISSUES_TABLE: (["repo_name", "id"], ["body", "labels", "comments"]),
+    ZULIP_MESSAGES_TABLE: (["id"], ["content"]),
+}
+
+# columns the dashboard's panels read from each table, so its caches hold
+# only these; tables without an entry are kept whole
+DASHBOARD_COLUMNS = {
+    GH_PRS_TABLE: ["repo_name", "created_at", "month"],
+    GH_FORKS_TABLE: ["repo_name", "created_at", "month"],
+    GH_STARS_TABLE: ["repo_name", "starred_at", "company", "total_stars", "month"],
+    GH_ISSUES_TABLE: ["repo_name", "created_at", "month"],
+    GH_COMMITS_TABLE: ["repo_name", "committed_date", "month"],
+    GH_WATCHERS_TABLE: ["repo_name", "updated_at", "month"],
+    DOCS_TABLE: [
+        "timestamp",
+        "path",
+        "browser",
+        "system",
+        "bot",
+        "referrer",
+        "location",
+        "first_visit",
+    ],
+    ZULIP_MEMBERS_TABLE: ["date_joined", "total_members"],
+    ZULIP_MESSAGES_TABLE: ["timestamp", "total_messages"],
+    PYPI_DOWNLOADS_TABLE: [
+        "date",
+        "project",
+        "version",
+        "system",
+        "country_code",
+        "count",
+    ],
+}
+
+# daily rollups the ETL builds from tables for the dashboard's plots: rollup
+# -> (table, timestamp column, group columns, count column, summed column);
+# records are counted unless there is a column to sum. Coarser grains are
+# truncated from the daily counts
+ROLLUPS = {
+    GH_STARS_DAILY_TABLE: (
+        GH_STARS_TABLE,
+        "starred_at",
+        ["repo_name", "company"],
+        "stars",
+        None,
+    ),
+    DOCS_DAILY_TABLE: (DOCS_TABLE, "timestamp", ["path"], "docs", None),
+    PYPI_DOWNLOADS_DAILY_TABLE: (
+        PYPI_DOWNLOADS_TABLE,
+        "date",
+        ["project", "version"],
+        "downloads",
+        "count",
+    ),
+}
@@ -1,7 +1,10 @@
 # imports
 import os
+import glob
 import ibis
 
+import logging as log
+
 from datetime import datetime
 from ibis_analytics.config import (
     DATA_DIR,
@@ -9,13 +12,62 @@ from ibis_analytics.config import (
     RAW_DATA_GH_DIR,
     RAW_DATA_DOCS_DIR,
     RAW_DATA_ZULIP_DIR,
+    RAW_DATA_PYPI_DIR,
+    GH_PRS_TABLE,
+    GH_FORKS_TABLE,
+    GH_STARS_TABLE,
+    GH_ISSUES_TABLE,
+    GH_COMMITS_TABLE,
+    GH_WATCHERS_TABLE,
+    DOCS_TABLE,
+    ZULIP_MEMBERS_TABLE,
+    ZULIP_MESSAGES_TABLE,
+    PYPI_DOWNLOADS_TABLE,
 )
+from ibis_analytics.schemas import raw_schema, schema_drift
+
+# raw data location of each table, relative to the raw data directory
+RAW_DATA_GLOBS = {
+    GH_COMMITS_TABLE: (RAW_DATA_GH_DIR, "repo_name=*", "commits.*.parquet"),
+    GH_ISSUES_TABLE: (RAW_DATA_GH_DIR, "repo_name=*", "issues.*.parquet"),
+    GH_PRS_TABLE: (RAW_DATA_GH_DIR, "repo_name=*", "pullRequests.*.parquet"),
+    GH_FORKS_TABLE: (RAW_DATA_GH_DIR, "repo_name=*", "forks.*.parquet"),
+    GH_STARS_TABLE: (RAW_DATA_GH_DIR, "repo_name=*", "stargazers.*.parquet"),
+    GH_WATCHERS_TABLE: (RAW_DATA_GH_DIR, "repo_name=*", "watchers.*.parquet"),
+    DOCS_TABLE: (RAW_DATA_DOCS_DIR, "*.csv.gz"),
+    ZULIP_MEMBERS_TABLE: (RAW_DATA_ZULIP_DIR, "members.json"),
+    ZULIP_MESSAGES_TABLE: (RAW_DATA_ZULIP_DIR, "messages.*.ndjson.zst"),
+    PYPI_DOWNLOADS_TABLE: (RAW_DATA_PYPI_DIR, "project=*", "week=*.parquet"),
+}
+
+# raw data written by earlier versions of ingest, which extract no longer
+# reads; ingesting with --full-refresh replaces them
+LEGACY_RAW_DATA_GLOBS = {
+    GH_COMMITS_TABLE: (RAW_DATA_GH_DIR, "repo_name=*", "commits.*.*json*"),
+    GH_ISSUES_TABLE: (RAW_DATA_GH_DIR, "repo_name=*", "issues.*.*json*"),
+    GH_PRS_TABLE: (RAW_DATA_GH_DIR, "repo_name=*", "pullRequests.*.*json*"),
+    GH_FORKS_TABLE: (RAW_DATA_GH_DIR, "repo_name=*", "forks.*.*json*"),
+    GH_STARS_TABLE: (RAW_DATA_GH_DIR, "repo_name=*", "stargazers.*.*json*"),
+    GH_WATCHERS_TABLE: (RAW_DATA_GH_DIR, "repo_name=*", "watchers.*.*json*"),
+    ZULIP_MESSAGES_TABLE: (RAW_DATA_ZULIP_DIR, "messages.json"),
+}
+
+# columns recording each record's raw file, and its row in the file where
+# the reader has row numbers, so repeated records can be ordered by ingest
+SOURCE_FILE = "_file"
+SOURCE_ROW = "file_row_number"
 
 # set extracted_at timestamp
 extracted_at = datetime.utcnow().isoformat()
 
 
 # functions
+def raw_data_glob(table_name: str) -> str:
+    """Return the glob matching a table's raw data files."""
+
+    return os.path.join(DATA_DIR, RAW_DATA_DIR, *RAW_DATA_GLOBS[table_name])
+
+
 def add_extracted_at(t):
     """Add extracted_at column to table."""
 
@@ -25,141 +77,257 @@ def add_extracted_at(t):
     return t
 
 
-def constraints(t):
-    """Check common constraints for extracted tables."""
+def read_raw(con, reader, data_glob, table_name, **options):
+    """Read raw data with the registered schema of its table."""
 
-    assert t.count().to_pyarrow().as_py() > 0, "table is empty!"
+    schema = ibis.Schema.from_pyarrow(raw_schema(table_name))
 
-    return t
+    # pass the schema to DuckDB so it does not sample files to infer types;
+    # DuckDB's readers take timestamps without a precision
+    types = {
+        name: dtype.copy(scale=None) if dtype.is_timestamp() else dtype
+        for name, dtype in schema.items()
+    }
+    columns = ", ".join(
+        f"'{name}': '{con.compiler.type_mapper.to_string(dtype)}'"
+        for name, dtype in types.items()
+    )
+    options = "".join(
+        f", {key}={str(value).lower() if isinstance(value, bool) else repr(value)}"
+        for key, value in {**options, "filename": SOURCE_FILE}.items()
+    )
+
+    return con.sql(
+        f"SELECT * FROM {reader}('{data_glob}', columns={{{columns}}}{options})"
+    )
+
+
+def read_parquet(con, data_glob):
+    """Read Parquet data written by ingest, which carries its own schema."""
+
+    return con.read_parquet(data_glob, filename=SOURCE_FILE, file_row_number=True)
+
+
+def read_json(con, data_glob, table_name, **options):
+    """Read raw JSON data with the registered schema of its table."""
+
+    return read_raw(con, "read_json", data_glob, table_name, **options)
+
+
+def read_csv(con, data_glob, table_name, **options):
+    """Read raw CSV data with the registered schema of its table."""
+
+    return read_raw(con, "read_csv", data_glob, table_name, **options)
+
+
+def read_segments(con, data_glob, table_name):
+    """Read zstd-compressed NDJSON segments written by ingest."""
+
+    return read_json(
+        con, data_glob, table_name, format="newline_delimited", compression="zstd"
+    )
+
+
+def check_legacy(table_name):
+    """Fail on raw files in a format extract no longer reads."""
+
+    if table_name not in LEGACY_RAW_DATA_GLOBS:
+        return
+
+    legacy_glob = os.path.join(
+        DATA_DIR, RAW_DATA_DIR, *LEGACY_RAW_DATA_GLOBS[table_name]
+    )
+    paths = sorted(glob.glob(legacy_glob))
+    if paths:
+        raise RuntimeError(
+            f"{len(paths)} raw files for {table_name} are in a legacy format "
+            f"(e.g. {paths[0]}) and would be dropped; re-ingest with "
+            "`ia ingest --full-refresh` to replace them"
+        )
+
+
+def check_drift(table_name, data_glob):
+    """Flag raw files that drifted from the registered schema of their table."""
+
+    for path in sorted(glob.glob(data_glob)):
+        drift = schema_drift(table_name, path)
+        if drift:
+            log.warning(f"Schema drift in {path}: {'; '.join(drift)}")
 
 
 # extract data assets
-def gh_commits():
+def gh_commits(con=None):
     """Extract GitHub commits data."""
 
+    # use the default backend unless given a connection
+    con = con or ibis.get_backend()
+
     # read in raw data
-    data_glob = os.path.join(
-        DATA_DIR, RAW_DATA_DIR, RAW_DATA_GH_DIR, "repo_name=*", "commits.*.json"
-    )
-    gh_commits = ibis.read_json(data_glob)
+    data_glob = raw_data_glob(GH_COMMITS_TABLE)
+    check_legacy(GH_COMMITS_TABLE)
+    check_drift(GH_COMMITS_TABLE, data_glob)
+    gh_commits = read_parquet(con, data_glob)
 
     # add extracted_at column
-    gh_commits = gh_commits.pipe(add_extracted_at).pipe(constraints)
+    gh_commits = gh_commits.pipe(add_extracted_at)
 
     return gh_commits
 
 
-def gh_issues():
+def gh_issues(con=None):
     """Extract GitHub issues data."""
 
+    # use the default backend unless given a connection
+    con = con or ibis.get_backend()
+
     # read in raw data
-    data_glob = os.path.join(
-        DATA_DIR, RAW_DATA_DIR, RAW_DATA_GH_DIR, "repo_name=*", "issues.*.json"
-    )
-    gh_issues = ibis.read_json(data_glob)
+    data_glob = raw_data_glob(GH_ISSUES_TABLE)
+    check_legacy(GH_ISSUES_TABLE)
+    check_drift(GH_ISSUES_TABLE, data_glob)
+    gh_issues = read_parquet(con, data_glob)
 
     # add extracted_at column
-    gh_issues = gh_issues.pipe(add_extracted_at).pipe(constraints)
+    gh_issues = gh_issues.pipe(add_extracted_at)
 
     return gh_issues
 
 
-def gh_prs():
+def gh_prs(con=None):
     """Extract GitHub pull request (PR) data."""
 
+    # use the default backend unless given a connection
+    con = con or ibis.get_backend()
+
     # read in raw data
-    data_glob = os.path.join(
-        DATA_DIR, RAW_DATA_DIR, RAW_DATA_GH_DIR, "repo_name=*", "pullRequests.*.json"
-    )
-    gh_prs = ibis.read_json(data_glob)
+    data_glob = raw_data_glob(GH_PRS_TABLE)
+    check_legacy(GH_PRS_TABLE)
+    check_drift(GH_PRS_TABLE, data_glob)
+    gh_prs = read_parquet(con, data_glob)
 
     # add extracted_at column
-    gh_prs = gh_prs.pipe(add_extracted_at).pipe(constraints)
+    gh_prs = gh_prs.pipe(add_extracted_at)
 
     return gh_prs
 
 
-def gh_forks():
+def gh_forks(con=None):
     """Extract GitHub forks data."""
 
+    # use the default backend unless given a connection
+    con = con or ibis.get_backend()
+
     # read in raw data
-    data_glob = os.path.join(
-        DATA_DIR, RAW_DATA_DIR, RAW_DATA_GH_DIR, "repo_name=*", "forks.*.json"
-    )
-    gh_forks = ibis.read_json(data_glob)
+    data_glob = raw_data_glob(GH_FORKS_TABLE)
+    check_legacy(GH_FORKS_TABLE)
+    check_drift(GH_FORKS_TABLE, data_glob)
+    gh_forks = read_parquet(con, data_glob)
 
     # add extracted_at column
-    gh_forks = gh_forks.pipe(add_extracted_at).pipe(constraints)
+    gh_forks = gh_forks.pipe(add_extracted_at)
 
     return gh_forks
 
 
-def gh_stars():
+def gh_stars(con=None):
     """Extract GitHub stargazers data."""
 
+    # use the default backend unless given a connection
+    con = con or ibis.get_backend()
+
     # read in raw data
-    data_glob = os.path.join(
-        DATA_DIR, RAW_DATA_DIR, RAW_DATA_GH_DIR, "repo_name=*", "stargazers.*.json"
-    )
-    gh_stars = ibis.read_json(data_glob)
+    data_glob = raw_data_glob(GH_STARS_TABLE)
+    check_legacy(GH_STARS_TABLE)
+    check_drift(GH_STARS_TABLE, data_glob)
+    gh_stars = read_parquet(con, data_glob)
 
     # add extracted_at column
-    gh_stars = gh_stars.pipe(add_extracted_at).pipe(constraints)
+    gh_stars = gh_stars.pipe(add_extracted_at)
 
     return gh_stars
 
 
-def gh_watchers():
+def gh_watchers(con=None):
     """Extract GitHub watchers data."""
 
+    # use the default backend unless given a connection
+    con = con or ibis.get_backend()
+
     # read in raw data
-    data_glob = os.path.join(
-        DATA_DIR, RAW_DATA_DIR, RAW_DATA_GH_DIR, "repo_name=*", "watchers.*.json"
-    )
-    gh_watchers = ibis.read_json(data_glob)
+    data_glob = raw_data_glob(GH_WATCHERS_TABLE)
+    check_legacy(GH_WATCHERS_TABLE)
+    check_drift(GH_WATCHERS_TABLE, data_glob)
+    gh_watchers = read_parquet(con, data_glob)
 
     # add extracted_at column
-    gh_watchers = gh_watchers.pipe(add_extracted_at).pipe(constraints)
+    gh_watchers = gh_watchers.pipe(add_extracted_at)
 
     return gh_watchers
 
 
-def docs():
+def docs(con=None):
     """Extract documentation data."""
 
+    # use the default backend unless given a connection
+    con = con or ibis.get_backend()
+
     # read in raw data
-    data_glob = os.path.join(DATA_DIR, RAW_DATA_DIR, RAW_DATA_DOCS_DIR, "*.csv.gz")
-    docs = ibis.read_csv(data_glob)
+    data_glob = raw_data_glob(DOCS_TABLE)
+    check_drift(DOCS_TABLE, data_glob)
+    docs = read_csv(con, data_glob, DOCS_TABLE, header=True)
 
     # add extracted_at column
-    docs = docs.pipe(add_extracted_at).pipe(constraints)
+    docs = docs.pipe(add_extracted_at)
 
     return docs
 
 
-def zulip_members():
+def zulip_members(con=None):
     """Extract Zulip members data."""
 
+    # use the default backend unless given a connection
+    con = con or ibis.get_backend()
+
     # read in raw data
-    data_glob = os.path.join(DATA_DIR, RAW_DATA_DIR, RAW_DATA_ZULIP_DIR, "members.json")
-    zulip_members = ibis.read_json(data_glob)
+    data_glob = raw_data_glob(ZULIP_MEMBERS_TABLE)
+    check_drift(ZULIP_MEMBERS_TABLE, data_glob)
+    zulip_members = read_json(con, data_glob, ZULIP_MEMBERS_TABLE, format="array")
 
     # add extracted_at column
-    zulip_members = zulip_members.pipe(add_extracted_at).pipe(constraints)
+    zulip_members = zulip_members.pipe(add_extracted_at)
 
     return zulip_members
 
 
-def zulip_messages():
+def zulip_messages(con=None):
     """Extract Zulip messages data."""
 
+    # use the default backend unless given a connection
+    con = con or ibis.get_backend()
+
     # read in raw data
-    data_glob = os.path.join(
-        DATA_DIR, RAW_DATA_DIR, RAW_DATA_ZULIP_DIR, "messages.json"
-    )
-    zulip_messages = ibis.read_json(data_glob)
+    data_glob = raw_data_glob(ZULIP_MESSAGES_TABLE)
+    check_legacy(ZULIP_MESSAGES_TABLE)
+    check_drift(ZULIP_MESSAGES_TABLE, data_glob)
+    zulip_messages = read_segments(con, data_glob, ZULIP_MESSAGES_TABLE)
 
     # add extracted_at column
-    zulip_messages = zulip_messages.pipe(add_extracted_at).pipe(constraints)
+    zulip_messages = zulip_messages.pipe(add_extracted_at)
 
     return zulip_messages
+
+
+def pypi_downloads(con=None):
+    """Extract PyPI downloads data."""
+
+    # use the default backend unless given a connection
+    con = con or ibis.get_backend()
+
+    # read in raw data
+    data_glob = raw_data_glob(PYPI_DOWNLOADS_TABLE)
+    check_drift(PYPI_DOWNLOADS_TABLE, data_glob)
+    pypi_downloads = read_parquet(con, data_glob)
+
+    # add extracted_at column
+    pypi_downloads = pypi_downloads.pipe(add_extracted_at)
+
+    return pypi_downloads
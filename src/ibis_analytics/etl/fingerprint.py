@@ -0,0 +1,88 @@
+# imports
+import os
+import glob
+import json
+import hashlib
+
+from ibis_analytics.config import (
+    ROLLUPS,
+    COLD_COLUMNS,
+    NATURAL_KEYS,
+    TABLE_PARTITIONS,
+    TABLE_MONTH_COLUMNS,
+    DATA_QUALITY_CHECKS,
+)
+from ibis_analytics.catalog import table_layout
+from ibis_analytics.etl.extract import raw_data_glob
+from ibis_analytics.schemas import raw_schema_version
+
+# source files whose changes invalidate every table
+CODE_FILES = [
+    os.path.join(os.path.dirname(__file__), "extract.py"),
+    os.path.join(os.path.dirname(__file__), "transform.py"),
+    os.path.join(os.path.dirname(__file__), "validate.py"),
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "schemas.py"),
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "catalog.py"),
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "upload.py"),
+]
+
+
+# functions
+def code_version() -> str:
+    """Hash the code that builds, validates and writes every table."""
+
+    digest = hashlib.sha256()
+    for path in CODE_FILES:
+        with open(path, "rb") as f:
+            digest.update(f.read())
+
+    return digest.hexdigest()
+
+
+def input_files(table_name: str) -> list:
+    """List a table's raw input files with their sizes and mtimes."""
+
+    return [
+        [path, os.stat(path).st_size, os.stat(path).st_mtime_ns]
+        for path in sorted(glob.glob(raw_data_glob(table_name)))
+    ]
+
+
+def table_config(table_name: str) -> dict:
+    """Collect the configuration that shapes how a table is written and checked."""
+
+    return {
+        "natural_keys": NATURAL_KEYS.get(table_name),
+        "partitions": TABLE_PARTITIONS.get(table_name),
+        "month_column": TABLE_MONTH_COLUMNS.get(table_name),
+        "layout": table_layout(table_name),
+        "checks": DATA_QUALITY_CHECKS.get(table_name),
+        "cold_columns": COLD_COLUMNS.get(table_name),
+    }
+
+
+def fingerprint(table_name: str) -> str:
+    """
+    Fingerprint the inputs of a table.
+
+    Covers the table's raw file set (paths, sizes and mtimes), its raw schema
+    version, the code that builds, checks and writes it, and the
+    configuration of the table and its rollups, so any change to what the
+    ETL would read or how it builds the table produces a new fingerprint.
+    """
+
+    inputs = {
+        "files": input_files(table_name),
+        "schema_version": raw_schema_version(table_name),
+        "code_version": code_version(),
+        "config": table_config(table_name),
+        "rollups": {
+            name: [spec, table_config(name)]
+            for name, spec in ROLLUPS.items()
+            if spec[0] == table_name
+        },
+    }
+
+    return hashlib.sha256(
+        json.dumps(inputs, sort_keys=True, default=str).encode()
+    ).hexdigest()
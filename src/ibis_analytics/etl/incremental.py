@@ -0,0 +1,122 @@
+# imports
+import ibis
+
+from ibis_analytics.config import NATURAL_KEYS
+from ibis_analytics.etl.transform import RUNNING_TOTALS, key_index, last_totals
+
+
+# functions
+def table_key_index(t, table_name):
+    """Select the key index of a table with running totals."""
+
+    total, order_by, group_by = RUNNING_TOTALS[table_name]
+
+    return key_index(t, NATURAL_KEYS[table_name], order_by, group_by)
+
+
+def appendable(t, index, table_name):
+    """
+    Count the records an incremental run would append, or None if it can't.
+
+    `t` is the full transform of the current raw data and `index` the key
+    index of the persisted output. Appending is only equivalent to a full
+    recompute when every persisted record is still there with the same order
+    value, and every new record comes after the last persisted record of its
+    partition, i.e. no record arrived late, changed or disappeared.
+    """
+
+    total, order_by, group_by = RUNNING_TOTALS[table_name]
+
+    # look up each record's key in the index
+    keys = table_key_index(t, table_name)
+    seen = index.select("_key", _seen_at=index[order_by])
+    keys = keys.left_join(seen, "_key").drop("_key_right")
+    keys = last_totals(keys, index, order_by, group_by)
+
+    is_old = keys["_seen_at"].notnull()
+    is_changed = is_old & (keys[order_by] != keys["_seen_at"])
+    is_new = keys["_seen_at"].isnull() & (
+        (keys[order_by] > keys["_last"]) | keys["_last"].isnull()
+    )
+    counts = keys.aggregate(
+        by=group_by,
+        num_rows=ibis._.count(),
+        num_old=is_old.sum().fill_null(0),
+        num_changed=is_changed.sum().fill_null(0),
+        num_new=is_new.sum().fill_null(0),
+        seed=keys["_seed"].max().fill_null(0),
+    ).to_pyarrow()
+    num_indexed = index.count().to_pyarrow().as_py()
+
+    num_old = sum(counts["num_old"].to_pylist())
+    num_new = sum(counts["num_new"].to_pylist())
+    num_rows = sum(counts["num_rows"].to_pylist())
+
+    if any(counts["num_changed"].to_pylist()):
+        return None
+    if counts["num_old"].to_pylist() != counts["seed"].to_pylist():
+        return None
+    if num_old != num_indexed or num_old + num_new != num_rows:
+        return None
+
+    return num_new
+
+
+def verify(table_name, extract, transform, con=None, split=0.8):
+    """
+    Check that an incremental run reproduces a full recompute of a table.
+
+    The full transform of the raw data is split at the order value of the
+    `split` quantile: records up to it stand in for the persisted output of
+    an earlier run, and the rest are computed incrementally on top of it.
+    Returns a list of differences, empty when both runs agree.
+    """
+
+    con = con or ibis.get_backend()
+    total, order_by, group_by = RUNNING_TOTALS[table_name]
+
+    raw = extract(con)
+    full = con.create_table(f"_verify_{table_name}", transform(raw), temp=True)
+
+    num_rows = full.count().to_pyarrow().as_py()
+    if not num_rows:
+        return ["no records to verify"]
+
+    # persisted output of an earlier run: the full output up to the split
+    cutoff = (
+        full.order_by(order_by)
+        .select(order_by)
+        .limit(1, offset=int(num_rows * split))
+        .to_pyarrow()[order_by][0]
+        .as_py()
+    )
+    existing = full.filter(full[order_by] <= cutoff)
+    index = table_key_index(existing, table_name)
+
+    if appendable(full, index, table_name) is None:
+        return ["raw data is not append-only, incremental runs would rebuild"]
+
+    appended = transform(raw, existing=index).cast(full.schema())
+    combined = existing.union(appended.select(*full.columns), distinct=False)
+
+    # totals of tied records may be assigned in either order, so the totals
+    # are compared per partition and order value, and the records without them
+    differences = []
+    for columns in (
+        [*group_by, order_by, total],
+        [col for col in full.columns if col != total],
+    ):
+        a, b = full.select(*columns), combined.select(*columns)
+        missing = a.difference(b).count().to_pyarrow().as_py()
+        extra = b.difference(a).count().to_pyarrow().as_py()
+        if missing or extra:
+            differences.append(
+                f"{', '.join(columns[:3])}...: "
+                f"{missing} records missing, {extra} unexpected"
+            )
+
+    num_combined = combined.count().to_pyarrow().as_py()
+    if num_combined != num_rows:
+        differences.append(f"{num_combined} records, expected {num_rows}")
+
+    return differences
@@ -1,7 +1,14 @@
 # imports
+import os
+import ibis
 import typer
 
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
 from ibis_analytics.config import (
+    ETL_JOBS,
+    ROLLUPS,
+    COLD_COLUMNS,
     GH_PRS_TABLE,
     GH_FORKS_TABLE,
     GH_STARS_TABLE,
@@ -11,8 +18,9 @@ from ibis_analytics.config import (
     DOCS_TABLE,
     ZULIP_MEMBERS_TABLE,
     ZULIP_MESSAGES_TABLE,
+    PYPI_DOWNLOADS_TABLE,
 )
-from ibis_analytics.catalog import Catalog
+from ibis_analytics.catalog import Catalog, cold_table_name, split_cold_columns
 from ibis_analytics.etl.extract import (
     gh_prs as extract_gh_prs,
     gh_forks as extract_gh_forks,
@@ -23,8 +31,18 @@ from ibis_analytics.etl.extract import (
     docs as extract_docs,
     zulip_members as extract_zulip_members,
     zulip_messages as extract_zulip_messages,
+    pypi_downloads as extract_pypi_downloads,
+)
+from ibis_analytics.etl.validate import validate
+from ibis_analytics.etl.fingerprint import fingerprint
+from ibis_analytics.etl.incremental import (
+    appendable,
+    table_key_index,
+    verify as verify_incremental,
 )
 from ibis_analytics.etl.transform import (
+    RUNNING_TOTALS,
+    rollup,
     gh_prs as transform_gh_prs,
     gh_forks as transform_gh_forks,
     gh_stars as transform_gh_stars,
@@ -34,65 +52,280 @@ from ibis_analytics.etl.transform import (
     docs as transform_docs,
     zulip_members as transform_zulip_members,
     zulip_messages as transform_zulip_messages,
+    pypi_downloads as transform_pypi_downloads,
 )
 
 
+# pipelines: table name -> (extract, transform), by source
+GH_PIPELINES = {
+    GH_PRS_TABLE: (extract_gh_prs, transform_gh_prs),
+    GH_FORKS_TABLE: (extract_gh_forks, transform_gh_forks),
+    GH_STARS_TABLE: (extract_gh_stars, transform_gh_stars),
+    GH_ISSUES_TABLE: (extract_gh_issues, transform_gh_issues),
+    GH_COMMITS_TABLE: (extract_gh_commits, transform_gh_commits),
+    GH_WATCHERS_TABLE: (extract_gh_watchers, transform_gh_watchers),
+}
+DOCS_PIPELINES = {
+    DOCS_TABLE: (extract_docs, transform_docs),
+}
+ZULIP_PIPELINES = {
+    ZULIP_MEMBERS_TABLE: (extract_zulip_members, transform_zulip_members),
+    ZULIP_MESSAGES_TABLE: (extract_zulip_messages, transform_zulip_messages),
+}
+PYPI_PIPELINES = {
+    PYPI_DOWNLOADS_TABLE: (extract_pypi_downloads, transform_pypi_downloads),
+}
+
+
 # functions
-def main(gh: bool, docs, zulip: bool):
-    # instantiate catalog
+def load(catalog, t, table_name, mode="overwrite"):
+    """
+    Write a table to the catalog, validating its write statistics first.
+
+    Cold columns are written to the table's side table first, so every
+    record in the table has its cold columns to join. A table that fails
+    validation is rejected before readers see it, and its side table is
+    restored. Written tables are then compacted and vacuumed.
+    """
+
+    cold_version = None
+    if table_name in COLD_COLUMNS:
+        # both halves are written from one computation of the table
+        t, cold = split_cold_columns(t.cache(), table_name)
+        cold_version = catalog.write_cold_table(cold, table_name, mode=mode)
+
+    try:
+        # validate from the transaction log's statistics rather than rescanning
+        version = catalog.write_table(
+            t,
+            table_name,
+            mode=mode,
+            check=lambda stats: validate(table_name, stats),
+        )
+    except Exception:
+        if cold_version is not None:
+            catalog.restore_table(
+                cold_table_name(table_name), cold_version - 1 if cold_version else None
+            )
+        raise
+
+    # appends leave small files behind, and every write leaves the files it
+    # replaced; the table is already published, so failures only warn
+    written = [table_name]
+    if cold_version is not None:
+        written.append(cold_table_name(table_name))
+    for name in written:
+        try:
+            catalog.maintain_table(name, compact=(mode == "append"))
+        except Exception as e:
+            typer.echo(f"warning: maintaining {name} failed: {e}")
+
+    return version
+
+
+def write_manifest(catalog):
+    """Write the catalog manifest from every loaded table's transaction log."""
+
+    manifest = {}
+    for table_name in {
+        **GH_PIPELINES,
+        **DOCS_PIPELINES,
+        **ZULIP_PIPELINES,
+        **PYPI_PIPELINES,
+        **ROLLUPS,
+    }:
+        # tables that were never loaded are left out
+        if catalog.exists(table_name):
+            manifest[table_name] = catalog.table_manifest(table_name)
+
+    catalog.write_manifest(manifest)
+
+
+def memory_limit(jobs: int):
+    """Split DuckDB's default memory budget across concurrent pipelines."""
+
+    try:
+        total = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (AttributeError, ValueError, OSError):
+        return None
+
+    # DuckDB defaults to 80% of memory per connection
+    return f"{int(total * 0.8 / jobs) // (1024 * 1024)}MB"
+
+
+def run_pipeline(
+    table_name, extract, transform, jobs: int = 1, force=False, incremental=False
+):
+    """
+    Extract, transform and load one table on its own DuckDB connection.
+
+    Returns False without doing any work when the table's inputs match the
+    fingerprint of its last successful load. In incremental mode, tables with
+    running totals only append their new records when that gives the same
+    result as a full rebuild.
+    """
+
     catalog = Catalog()
+    cold_columns = COLD_COLUMNS.get(table_name, (None, None))[1]
+
+    # skip tables whose raw inputs and code are unchanged since the last load
+    inputs = fingerprint(table_name)
+    if not force and catalog.metadata(table_name).get("fingerprint") == inputs:
+        typer.echo(f"Skipping {table_name} (inputs unchanged)...")
+        return False
+
+    # DuckDB connections are not safe to share across threads
+    limit = memory_limit(jobs)
+    con = ibis.duckdb.connect(**({"memory_limit": limit} if limit else {}))
+
+    typer.echo(f"Extracting {table_name}...")
+    t = extract(con)
+
+    typer.echo(f"Transforming {table_name}...")
+    full = transform(t)
+
+    # continue running totals from the persisted table where possible
+    appended = None
+    if incremental and table_name in RUNNING_TOTALS:
+        index = catalog.key_index(table_name, con=con)
+        # a change to the cold columns changes the table's schema
+        if catalog.metadata(table_name).get("cold_columns") != cold_columns:
+            index = None
+        if index is not None:
+            appended = appendable(full, index, table_name)
+        if appended is None:
+            typer.echo(f"Cannot append to {table_name}, rebuilding...")
+
+    if appended is None:
+        typer.echo(f"Loading {table_name} into datalake...")
+        load(catalog, full, table_name)
+        written = catalog.table(table_name, con=con)
+        mode = "overwrite"
+    elif appended:
+        typer.echo(f"Appending {appended} records to {table_name}...")
+        # the new records are few; materialize them once to write and index
+        written = con.create_table(
+            f"_appended_{table_name}", transform(t, existing=index), temp=True
+        )
+        load(catalog, written, table_name, mode="append")
+        mode = "append"
+    else:
+        typer.echo(f"No new records for {table_name}...")
+        written = None
+
+    # rebuild the table's daily rollups from all of its records in the lake
+    if written is not None:
+        for rollup_name, (source, *spec) in ROLLUPS.items():
+            if source == table_name:
+                typer.echo(f"Rolling {table_name} up into {rollup_name}...")
+                t = rollup(catalog.table(table_name, con=con), *spec)
+                load(catalog, t, rollup_name)
+
+    # index the keys of what was written for later incremental runs
+    if table_name in RUNNING_TOTALS and written is not None:
+        catalog.write_key_index(
+            table_key_index(written, table_name), table_name, mode=mode
+        )
+
+    con.disconnect()
+
+    # only record the fingerprint once the table is written and validated
+    catalog.write_metadata(
+        table_name,
+        {
+            **catalog.metadata(table_name),
+            "fingerprint": inputs,
+            "cold_columns": cold_columns,
+        },
+    )
+
+    return True
+
+
+def main(
+    gh: bool,
+    docs,
+    zulip: bool,
+    pypi: bool = False,
+    jobs: int = ETL_JOBS,
+    force: bool = False,
+    incremental: bool = False,
+):
+    # collect the pipelines to run
+    pipelines = {
+        **(GH_PIPELINES if gh else {}),
+        **(DOCS_PIPELINES if docs else {}),
+        **(ZULIP_PIPELINES if zulip else {}),
+        **(PYPI_PIPELINES if pypi else {}),
+    }
+    jobs = max(1, min(jobs, len(pipelines) or 1))
+
+    # run each table's extract -> transform -> load independently, with at
+    # most `jobs` pipelines (and their memory) in flight at once
+    failed = []
+    skipped = []
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        futures = {
+            executor.submit(
+                run_pipeline,
+                table_name,
+                extract,
+                transform,
+                jobs=jobs,
+                force=force,
+                incremental=incremental,
+            ): table_name
+            for table_name, (extract, transform) in pipelines.items()
+        }
+        for future in as_completed(futures):
+            table_name = futures[future]
+            try:
+                if future.result():
+                    typer.echo(f"Finished {table_name}")
+                else:
+                    skipped.append(table_name)
+            except Exception as e:
+                typer.echo(f"error: {table_name} failed: {e}")
+                failed.append(table_name)
+
+    if skipped:
+        typer.echo(f"Skipped unchanged tables: {', '.join(sorted(skipped))}")
+
+    # failed tables keep their last good version, which the manifest describes
+    typer.echo("Writing catalog manifest...")
+    write_manifest(Catalog())
+
+    if failed:
+        raise RuntimeError(f"ETL failed for {', '.join(sorted(failed))}")
+
+
+def verify(gh: bool, zulip: bool):
+    """Verify that incremental runs of each table match a full rebuild."""
+
+    pipelines = {
+        **(GH_PIPELINES if gh else {}),
+        **(ZULIP_PIPELINES if zulip else {}),
+    }
+
+    failed = []
+    for table_name, (extract, transform) in pipelines.items():
+        if table_name not in RUNNING_TOTALS:
+            continue
+
+        typer.echo(f"Verifying {table_name}...")
+        con = ibis.duckdb.connect()
+        try:
+            differences = verify_incremental(table_name, extract, transform, con=con)
+        except Exception as e:
+            differences = [f"error: {e}"]
+        con.disconnect()
+
+        for difference in differences:
+            typer.echo(f"\t{difference}")
+        if differences:
+            failed.append(table_name)
+
+    if failed:
+        raise RuntimeError(f"Incremental ETL differs for {', '.join(failed)}")
 
-    # extract
-    if gh:
-        typer.echo("Extracting GitHub data...")
-        extract_gh_prs_t = extract_gh_prs()
-        extract_gh_forks_t = extract_gh_forks()
-        extract_gh_stars_t = extract_gh_stars()
-        extract_gh_issues_t = extract_gh_issues()
-        extract_gh_commits_t = extract_gh_commits()
-        extract_gh_watchers_t = extract_gh_watchers()
-
-    if docs:
-        typer.echo("Extracting docs data...")
-        extract_docs_t = extract_docs()
-
-    if zulip:
-        typer.echo("Extracting Zulip data...")
-        extract_zulip_members_t = extract_zulip_members()
-        extract_zulip_messages_t = extract_zulip_messages()
-
-    # transform
-    if gh:
-        typer.echo("Transforming GitHub data...")
-        transform_gh_prs_t = transform_gh_prs(extract_gh_prs_t)
-        transform_gh_forks_t = transform_gh_forks(extract_gh_forks_t)
-        transform_gh_stars_t = transform_gh_stars(extract_gh_stars_t)
-        transform_gh_issues_t = transform_gh_issues(extract_gh_issues_t)
-        transform_gh_commits_t = transform_gh_commits(extract_gh_commits_t)
-        transform_gh_watchers_t = transform_gh_watchers(extract_gh_watchers_t)
-
-    if docs:
-        typer.echo("Transforming docs data...")
-        transform_docs_t = transform_docs(extract_docs_t)
-
-    if zulip:
-        typer.echo("Transforming Zulip data...")
-        transform_zulip_members_t = transform_zulip_members(extract_zulip_members_t)
-        transform_zulip_messages_t = transform_zulip_messages(extract_zulip_messages_t)
-
-    # load
-    if gh:
-        typer.echo("Loading GitHub data into datalake...")
-        catalog.write_table(transform_gh_prs_t, GH_PRS_TABLE)
-        catalog.write_table(transform_gh_forks_t, GH_FORKS_TABLE)
-        catalog.write_table(transform_gh_stars_t, GH_STARS_TABLE)
-        catalog.write_table(transform_gh_issues_t, GH_ISSUES_TABLE)
-        catalog.write_table(transform_gh_commits_t, GH_COMMITS_TABLE)
-        catalog.write_table(transform_gh_watchers_t, GH_WATCHERS_TABLE)
-    if docs:
-        typer.echo("Loading docs data into datalake...")
-        catalog.write_table(transform_docs_t, DOCS_TABLE)
-    if zulip:
-        typer.echo("Loading Zulip data into datalake...")
-        catalog.write_table(transform_zulip_members_t, ZULIP_MEMBERS_TABLE)
-        catalog.write_table(transform_zulip_messages_t, ZULIP_MESSAGES_TABLE)
+    typer.echo("Incremental ETL matches a full rebuild")
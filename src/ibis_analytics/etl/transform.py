@@ -1,20 +1,146 @@
 # imports
 import ibis
-import ibis.selectors as s
+
+from ibis_analytics.config import (
+    NATURAL_KEYS,
+    GH_PRS_TABLE,
+    GH_FORKS_TABLE,
+    GH_STARS_TABLE,
+    GH_ISSUES_TABLE,
+    GH_COMMITS_TABLE,
+    GH_WATCHERS_TABLE,
+    DOCS_TABLE,
+    ZULIP_MEMBERS_TABLE,
+    ZULIP_MESSAGES_TABLE,
+    PYPI_DOWNLOADS_TABLE,
+)
+from ibis_analytics.etl.extract import SOURCE_FILE, SOURCE_ROW
+
+# running totals that can be continued incrementally, per table:
+# (total column, order column, partition columns)
+RUNNING_TOTALS = {
+    GH_COMMITS_TABLE: ("total_commits", "committed_date", ["repo_name"]),
+    GH_FORKS_TABLE: ("total_forks", "created_at", ["repo_name"]),
+    GH_STARS_TABLE: ("total_stars", "starred_at", ["repo_name"]),
+    GH_WATCHERS_TABLE: ("total_watchers", "updated_at", ["repo_name"]),
+    ZULIP_MEMBERS_TABLE: ("total_members", "date_joined", []),
+    ZULIP_MESSAGES_TABLE: ("total_messages", "timestamp", []),
+}
 
 
 # transform functions
-def preprocess(t):
-    """Common preprocessing steps."""
+def key_hash(t, key):
+    """Hash a table's natural key into a single integer."""
+
+    # hashes from another DuckDB version won't match the persisted key index,
+    # which makes incremental runs rebuild rather than append wrongly
+    return ibis.struct({col: t[col] for col in key}).hash()
+
+
+def key_index(t, key, order_by, group_by):
+    """Select the key index of a table: its partitions, key hashes and order."""
+
+    return t.select(*group_by, order_by, _key=key_hash(t, key))
+
+
+def preprocess(t, key, seen=None):
+    """
+    Common preprocessing steps.
+
+    Records are deduplicated on the table's natural key, keeping the version
+    from the latest raw file. Given the key index of the table's persisted
+    output, records whose key was already loaded are dropped as well.
+    """
 
     # ensure consistent column casing
     t = t.rename("snake_case")
-    # ensure unique records
-    t = t.distinct(on=~s.c("extracted_at"), keep="first").order_by("extracted_at")
+    # ensure unique records; files of later runs sort after earlier ones, and
+    # later rows of a file after earlier ones; text files have no row
+    # numbers, so their repeats are ordered by value to pick one the same way
+    # every run
+    source = [col for col in (SOURCE_FILE, SOURCE_ROW) if col in t.columns]
+    order_by = source
+    if SOURCE_ROW not in t.columns:
+        order_by = [
+            *source,
+            *[col for col in t.columns if col not in (*key, *source, "extracted_at")],
+        ]
+    t = t.filter(
+        ibis.row_number().over(
+            ibis.window(group_by=key, order_by=[ibis.desc(col) for col in order_by])
+        )
+        == 0
+    ).drop(*source)
+    # drop records already loaded
+    if seen is not None:
+        t = t.anti_join(seen, key_hash(t, key) == seen["_key"])
 
     return t
 
 
+def latest_version(t):
+    """Keep only the most recently updated version of each record."""
+
+    # incremental ingest ordered by update time can see the same issue or pull
+    # request in several runs, each with its state at the time
+    t = t.filter(
+        ibis.row_number().over(
+            ibis.window(group_by=["repo_name", "id"], order_by=ibis.desc("updated_at"))
+        )
+        == 0
+    )
+
+    return t
+
+
+def last_totals(t, existing, order_by, group_by):
+    """Join each record to the last persisted order value and total of its partition."""
+
+    last = existing.aggregate(
+        by=group_by,
+        _last=existing[order_by].max(),
+        _seed=existing.count(),
+    )
+
+    if not group_by:
+        return t.cross_join(last)
+
+    return t.left_join(last, group_by).drop(*[f"{col}_right" for col in group_by])
+
+
+def running_total(t, total, order_by, group_by, existing=None):
+    """
+    Add a running count of records per partition, in order.
+
+    Given the key index of the table's persisted output, the records are
+    taken to be new ones following the persisted records, and their counts
+    continue from their partition's persisted total.
+    """
+
+    window = ibis.window(
+        preceding=None, following=0, group_by=group_by or None, order_by=order_by
+    )
+
+    if existing is None:
+        return t.mutate(**{total: ibis._.count().over(window)})
+
+    t = last_totals(t, existing, order_by, group_by)
+    t = t.mutate(**{total: ibis._.count().over(window) + t["_seed"].fill_null(0)})
+
+    return t.drop("_last", "_seed")
+
+
+def rollup(t, timestamp, group_by, name, column=None):
+    """Roll a table up to daily counts of records, or sums of `column`, per group."""
+
+    # dates are days already
+    if t[timestamp].type().is_timestamp():
+        t = t.mutate(**{timestamp: t[timestamp].truncate("D")})
+    value = ibis._[column].sum() if column else ibis._.count()
+
+    return t.group_by(timestamp, *group_by).agg(**{name: value})
+
+
 def postprocess(t):
     """Common postprocessing steps."""
 
@@ -25,25 +151,18 @@ def postprocess(t):
 
 
 # transform data assets
-def gh_commits(gh_commits):
+def gh_commits(gh_commits, existing=None):
     """Transform GitHub commits data."""
 
     def transform(t):
-        t = t.unpack("node").unpack("author").rename("snake_case")
-        t = t.order_by(ibis._["committed_date"].desc())
-        t = t.mutate(
-            total_commits=ibis._.count().over(
-                ibis.window(
-                    preceding=None,
-                    following=0,
-                    group_by="repo_name",
-                    order_by="committed_date",
-                )
-            )
-        )
+        t = t.pipe(running_total, *RUNNING_TOTALS[GH_COMMITS_TABLE], existing)
         return t
 
-    gh_commits = gh_commits.pipe(preprocess).pipe(transform).pipe(postprocess)
+    gh_commits = (
+        gh_commits.pipe(preprocess, NATURAL_KEYS[GH_COMMITS_TABLE], existing)
+        .pipe(transform)
+        .pipe(postprocess)
+    )
     return gh_commits
 
 
@@ -55,8 +174,8 @@ def gh_issues(gh_issues):
             ibis.case().when(ibis._["is_closed"], "closed").else_("open").end()
         )
 
-        t = t.unpack("node").unpack("author").rename("snake_case")
-        t = t.mutate(is_closed=(ibis._["closed_at"] != None))
+        t = t.pipe(latest_version)
+        t = t.mutate(is_closed=ibis._["closed_at"].notnull())
         t = t.mutate(
             total_issues=ibis._.count().over(
                 ibis.window(
@@ -68,23 +187,21 @@ def gh_issues(gh_issues):
             )
         )
         t = t.mutate(state=issue_state)
-        t = (
-            t.mutate(
-                is_first_issue=(
-                    ibis.row_number().over(
-                        ibis.window(
-                            group_by=["login", "repo_name"], order_by="created_at"
-                        )
-                    )
-                    == 0
+        t = t.mutate(
+            is_first_issue=(
+                ibis.row_number().over(
+                    ibis.window(group_by=["login", "repo_name"], order_by="created_at")
                 )
+                == 0
             )
-            .relocate("repo_name", "login", "created_at")
-            .order_by(ibis.asc("repo_name"), t["created_at"].desc())
-        )
+        ).relocate("repo_name", "login", "created_at")
         return t
 
-    gh_issues = gh_issues.pipe(preprocess).pipe(transform).pipe(postprocess)
+    gh_issues = (
+        gh_issues.pipe(preprocess, NATURAL_KEYS[GH_ISSUES_TABLE])
+        .pipe(transform)
+        .pipe(postprocess)
+    )
     return gh_issues
 
 
@@ -100,9 +217,9 @@ def gh_prs(gh_prs):
             .end()
         )
 
-        t = t.unpack("node").unpack("author").rename("snake_case")
-        t = t.mutate(is_merged=(ibis._["merged_at"] != None))
-        t = t.mutate(is_closed=(ibis._["closed_at"] != None))
+        t = t.pipe(latest_version)
+        t = t.mutate(is_merged=ibis._["merged_at"].notnull())
+        t = t.mutate(is_closed=ibis._["closed_at"].notnull())
         t = t.mutate(
             total_pulls=ibis._.count().over(
                 ibis.window(
@@ -122,93 +239,69 @@ def gh_prs(gh_prs):
         #    )
         # )
         t = t.mutate(state=pull_state)
-        t = t.mutate(
-            merged_at=ibis._["merged_at"].cast("timestamp")
-        )  # TODO: temporary fix
 
         # add first pull by login
-        t = (
-            t.mutate(
-                is_first_pull=(
-                    ibis.row_number().over(
-                        ibis.window(
-                            group_by=["login", "repo_name"], order_by="created_at"
-                        )
-                    )
-                    == 0
+        t = t.mutate(
+            is_first_pull=(
+                ibis.row_number().over(
+                    ibis.window(group_by=["login", "repo_name"], order_by="created_at")
                 )
+                == 0
             )
-            .relocate("repo_name", "login", "created_at")
-            .order_by(ibis.asc("repo_name"), t["created_at"].desc())
-        )
+        ).relocate("repo_name", "login", "created_at")
         return t
 
-    gh_prs = gh_prs.pipe(preprocess).pipe(transform).pipe(postprocess)
+    gh_prs = (
+        gh_prs.pipe(preprocess, NATURAL_KEYS[GH_PRS_TABLE])
+        .pipe(transform)
+        .pipe(postprocess)
+    )
     return gh_prs
 
 
-def gh_forks(gh_forks):
+def gh_forks(gh_forks, existing=None):
     """Transform GitHub forks data."""
 
     def transform(t):
-        t = t.unpack("node").unpack("owner").rename("snake_case")
-        t = t.mutate(
-            total_forks=ibis._.count().over(
-                ibis.window(
-                    preceding=None,
-                    following=0,
-                    group_by="repo_name",
-                    order_by="created_at",
-                )
-            )
-        )
+        t = t.pipe(running_total, *RUNNING_TOTALS[GH_FORKS_TABLE], existing)
         return t
 
-    gh_forks = gh_forks.pipe(preprocess).pipe(transform).pipe(postprocess)
+    gh_forks = (
+        gh_forks.pipe(preprocess, NATURAL_KEYS[GH_FORKS_TABLE], existing)
+        .pipe(transform)
+        .pipe(postprocess)
+    )
     return gh_forks
 
 
-def gh_stars(gh_stars):
+def gh_stars(gh_stars, existing=None):
     """Transform GitHub stargazers data."""
 
     def transform(t):
-        t = t.unpack("node").rename("snake_case")
         t = t.mutate(company=ibis._["company"].fill_null("Unknown"))
-        t = t.mutate(
-            total_stars=ibis._.count().over(
-                ibis.window(
-                    preceding=None,
-                    following=0,
-                    group_by="repo_name",
-                    order_by="starred_at",
-                )
-            )
-        )
+        t = t.pipe(running_total, *RUNNING_TOTALS[GH_STARS_TABLE], existing)
         return t
 
-    gh_stars = gh_stars.pipe(preprocess).pipe(transform).pipe(postprocess)
+    gh_stars = (
+        gh_stars.pipe(preprocess, NATURAL_KEYS[GH_STARS_TABLE], existing)
+        .pipe(transform)
+        .pipe(postprocess)
+    )
     return gh_stars
 
 
-def gh_watchers(gh_watchers):
+def gh_watchers(gh_watchers, existing=None):
     """Transform GitHub watchers data."""
 
     def transform(t):
-        t = t.unpack("node").rename("snake_case")
-        t = t.mutate(
-            total_watchers=ibis._.count().over(
-                ibis.window(
-                    preceding=None,
-                    following=0,
-                    group_by="repo_name",
-                    order_by="updated_at",
-                )
-            )
-        )
-        t = t.order_by(ibis._["updated_at"].desc())
+        t = t.pipe(running_total, *RUNNING_TOTALS[GH_WATCHERS_TABLE], existing)
         return t
 
-    gh_watchers = gh_watchers.pipe(preprocess).pipe(transform).pipe(postprocess)
+    gh_watchers = (
+        gh_watchers.pipe(preprocess, NATURAL_KEYS[GH_WATCHERS_TABLE], existing)
+        .pipe(transform)
+        .pipe(postprocess)
+    )
     return gh_watchers
 
 
@@ -229,31 +322,33 @@ def docs(t):
         )
         return t
 
-    docs = t.pipe(preprocess).pipe(transform).pipe(postprocess)
+    docs = (
+        t.pipe(preprocess, NATURAL_KEYS[DOCS_TABLE]).pipe(transform).pipe(postprocess)
+    )
     return docs
 
 
-def zulip_members(t):
+def zulip_members(t, existing=None):
     """
     Transform the Zulip members data.
     """
 
     def transform(t):
         # t = t.mutate(date_joined=ibis._["date_joined"].cast("timestamp"))
-        t = t.filter(ibis._["is_bot"] == False)
-        t = t.mutate(
-            total_members=ibis._.count().over(
-                rows=(0, None), order_by=ibis.desc("date_joined")
-            )
-        )
+        t = t.filter(~ibis._["is_bot"])
+        t = t.pipe(running_total, *RUNNING_TOTALS[ZULIP_MEMBERS_TABLE], existing)
         t = t.relocate("full_name", "date_joined", "timezone")
         return t
 
-    zulip_members = t.pipe(preprocess).pipe(transform).pipe(postprocess)
+    zulip_members = (
+        t.pipe(preprocess, NATURAL_KEYS[ZULIP_MEMBERS_TABLE], existing)
+        .pipe(transform)
+        .pipe(postprocess)
+    )
     return zulip_members
 
 
-def zulip_messages(t):
+def zulip_messages(t, existing=None):
     """
     Transform the Zulip messages data.
     """
@@ -264,11 +359,7 @@ def zulip_messages(t):
             last_edit_timestamp=ibis._["last_edit_timestamp"].cast("timestamp"),
         )
         t = t.filter(ibis._["stream_id"] != 405931)
-        t = t.mutate(
-            total_messages=ibis._.count().over(
-                rows=(0, None), order_by=ibis.desc("timestamp")
-            )
-        )
+        t = t.pipe(running_total, *RUNNING_TOTALS[ZULIP_MESSAGES_TABLE], existing)
         t = t.relocate(
             "sender_full_name",
             "display_recipient",
@@ -278,5 +369,24 @@ def zulip_messages(t):
         )
         return t
 
-    zulip_messages = t.pipe(preprocess).pipe(transform).pipe(postprocess)
+    zulip_messages = (
+        t.pipe(preprocess, NATURAL_KEYS[ZULIP_MESSAGES_TABLE], existing)
+        .pipe(transform)
+        .pipe(postprocess)
+    )
     return zulip_messages
+
+
+def pypi_downloads(t):
+    """Transform PyPI downloads data."""
+
+    def transform(t):
+        t = t.relocate("date", "project")
+        return t
+
+    pypi_downloads = (
+        t.pipe(preprocess, NATURAL_KEYS[PYPI_DOWNLOADS_TABLE])
+        .pipe(transform)
+        .pipe(postprocess)
+    )
+    return pypi_downloads
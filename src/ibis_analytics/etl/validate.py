@@ -0,0 +1,68 @@
+# imports
+from datetime import datetime, timedelta, timezone
+
+from ibis_analytics.config import DATA_QUALITY_CHECKS
+
+
+# classes
+class ValidationError(ValueError):
+    """A table failed its data quality checks."""
+
+
+# functions
+def naive_utc(ts: datetime) -> datetime:
+    """Convert a timestamp, or a date, to naive UTC for comparison."""
+
+    if not isinstance(ts, datetime):
+        ts = datetime.combine(ts, datetime.min.time())
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+
+    return ts
+
+
+def check(table_name: str, stats: dict) -> list:
+    """Check table statistics against the table's configured assertions."""
+
+    checks = DATA_QUALITY_CHECKS.get(table_name, {})
+    num_rows = stats["num_rows"]
+    columns = stats["columns"]
+    failures = []
+
+    # row count
+    min_rows = checks.get("min_rows", 1)
+    if num_rows < min_rows:
+        failures.append(f"{num_rows} rows, expected at least {min_rows}")
+
+    # null rates
+    for name, max_null_rate in checks.get("max_null_rate", {}).items():
+        null_count = columns.get(name, {}).get("null_count")
+        if null_count is None:
+            failures.append(f"{name}: no null count statistics")
+            continue
+
+        null_rate = null_count / num_rows if num_rows else 0
+        if null_rate > max_null_rate:
+            failures.append(
+                f"{name}: null rate {null_rate:.2%} above {max_null_rate:.2%}"
+            )
+
+    # timestamp ranges
+    for name in checks.get("timestamps", []):
+        col = columns.get(name, {})
+        if col.get("max") is None:
+            failures.append(f"{name}: no min/max statistics")
+        elif naive_utc(col["max"]) > datetime.utcnow() + timedelta(days=1):
+            failures.append(f"{name}: max {col['max']} is in the future")
+
+    return failures
+
+
+def validate(table_name: str, stats: dict) -> dict:
+    """Raise a ValidationError unless a table passes its data quality checks."""
+
+    failures = check(table_name, stats)
+    if failures:
+        raise ValidationError(f"{table_name} failed validation: {'; '.join(failures)}")
+
+    return stats
@@ -0,0 +1,66 @@
+# imports
+import pyarrow as pa
+
+from datetime import datetime, timezone
+
+from ibis_analytics.schemas import GH_RAW_SCHEMAS, GH_RAW_FLATTEN
+
+
+# functions
+def parse_timestamp(value: str) -> datetime:
+    """Parse a GitHub ISO 8601 timestamp into a naive UTC datetime."""
+
+    ts = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+
+    return ts
+
+
+def convert(value, dtype: pa.DataType):
+    """Convert a decoded JSON value to match an Arrow type."""
+
+    if value is None:
+        return None
+
+    if pa.types.is_timestamp(dtype):
+        return parse_timestamp(value)
+
+    if pa.types.is_struct(dtype):
+        return {
+            dtype.field(i).name: convert(
+                value.get(dtype.field(i).name), dtype.field(i).type
+            )
+            for i in range(dtype.num_fields)
+        }
+
+    if pa.types.is_list(dtype):
+        return [convert(item, dtype.value_type) for item in value]
+
+    return value
+
+
+def flatten_edge(edge: dict, unpack: list) -> dict:
+    """Hoist the fields of nested structs into the top level of an edge."""
+
+    record = dict(edge)
+    for name in unpack:
+        nested = record.pop(name, None) or {}
+        record.update(nested)
+
+    return record
+
+
+def flatten_edges(query_name: str, edges: list) -> pa.RecordBatch:
+    """Convert a page of GraphQL edges into a flat Arrow record batch."""
+
+    schema = GH_RAW_SCHEMAS[query_name]
+    unpack = GH_RAW_FLATTEN[query_name]
+
+    records = [flatten_edge(edge, unpack) for edge in edges]
+    records = [
+        {field.name: convert(record.get(field.name), field.type) for field in schema}
+        for record in records
+    ]
+
+    return pa.RecordBatch.from_pylist(records, schema=schema)
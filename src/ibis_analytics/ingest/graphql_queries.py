@@ -1,8 +1,23 @@
 # query strings
 issues_query = """
-query($owner: String!, $repo: String!, $num_items: Int!, $cursor: String) {
+query(
+  $owner: String!,
+  $repo: String!,
+  $num_items: Int!,
+  $cursor: String,
+  $order_field: IssueOrderField = CREATED_AT
+) {
+  rateLimit {
+    cost
+    remaining
+    resetAt
+  }
   repository(owner: $owner, name: $repo) {
-    issues(first: $num_items, after: $cursor, orderBy: {field: CREATED_AT, direction: DESC}) {
+    issues(
+      first: $num_items,
+      after: $cursor,
+      orderBy: {field: $order_field, direction: DESC}
+    ) {
       edges {
         node {
           title
@@ -48,9 +63,24 @@ query($owner: String!, $repo: String!, $num_items: Int!, $cursor: String) {
 """
 
 pulls_query = """
-query($owner: String!, $repo: String!, $num_items: Int!, $cursor: String) {
+query(
+  $owner: String!,
+  $repo: String!,
+  $num_items: Int!,
+  $cursor: String,
+  $order_field: IssueOrderField = CREATED_AT
+) {
+  rateLimit {
+    cost
+    remaining
+    resetAt
+  }
   repository(owner: $owner, name: $repo) {
-    pullRequests(first: $num_items, after: $cursor, orderBy: {field: CREATED_AT, direction: DESC}) {
+    pullRequests(
+      first: $num_items,
+      after: $cursor,
+      orderBy: {field: $order_field, direction: DESC}
+    ) {
       edges {
         node {
           title
@@ -84,6 +114,11 @@ query($owner: String!, $repo: String!, $num_items: Int!, $cursor: String) {
 
 forks_query = """
 query($owner: String!, $repo: String!, $num_items: Int!, $cursor: String) {
+  rateLimit {
+    cost
+    remaining
+    resetAt
+  }
   repository(owner: $owner, name: $repo) {
     forks(first: $num_items, after: $cursor, orderBy: {field: CREATED_AT, direction: DESC}) {
       edges {
@@ -104,12 +139,23 @@ query($owner: String!, $repo: String!, $num_items: Int!, $cursor: String) {
 """
 
 commits_query = """
-query($owner: String!, $repo: String!, $num_items: Int!, $cursor: String) {
+query(
+  $owner: String!,
+  $repo: String!,
+  $num_items: Int!,
+  $cursor: String,
+  $since: GitTimestamp
+) {
+  rateLimit {
+    cost
+    remaining
+    resetAt
+  }
   repository(owner: $owner, name: $repo) {
     defaultBranchRef{
       target{
         ... on Commit{
-          history(first:$num_items, after:$cursor){
+          history(first:$num_items, after:$cursor, since:$since){
             edges{
               node{
                ... on Commit{
@@ -148,6 +194,11 @@ query($owner: String!, $repo: String!, $num_items: Int!, $cursor: String) {
 
 stargazers_query = """
 query($owner: String!, $repo: String!, $num_items: Int!, $cursor: String) {
+    rateLimit {
+        cost
+        remaining
+        resetAt
+    }
     repository(owner: $owner, name: $repo) {
         stargazers(first: $num_items, after: $cursor, orderBy: { field: STARRED_AT, direction: DESC }) {
             edges {
@@ -175,6 +226,11 @@ query($owner: String!, $repo: String!, $num_items: Int!, $cursor: String) {
 
 watchers_query = """
 query($owner: String!, $repo: String!, $num_items: Int!, $cursor: String) {
+    rateLimit {
+        cost
+        remaining
+        resetAt
+    }
     repository(owner: $owner, name: $repo) {
         watchers(first: $num_items, after: $cursor) {
             edges {
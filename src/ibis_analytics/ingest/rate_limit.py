@@ -0,0 +1,152 @@
+# imports
+import time
+import random
+import asyncio
+
+import logging as log
+
+from datetime import datetime
+
+
+# constants
+RETRYABLE_STATUS_CODES = (429, 500, 502, 503, 504)
+SECONDARY_RATE_LIMIT_WAIT = 60
+RESET_SLACK = 1
+
+
+# functions
+def parse_reset_at(reset_at: str) -> float:
+    """Parse a GraphQL `resetAt` timestamp into epoch seconds."""
+
+    return datetime.fromisoformat(reset_at.replace("Z", "+00:00")).timestamp()
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Exponential backoff with full jitter for the given retry attempt."""
+
+    return random.uniform(0, min(cap, base * 2**attempt))
+
+
+def is_secondary_rate_limit(resp) -> bool:
+    """Check whether a response hit GitHub's secondary rate limits."""
+
+    return (
+        resp.status_code in (403, 429) and "secondary rate limit" in resp.text.lower()
+    )
+
+
+def is_retryable(resp, json_data=None) -> bool:
+    """Check whether a failed response is worth retrying."""
+
+    if resp.status_code in RETRYABLE_STATUS_CODES:
+        return True
+
+    # primary rate limit exhausted or secondary rate limit hit
+    if resp.status_code == 403:
+        return (
+            is_secondary_rate_limit(resp)
+            or resp.headers.get("x-ratelimit-remaining") == "0"
+        )
+
+    # GraphQL reports an exhausted budget as an error in a 200 response
+    if resp.status_code == 200 and json_data:
+        errors = json_data.get("errors") or []
+        return any(error.get("type") == "RATE_LIMITED" for error in errors)
+
+    return False
+
+
+# classes
+class RateLimiter:
+    """
+    Pace GitHub requests from the remaining rate-limit budget.
+
+    The budget is updated from the `rateLimit { cost remaining resetAt }`
+    fields of each GraphQL response and from the `x-ratelimit-*` and
+    `retry-after` response headers. Requests go through without delay while
+    the budget is above the reserve; once it drops below, or a secondary rate
+    limit is hit, every stream waits for the window to reset.
+    """
+
+    def __init__(self, reserve: int = 100):
+        self.reserve = reserve
+        self.cost = 1
+        self.remaining = None
+        self.reset_at = None
+        self.retry_at = None
+        self._lock = asyncio.Lock()
+
+    def delay(self) -> float:
+        """Seconds to wait before the next request."""
+
+        now = time.time()
+
+        # honor an explicit retry-after first
+        if self.retry_at is not None and self.retry_at > now:
+            return self.retry_at - now
+
+        # no budget information yet
+        if self.remaining is None or self.reset_at is None:
+            return 0
+
+        # the window has reset (plus some slack), so the budget is refilled;
+        # the next response refreshes it
+        until_reset = self.reset_at + RESET_SLACK - now
+        if until_reset <= 0:
+            return 0
+
+        # enough budget left
+        if self.remaining - self.cost > self.reserve:
+            return 0
+
+        return until_reset
+
+    async def wait(self):
+        """Wait until the budget allows another request."""
+
+        # only the delay is computed under the lock, so streams don't queue
+        # behind one sleeper; the budget is checked again after sleeping, as
+        # other streams' responses may have refreshed it meanwhile
+        while True:
+            async with self._lock:
+                delay = self.delay()
+            if delay <= 0:
+                return
+
+            log.info(
+                f"\tRate limit budget low (remaining={self.remaining}); "
+                f"waiting {delay:.0f}s..."
+            )
+            await asyncio.sleep(delay)
+
+    def update(self, resp, json_data=None):
+        """Update the budget from a response and its decoded JSON body."""
+
+        remaining = resp.headers.get("x-ratelimit-remaining")
+        reset_at = resp.headers.get("x-ratelimit-reset")
+        retry_after = resp.headers.get("retry-after")
+
+        if remaining is not None and reset_at is not None:
+            self._update_budget(int(remaining), float(reset_at))
+
+        if json_data and (json_data.get("data") or {}).get("rateLimit"):
+            rate_limit = json_data["data"]["rateLimit"]
+            self.cost = max(rate_limit["cost"], self.cost)
+            self._update_budget(
+                rate_limit["remaining"], parse_reset_at(rate_limit["resetAt"])
+            )
+
+        if retry_after is not None:
+            self.retry_at = time.time() + float(retry_after)
+        elif is_secondary_rate_limit(resp):
+            # without a retry-after header, GitHub asks to wait at least a minute
+            self.retry_at = time.time() + SECONDARY_RATE_LIMIT_WAIT
+
+    def _update_budget(self, remaining: int, reset_at: float):
+        # responses from concurrent streams can arrive out of order, so only
+        # move to a newer window, or to a lower remaining count in this one
+        if self.reset_at is None or reset_at > self.reset_at:
+            self.remaining = remaining
+            self.reset_at = reset_at
+        elif reset_at == self.reset_at and remaining < self.remaining:
+            self.remaining = remaining
@@ -5,21 +5,39 @@ import time
 import httpx
 import zulip
 import typer
-import requests
+import ibis
+import asyncio
+import threading
 
 import logging as log
+import pyarrow.parquet as pq
 
+from datetime import date, datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
 
 from ibis_analytics.config import (
     GH_REPOS,
+    GH_MAX_CONCURRENCY,
+    GH_RATE_LIMIT_RESERVE,
+    GH_MAX_RETRIES,
+    GH_BACKOFF_BASE,
+    GH_BACKOFF_MAX,
+    RAW_SEGMENT_TARGET_BYTES,
+    GH_CHECKPOINT_PAGES,
     ZULIP_URL,
     DOCS_URL,
+    PYPI_PACKAGES,
+    PYPI_CLICKHOUSE,
+    PYPI_SOURCE_TABLE,
+    PYPI_INGEST_JOBS,
+    PYPI_DOWNLOADS_TABLE,
     DATA_DIR,
     RAW_DATA_DIR,
     RAW_DATA_GH_DIR,
     RAW_DATA_DOCS_DIR,
     RAW_DATA_ZULIP_DIR,
+    RAW_DATA_PYPI_DIR,
 )
 from ibis_analytics.ingest.graphql_queries import (
     issues_query,
@@ -29,13 +47,26 @@ from ibis_analytics.ingest.graphql_queries import (
     stargazers_query,
     watchers_query,
 )
+from ibis_analytics.schemas import GH_RAW_SCHEMAS, raw_schema
+from ibis_analytics.ingest.flatten import flatten_edges
+from ibis_analytics.ingest.segments import SegmentWriter, ParquetSegmentWriter
+from ibis_analytics.ingest.state import state_path, read_state, write_state
+from ibis_analytics.ingest.rate_limit import RateLimiter, backoff_delay, is_retryable
 
 # configure logger
 log.basicConfig(level=log.INFO)
 
 
 # main function
-def main(gh: bool, zulip: bool, docs: bool):
+def main(
+    gh: bool,
+    zulip: bool,
+    docs: bool,
+    pypi: bool = False,
+    full_refresh: bool = False,
+    updated: bool = False,
+    resume: bool = False,
+):
     """
     Ingest data.
     """
@@ -45,13 +76,21 @@ def main(gh: bool, zulip: bool, docs: bool):
     # ingest data
     if gh:
         typer.echo("Ingesting GitHub data...")
-        ingest_gh(gh_repos=GH_REPOS)
+        ingest_gh(
+            gh_repos=GH_REPOS,
+            full_refresh=full_refresh,
+            updated=updated,
+            resume=resume,
+        )
     if zulip:
         typer.echo("Ingesting Zulip data...")
         ingest_zulip(zulip_url=ZULIP_URL)
     if docs:
         typer.echo("Ingesting docs data...")
         ingest_docs(docs_url=DOCS_URL)
+    if pypi:
+        typer.echo("Ingesting PyPI data...")
+        ingest_pypi(pypi_packages=PYPI_PACKAGES, full_refresh=full_refresh)
 
 
 # helper functions
@@ -62,7 +101,9 @@ def write_json(data, filename):
 
 
 # ingest functions
-def ingest_gh(gh_repos):
+def ingest_gh(
+    gh_repos, full_refresh: bool = False, updated: bool = False, resume: bool = False
+):
     """
     Ingest GitHub data.
     """
@@ -90,118 +131,270 @@ def ingest_gh(gh_repos):
         "watchers": watchers_query,
     }
 
-    # define helper functions
-    def get_filename(query_name, page):
-        # return the filename
-        return f"{query_name}.{page:06}.json"
+    # map the field each query is sorted by (descending), used as the
+    # high-water mark for incremental ingest; watchers have no usable order
+    issue_sort_key = "updatedAt" if updated else "createdAt"
+    sort_keys = {
+        "issues": issue_sort_key,
+        "pullRequests": issue_sort_key,
+        "commits": "committedDate",
+        "forks": "createdAt",
+        "stargazers": "starredAt",
+        "watchers": None,
+    }
 
-    def get_next_link(link_header):
-        # if there is no link header, return None
-        if link_header is None:
-            return None
+    # identify this run so its pages never overwrite earlier runs' pages
+    run_id = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
 
-        # split the link header into links
-        links = link_header.split(", ")
-        for link in links:
-            # split the link into segments
-            segments = link.split("; ")
+    # define helper functions
+    def get_connection(json_data, query_name):
+        # return the paginated connection for the query
+        repository = json_data["data"]["repository"]
+        if query_name == "commits":
+            return repository["defaultBranchRef"]["target"]["history"]
+
+        return repository[query_name]
+
+    def get_sort_key(edge, sort_key):
+        # the sort key lives on the edge for stargazers, on the node otherwise
+        if sort_key in edge:
+            return edge[sort_key]
+
+        return (edge.get("node") or {}).get(sort_key)
+
+    def remove_previous_runs(output_dir, query_name, run_id):
+        # remove pages written by earlier runs of a fully refreshed stream
+        for filename in os.listdir(output_dir):
+            if filename.startswith(f"{query_name}.") and not filename.startswith(
+                f"{query_name}.{run_id}."
+            ):
+                os.remove(os.path.join(output_dir, filename))
+
+    async def post(client, limiter, semaphore, stream, query, variables):
+        # request a page, retrying transient errors and rate limits with
+        # jittered exponential backoff
+        for attempt in range(GH_MAX_RETRIES + 1):
+            # wait for rate-limit budget, then for a free connection
+            await limiter.wait()
+            try:
+                async with semaphore:
+                    resp = await client.post(
+                        GRAPH_URL,
+                        json={"query": query, "variables": variables},
+                    )
+            except httpx.TransportError as e:
+                error = f"{type(e).__name__}: {e}"
+            else:
+                # error pages are not always JSON
+                try:
+                    json_data = resp.json()
+                except json.JSONDecodeError:
+                    json_data = None
 
-            # if there are two segments and the second segment is rel="next"
-            if len(segments) == 2 and segments[1] == 'rel="next"':
-                # remove the < and > around the link
-                return segments[0].strip("<>")
+                limiter.update(resp, json_data)
+                if not is_retryable(resp, json_data):
+                    return resp, json_data
+                error = f"status code {resp.status_code}: {resp.text[:200]}"
 
-        # if there is no next link, return None
-        return None
+            if attempt == GH_MAX_RETRIES:
+                break
 
-    def fetch_data(client, owner, repo, query_name, query, output_dir, num_items=100):
+            delay = backoff_delay(attempt, GH_BACKOFF_BASE, GH_BACKOFF_MAX)
+            log.warning(
+                f"\t\t{stream}: {error}; retrying in {delay:.1f}s "
+                f"({attempt + 1}/{GH_MAX_RETRIES})..."
+            )
+            await asyncio.sleep(delay)
+
+        raise RuntimeError(f"giving up after {GH_MAX_RETRIES} retries ({error})")
+
+    async def fetch_data(
+        client,
+        limiter,
+        semaphore,
+        owner,
+        repo,
+        query_name,
+        query,
+        output_dir,
+        num_items=100,
+    ):
         # initialize variables
         variables = {
             "owner": owner,
             "repo": repo,
             "num_items": num_items,
-            "before": "null",
         }
+        stream = f"{owner}/{repo} {query_name}"
+        sort_key = sort_keys[query_name]
+        stream_full_refresh = full_refresh
+        stream_run_id = run_id
+        position = {}
+
+        # load the stream state from previous runs
+        path = state_path(output_dir, query_name)
+        state = read_state(path)
+        watermarks = state.setdefault("watermarks", {})
 
         # initialize page number
         page = 1
 
-        # while True
+        # continue from the last checkpoint of an interrupted run
+        checkpoint = state.get("checkpoint")
+        if resume and checkpoint and set(checkpoint.get("position", {})) != {"segment"}:
+            # checkpoints from before Parquet segments follow pages written in
+            # another format, which a resumed run can't continue
+            log.warning(f"\t\t{stream}: checkpoint predates Parquet segments")
+            checkpoint = None
+        if resume and checkpoint and checkpoint["sort_key"] == sort_key:
+            log.info(f"\t\t{stream}: resuming after page {checkpoint['page']}")
+            variables["cursor"] = checkpoint["cursor"]
+            page = checkpoint["page"] + 1
+            stream_run_id = checkpoint["run_id"]
+            position = checkpoint["position"]
+            stream_full_refresh = checkpoint["full_refresh"]
+
+        watermark = None if stream_full_refresh else watermarks.get(sort_key)
+        new_watermark = watermark
+        if resume and checkpoint and checkpoint["sort_key"] == sort_key:
+            new_watermark = checkpoint["watermark"]
+
+        if query_name in ("issues", "pullRequests"):
+            variables["order_field"] = "UPDATED_AT" if updated else "CREATED_AT"
+        if query_name == "commits" and watermark is not None:
+            variables["since"] = watermark
+
+        if watermark is not None:
+            log.info(f"\t\t{stream}: fetching records since {watermark}")
+
+        # flatten records into Parquet segments for this run
+        writer = ParquetSegmentWriter(
+            output_dir,
+            f"{query_name}.{stream_run_id}",
+            GH_RAW_SCHEMAS[query_name],
+            RAW_SEGMENT_TARGET_BYTES,
+            **position,
+        )
+
         while True:
-            # wait
-            time.sleep(0.1)
             # request data
             try:
-                log.info(f"\t\tFetching page {page}...")
-                resp = requests.post(
-                    GRAPH_URL,
-                    headers=headers,
-                    json={"query": query, "variables": variables},
+                log.info(f"\t\tFetching {stream} page {page}...")
+                resp, json_data = await post(
+                    client, limiter, semaphore, stream, query, variables
                 )
-                json_data = resp.json()
 
-                log.info(f"\t\t\tStatus code: {resp.status_code}")
-                # log.info(f"\t\t\tResponse: {resp.text}")
-                # log.info(f"\t\t\tJSON: {json_data}")
+                log.info(f"\t\t\t{stream} status code: {resp.status_code}")
 
                 if resp.status_code != 200:
                     log.error(
-                        f"\t\tFailed to fetch data for {owner}/{repo}; url={GRAPH_URL}\n\n {resp.status_code}\n {resp.text}"
+                        f"\t\tFailed to fetch data for {stream}; url={GRAPH_URL}\n\n"
+                        f" {resp.status_code}\n {resp.text}"
                     )
                     return
 
                 # extract data
-                if query_name == "commits":
-                    data = json_data["data"]["repository"]["defaultBranchRef"][
-                        "target"
-                    ]["history"]["edges"]
-                    # get the next link
-                    cursor = json_data["data"]["repository"]["defaultBranchRef"][
-                        "target"
-                    ]["history"]["pageInfo"]["endCursor"]
-                    has_next_page = json_data["data"]["repository"]["defaultBranchRef"][
-                        "target"
-                    ]["history"]["pageInfo"]["hasNextPage"]
-
-                else:
-                    data = json_data["data"]["repository"][query_name]["edges"]
-                    cursor = json_data["data"]["repository"][query_name]["pageInfo"][
-                        "endCursor"
-                    ]
-                    has_next_page = json_data["data"]["repository"][query_name][
-                        "pageInfo"
-                    ]["hasNextPage"]
-
-                # save json to a file
-                filename = get_filename(query_name, page)
-                output_path = os.path.join(output_dir, filename)
-                log.info(f"\t\tWriting data to {output_path}")
-
-                write_json(data, output_path)
+                connection = get_connection(json_data, query_name)
+                data = connection["edges"]
+                cursor = connection["pageInfo"]["endCursor"]
+                has_next_page = connection["pageInfo"]["hasNextPage"]
+
+                # drop records at or below the high-water mark; records equal
+                # to it are kept since they may share a timestamp with new ones
+                reached_watermark = False
+                if sort_key is not None:
+                    keys = [get_sort_key(edge, sort_key) for edge in data]
+                    if watermark is not None:
+                        reached_watermark = any(
+                            key is not None and key < watermark for key in keys
+                        )
+                        data = [
+                            edge
+                            for edge, key in zip(data, keys)
+                            if key is None or key >= watermark
+                        ]
+                    new_watermark = max(
+                        [key for key in keys + [new_watermark] if key is not None],
+                        default=None,
+                    )
+
+                # flatten the edges and buffer them into the current segment
+                committed = False
+                if data:
+                    committed = writer.write(flatten_edges(query_name, data))
+                    if committed:
+                        log.info(f"\t\t{stream}: committed segment through page {page}")
 
                 variables["cursor"] = f"{cursor}"
-                print(f"has_next_page={has_next_page}")
-                print(f"cursor={cursor}")
+                if reached_watermark:
+                    log.info(f"\t\t{stream}: reached high-water mark {watermark}")
+                    break
                 if not has_next_page:
                     break
 
+                # commit what's buffered every few pages, so a resumed run
+                # fetches at most that many pages again
+                if not committed and page % GH_CHECKPOINT_PAGES == 0:
+                    writer.flush()
+                    committed = True
+
+                # checkpoint the position once a segment has landed; pages
+                # still buffered are fetched again on resume
+                if committed:
+                    state["checkpoint"] = {
+                        "run_id": stream_run_id,
+                        "sort_key": sort_key,
+                        "full_refresh": stream_full_refresh,
+                        "page": page,
+                        "cursor": variables["cursor"],
+                        "position": writer.position(),
+                        "watermark": new_watermark,
+                    }
+                    write_state(path, state)
+
                 # increment page number
                 page += 1
             except Exception as e:
                 # print error if response
-                log.error(f"\t\tFailed to fetch data for {owner}/{repo}: {e}")
+                log.error(f"\t\tFailed to fetch data for {stream}: {e}")
 
                 try:
                     log.error(f"\t\t\tResponse: {resp.text}")
                 except Exception as e:
                     log.error(f"\t\t\tFailed to print response: {e}")
-                break
-
-    # create a requests session
-    with requests.Session() as client:
-        for repo in gh_repos:
-            log.info(f"Fetching data for {repo}...")
-            for query in queries:
+                return
+
+        # write the last, partially filled segment
+        output_path = writer.flush()
+        if output_path is not None:
+            log.info(f"\t\tWrote {stream} data to {output_path}")
+
+        # a full pass replaces what earlier runs wrote
+        if sort_key is None or stream_full_refresh:
+            remove_previous_runs(output_dir, query_name, stream_run_id)
+
+        # only advance the high-water mark once the stream completed, so a
+        # failed run never leaves a gap behind the mark
+        if sort_key is not None and new_watermark is not None:
+            watermarks[sort_key] = new_watermark
+        state.pop("checkpoint", None)
+        write_state(path, state)
+
+    async def fetch_all():
+        # share one pooled client and one rate-limit budget across all streams
+        limiter = RateLimiter(reserve=GH_RATE_LIMIT_RESERVE)
+        semaphore = asyncio.Semaphore(GH_MAX_CONCURRENCY)
+        limits = httpx.Limits(
+            max_connections=GH_MAX_CONCURRENCY,
+            max_keepalive_connections=GH_MAX_CONCURRENCY,
+        )
+        timeout = httpx.Timeout(60.0)
+
+        async with httpx.AsyncClient(
+            headers=headers, limits=limits, timeout=timeout
+        ) as client:
+            tasks = []
+            for repo in gh_repos:
                 owner, repo_name = repo.split("/")
                 output_dir = os.path.join(
                     DATA_DIR,
@@ -210,8 +403,25 @@ def ingest_gh(gh_repos):
                     f"repo_name={repo_name}",
                 )
                 os.makedirs(output_dir, exist_ok=True)
-                log.info(f"\tFetching data for {owner}/{repo_name} {query}...")
-                fetch_data(client, owner, repo_name, query, queries[query], output_dir)
+                for query in queries:
+                    log.info(f"\tScheduling {owner}/{repo_name} {query}...")
+                    tasks.append(
+                        fetch_data(
+                            client,
+                            limiter,
+                            semaphore,
+                            owner,
+                            repo_name,
+                            query,
+                            queries[query],
+                            output_dir,
+                        )
+                    )
+
+            # run the repo x query pagination streams concurrently
+            await asyncio.gather(*tasks)
+
+    asyncio.run(fetch_all())
 
 
 def ingest_zulip(zulip_url, zulip_email: str = "cody@dkdc.dev"):
@@ -240,8 +450,13 @@ def ingest_zulip(zulip_url, zulip_email: str = "cody@dkdc.dev"):
         log.info(f"Writing members to: {output_path}")
         write_json(members, output_path)
 
-    # get the messages
-    all_messages = []
+    # get the messages, streaming each page into compressed segments
+    output_dir = os.path.join(DATA_DIR, RAW_DATA_DIR, RAW_DATA_ZULIP_DIR)
+    os.makedirs(output_dir, exist_ok=True)
+    run_id = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+    writer = SegmentWriter(output_dir, f"messages.{run_id}", RAW_SEGMENT_TARGET_BYTES)
+
+    complete = False
     r = client.get_messages(
         {"anchor": "newest", "num_before": 100, "num_after": 0, "type": "stream"}
     )
@@ -249,7 +464,7 @@ def ingest_zulip(zulip_url, zulip_email: str = "cody@dkdc.dev"):
         log.error(f"Failed to get messages: {r}")
     else:
         messages = r["messages"]
-        all_messages.extend(messages)
+        writer.write(messages)
         while len(messages) > 1:
             r = client.get_messages(
                 {
@@ -264,15 +479,23 @@ def ingest_zulip(zulip_url, zulip_email: str = "cody@dkdc.dev"):
                 break
             else:
                 messages = r["messages"]
-                all_messages.extend(messages)
+                writer.write(messages)
+        else:
+            # the walk back reached the oldest message
+            complete = True
 
-        # write the messages to a file
-        filename = "messages.json"
-        output_dir = os.path.join(DATA_DIR, RAW_DATA_DIR, RAW_DATA_ZULIP_DIR)
-        os.makedirs(output_dir, exist_ok=True)
-        output_path = os.path.join(output_dir, filename)
-        log.info(f"Writing messages to: {output_path}")
-        write_json(all_messages, output_path)
+        log.info(f"Wrote messages to: {output_dir}")
+
+    # a complete history replaces earlier runs; a partial one is dropped so
+    # the earlier runs are kept
+    for filename in os.listdir(output_dir):
+        if not filename.startswith("messages."):
+            continue
+        from_this_run = filename.startswith(f"messages.{run_id}.")
+        if from_this_run != complete:
+            os.remove(os.path.join(output_dir, filename))
+    if not complete:
+        log.warning("Kept the messages of earlier runs, this run was incomplete")
 
 
 def ingest_docs(docs_url):
@@ -349,45 +572,107 @@ def ingest_docs(docs_url):
         return
 
 
-# def ingest_pypi(pypi_package):
-#     """
-#     Ingest PyPI data.
-#     """
-#     log.info(f"Fetching data for {pypi_package}...")
-#
-#     # define external source
-#     host = "clickpy-clickhouse.clickhouse.com"
-#     port = 443
-#     user = "play"
-#     database = "pypi"
-#
-#     ch_con = ibis.clickhouse.connect(
-#         host=host,
-#         port=port,
-#         user=user,
-#         database=database,
-#     )
-#
-#     # create output directory
-#     output_dir = os.path.join(DATA_DIR, RAW_DATA_DIR, "pypi")
-#     os.makedirs(output_dir, exist_ok=True)
-#
-#     # get table and metadata
-#     t = ch_con.table(
-#         "pypi_downloads_per_day_by_version_by_installer_by_type_by_country"
-#     ).filter(ibis._["project"] == pypi_package)
-#     min_date = t["date"].min().to_pyarrow().as_py()
-#     max_date = t["date"].max().to_pyarrow().as_py()
-#
-#     # write data to parquet files
-#     date = min_date
-#     while date <= max_date:
-#         old_date = date
-#         date += timedelta(days=7)
-#         a = t.filter(t["date"] >= old_date, t["date"] < date)
-#
-#         filename = f"start_date={old_date.strftime('%Y-%m-%d')}.parquet"
-#         log.info(f"\tWriting data to {os.path.join(output_dir, filename)}...")
-#         if a.count().to_pyarrow().as_py() > 0:
-#             a.to_parquet(os.path.join(output_dir, filename))
-#         log.info(f"\tData written to {os.path.join(output_dir, filename)}...")
+def week_start(day: date) -> date:
+    """Return the Monday of a date's week, which names its weekly file."""
+
+    return day - timedelta(days=day.weekday())
+
+
+def ingest_pypi(
+    pypi_packages, full_refresh: bool = False, jobs: int = PYPI_INGEST_JOBS
+):
+    """
+    Ingest PyPI download counts.
+
+    Each package's daily counts are mirrored from ClickHouse into one Parquet
+    file per week. The first run backfills every week, `jobs` weeks at a
+    time; later runs only fetch from the week of the last stored date on,
+    rewriting that week's file with the days it was missing.
+    """
+
+    # ClickHouse sessions run one query at a time, so each worker gets its own
+    connections = threading.local()
+
+    def source_table():
+        if not hasattr(connections, "con"):
+            connections.con = ibis.clickhouse.connect(**PYPI_CLICKHOUSE)
+
+        return connections.con.table(PYPI_SOURCE_TABLE)
+
+    def fetch_week(pypi_package, start, output_dir):
+        schema = raw_schema(PYPI_DOWNLOADS_TABLE)
+        t = source_table()
+        t = t.filter(
+            t["project"] == pypi_package,
+            t["date"] >= start,
+            t["date"] < start + timedelta(days=7),
+        )
+        # rows of a day may not be merged yet in the source, so sum them
+        t = t.group_by(*[col for col in schema.names if col != "count"]).agg(
+            count=t["count"].sum()
+        )
+        data = t.to_pyarrow().select(schema.names).cast(schema)
+        if not data.num_rows:
+            return None
+
+        # rename into place so the ETL never reads a partial file
+        output_path = os.path.join(output_dir, f"week={start.isoformat()}.parquet")
+        pq.write_table(data, f"{output_path}.tmp")
+        os.replace(f"{output_path}.tmp", output_path)
+
+        return output_path
+
+    for pypi_package in pypi_packages:
+        output_dir = os.path.join(
+            DATA_DIR, RAW_DATA_DIR, RAW_DATA_PYPI_DIR, f"project={pypi_package}"
+        )
+        os.makedirs(output_dir, exist_ok=True)
+        path = state_path(output_dir, "downloads")
+        state = read_state(path)
+
+        # continue from the last stored date, or backfill from the first one
+        t = source_table().filter(ibis._["project"] == pypi_package)
+        dates = t.agg(min_date=t["date"].min(), max_date=t["date"].max())
+        dates = dates.to_pyarrow().to_pylist()[0]
+        if dates["max_date"] is None:
+            log.warning(f"\tNo PyPI downloads for {pypi_package}")
+            continue
+
+        last_date = None if full_refresh else state.get("last_date")
+        if last_date is not None:
+            first_date = date.fromisoformat(last_date)
+            log.info(f"\t{pypi_package}: fetching downloads since {last_date}")
+        else:
+            first_date = dates["min_date"]
+            log.info(f"\t{pypi_package}: backfilling downloads since {first_date}")
+
+        weeks = []
+        start = week_start(first_date)
+        while start <= dates["max_date"]:
+            weeks.append(start)
+            start += timedelta(days=7)
+
+        with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+            futures = {
+                executor.submit(fetch_week, pypi_package, week, output_dir): week
+                for week in weeks
+            }
+            failed = []
+            for future in as_completed(futures):
+                try:
+                    output_path = future.result()
+                    if output_path is not None:
+                        log.info(f"\t\tWrote {pypi_package} data to {output_path}")
+                except Exception as e:
+                    week = futures[future]
+                    log.error(f"\t\tFailed to fetch {pypi_package} week {week}: {e}")
+                    failed.append(week)
+
+        # only advance the last stored date once every week has landed, so a
+        # failed run never leaves a gap behind it
+        if failed:
+            log.error(f"\t{pypi_package}: {len(failed)} weeks failed, not advancing")
+            continue
+
+        state["last_date"] = dates["max_date"].isoformat()
+        write_state(path, state)
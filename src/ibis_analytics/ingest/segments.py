@@ -0,0 +1,152 @@
+# imports
+import os
+import json
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+# functions
+def segment_filename(prefix: str, segment: int) -> str:
+    """Return the filename of a raw data segment."""
+
+    return f"{prefix}.{segment:06}.ndjson.zst"
+
+
+# classes
+class SegmentWriter:
+    """
+    Append records to size-bounded, zstd-compressed NDJSON segment files.
+
+    Each `write` call appends one self-contained zstd frame to the current
+    segment, so a segment stays readable after every write and can be
+    truncated back to a recorded offset when resuming. A new segment is
+    started once the current one reaches `target_bytes`.
+    """
+
+    def __init__(
+        self,
+        output_dir: str,
+        prefix: str,
+        target_bytes: int,
+        segment: int = 1,
+        offset: int = 0,
+    ):
+        self.output_dir = output_dir
+        self.prefix = prefix
+        self.target_bytes = target_bytes
+        self.segment = segment
+        self.offset = offset
+
+        # drop anything written past the recorded position, e.g. a partial
+        # frame from an interrupted run
+        path = self.path()
+        if os.path.exists(path) and os.path.getsize(path) > offset:
+            with open(path, "r+b") as f:
+                f.truncate(offset)
+
+    def path(self) -> str:
+        """Return the path of the current segment."""
+
+        return os.path.join(
+            self.output_dir, segment_filename(self.prefix, self.segment)
+        )
+
+    def position(self) -> dict:
+        """Return the current segment and byte offset."""
+
+        return {"segment": self.segment, "offset": self.offset}
+
+    def write(self, records: list) -> str:
+        """Append records to the current segment and return its path."""
+
+        path = self.path()
+        if not records:
+            return path
+
+        data = "".join(
+            json.dumps(record, separators=(",", ":")) + "\n" for record in records
+        )
+        frame = pa.compress(data.encode(), codec="zstd", asbytes=True)
+
+        with open(path, "ab") as f:
+            f.write(frame)
+            self.offset = f.tell()
+
+        # roll over to a new segment once the target size is reached
+        if self.offset >= self.target_bytes:
+            self.segment += 1
+            self.offset = 0
+
+        return path
+
+
+class ParquetSegmentWriter:
+    """
+    Buffer Arrow record batches into size-bounded Parquet segment files.
+
+    Batches are held in memory until they reach `target_bytes`, then written
+    as one segment. Segments are written to a temporary file and renamed into
+    place, so readers never see a partial file. `write` reports whether a
+    segment was committed, which is the only point a resumed run can safely
+    continue from.
+    """
+
+    def __init__(
+        self,
+        output_dir: str,
+        prefix: str,
+        schema: pa.Schema,
+        target_bytes: int,
+        segment: int = 1,
+    ):
+        self.output_dir = output_dir
+        self.prefix = prefix
+        self.schema = schema
+        self.target_bytes = target_bytes
+        self.segment = segment
+        self.batches = []
+        self.nbytes = 0
+
+        # drop a segment left half-written by an interrupted run
+        if os.path.exists(f"{self.path()}.tmp"):
+            os.remove(f"{self.path()}.tmp")
+
+    def path(self) -> str:
+        """Return the path of the current segment."""
+
+        return os.path.join(self.output_dir, f"{self.prefix}.{self.segment:06}.parquet")
+
+    def position(self) -> dict:
+        """Return the next segment to be written."""
+
+        return {"segment": self.segment}
+
+    def write(self, batch: pa.RecordBatch) -> bool:
+        """Buffer a batch, committing a segment once the target is reached."""
+
+        self.batches.append(batch)
+        self.nbytes += batch.nbytes
+
+        if self.nbytes >= self.target_bytes:
+            self.flush()
+            return True
+
+        return False
+
+    def flush(self):
+        """Write the buffered batches as a segment, returning its path."""
+
+        if not self.batches:
+            return None
+
+        path = self.path()
+        table = pa.Table.from_batches(self.batches, schema=self.schema)
+        pq.write_table(table, f"{path}.tmp", compression="zstd")
+        os.replace(f"{path}.tmp", path)
+
+        self.segment += 1
+        self.batches = []
+        self.nbytes = 0
+
+        return path
@@ -0,0 +1,33 @@
+# imports
+import os
+import json
+
+
+# functions
+def state_path(output_dir: str, query_name: str) -> str:
+    """Return the state file path for a (repo, query) stream."""
+
+    return os.path.join(output_dir, "_state", f"{query_name}.json")
+
+
+def read_state(path: str) -> dict:
+    """Read a stream state file, returning an empty state if missing."""
+
+    if not os.path.exists(path):
+        return {}
+
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_state(path: str, state: dict) -> None:
+    """Atomically write a stream state file."""
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    # write to a temporary file and swap it in so a crash never leaves a
+    # partially written state file behind
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
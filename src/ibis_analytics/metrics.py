@@ -1,16 +1,113 @@
 # imports
 import ibis
 
+from datetime import datetime, timedelta, timezone
+
 
 # define metrics
 def get_categories(t: ibis.Table, column: str) -> list:
     return t.select(column).distinct()[column].to_pyarrow().to_pylist()
 
 
-def total(t: ibis.Table) -> int:
+def total(t: ibis.Table, stats: dict = None) -> int:
+    # the catalog manifest already has the row count of whole tables
+    if stats is not None:
+        return stats["num_rows"]
+
     return t.count().to_pyarrow().as_py()
 
 
+def in_range(t: ibis.Table, column: str, start_date, end_date) -> ibis.Table:
+    """
+    Filter a table to the days from `start_date` through `end_date`.
+
+    The end day is included whole, whether the column holds timestamps or
+    days, so a table and its daily rollup cover the same records.
+    """
+
+    # compare the column itself so row group statistics can skip data
+    return t.filter(t[column] >= start_date, t[column] < end_date + timedelta(days=1))
+
+
+def total_in_range(t: ibis.Table, months: dict, start_date, end_date) -> int:
+    """
+    Count the records of a month-partitioned table filtered to a date range.
+
+    `t` is filtered with `in_range`, and `months` maps each month of the
+    unfiltered table to its row count and timestamp range, as recorded in the
+    catalog manifest. Months entirely inside the range are counted from it,
+    so only the months at the edges of the range are counted from `t`, and
+    none when the range covers them.
+    """
+
+    if months is None:
+        return total(t)
+
+    start, last_day = _timestamp(start_date), _timestamp(end_date)
+    end = last_day + timedelta(days=1)
+    num_rows = 0
+    partial = []
+    for month, stats in months.items():
+        if not start.strftime("%Y-%m") <= month <= last_day.strftime("%Y-%m"):
+            continue
+
+        # the log truncates timestamps to milliseconds, so the end is exclusive
+        if (
+            stats["min"] is not None
+            and stats["max"] is not None
+            and start <= _timestamp(stats["min"])
+            and _timestamp(stats["max"]) < end
+        ):
+            num_rows += stats["num_rows"]
+        else:
+            partial.append(month)
+
+    if partial:
+        num_rows += total(t.filter(t["month"].isin(partial)))
+
+    return num_rows
+
+
+def counts(
+    t: ibis.Table,
+    ts_col: str,
+    name: str,
+    unit: str = "D",
+    by=None,
+    column: str = None,
+) -> ibis.Table:
+    """
+    Count records per `unit` of time ("D", "W", "M", "Q" or "Y") and group.
+
+    `column` is summed instead of counting records if given. Daily rollups
+    have their counts in `name` already, so any grain from a day up is
+    summed from those rather than from the records.
+    """
+
+    by = [by] if isinstance(by, str) else list(by or [])
+    if name in t.columns:
+        value = ibis._[name].sum()
+    elif column is not None:
+        value = ibis._[column].sum()
+    else:
+        value = ibis._.count()
+
+    t = t.mutate(**{ts_col: t[ts_col].truncate(unit)})
+
+    return t.group_by(ts_col, *by).agg(**{name: value})
+
+
+def _timestamp(value) -> datetime:
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if not isinstance(value, datetime):
+        value = datetime.combine(value, datetime.min.time())
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+
+    return value
+
+
 def _densify(t: ibis.Table, ts_col: str, agg_col: str) -> ibis.Table:
     ts = (
         ibis.range(
@@ -29,11 +126,7 @@ def _densify(t: ibis.Table, ts_col: str, agg_col: str) -> ibis.Table:
 
 
 def stars_rolling(t: ibis.Table, days: int = 28) -> ibis.Table:
-    t = (
-        t.mutate(starred_at=t["starred_at"].truncate("D"))
-        .group_by("starred_at")
-        .agg(stars=ibis._.count())
-    )
+    t = counts(t, "starred_at", "stars")
     t = _densify(t, "starred_at", "stars")
     t = t.select(
         timestamp="starred_at",
@@ -49,7 +142,7 @@ def downloads_rolling(t: ibis.Table, days: int = 28) -> ibis.Table:
     t = t.mutate(
         timestamp=t["date"].cast("timestamp"),
     )
-    t = t.group_by("timestamp").agg(downloads=ibis._["count"].sum())
+    t = counts(t, "timestamp", "downloads", column="count")
     t = t.select(
         "timestamp",
         rolling_downloads=ibis._["downloads"]
@@ -77,7 +170,7 @@ def downloads_rolling_by_version(
         else t["version"],
         timestamp=t["date"].cast("timestamp"),
     )
-    t = t.group_by("timestamp", "version").agg(downloads=ibis._["count"].sum())
+    t = counts(t, "timestamp", "downloads", by="version", column="count")
     t = t.filter(~t["version"].startswith("v"))
     t = t.filter(~t["version"].contains("dev"))
     t = t.select(
@@ -100,9 +193,9 @@ def downloads_rolling_by_version(
 
 def docs_rolling(t: ibis.Table, days: int = 28) -> ibis.Table:
     t = t.mutate(
-        timestamp=t["timestamp"].cast("timestamp").truncate("D"),
+        timestamp=t["timestamp"].cast("timestamp"),
     )
-    t = t.group_by("timestamp").agg(docs=ibis._.count())
+    t = counts(t, "timestamp", "docs")
     t = t.select(
         "timestamp",
         rolling_docs=ibis._["docs"]
@@ -121,9 +214,9 @@ def docs_rolling(t: ibis.Table, days: int = 28) -> ibis.Table:
 
 def docs_rolling_by_path(t: ibis.Table, days: int = 28) -> ibis.Table:
     t = t.mutate(
-        timestamp=t["timestamp"].cast("timestamp").truncate("D"),
+        timestamp=t["timestamp"].cast("timestamp"),
     )
-    t = t.group_by("timestamp", "path").agg(docs=ibis._.count())
+    t = counts(t, "timestamp", "docs", by="path")
     t = t.select(
         "timestamp",
         "path",
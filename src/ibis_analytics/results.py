@@ -0,0 +1,115 @@
+# imports
+import os
+import ibis
+import glob
+import time
+import uuid
+import hashlib
+
+import pyarrow as pa
+
+from ibis_analytics.config import (
+    RESULT_CACHE_DIR,
+    RESULT_CACHE_TTL,
+    RESULT_CACHE_MAX_BYTES,
+)
+
+
+# classes
+class ResultCache:
+    """
+    Local disk cache of query results, keyed by the query's compiled SQL.
+
+    Results are stored as Arrow IPC files and reused for `ttl` seconds after
+    they were fetched; least recently used results are evicted once the
+    cache grows past `max_bytes`. Every process using the same directory
+    shares the results. Queries can target any backend, so a local DuckDB
+    table can stand in for a remote source.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str = RESULT_CACHE_DIR,
+        ttl: float = RESULT_CACHE_TTL,
+        max_bytes: int = RESULT_CACHE_MAX_BYTES,
+    ):
+        self.cache_dir = os.path.expanduser(cache_dir)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+
+    def key(self, t: ibis.Table) -> str:
+        """Return the cache key of a query."""
+
+        backend = ibis.get_backend(t)
+        sql = ibis.to_sql(t, dialect=backend.name)
+
+        return hashlib.sha256(f"{backend.name}\n{sql}".encode()).hexdigest()
+
+    def path(self, key: str) -> str:
+        """Return the path of a cached result."""
+
+        return os.path.join(self.cache_dir, f"{key}.arrow")
+
+    def fetch(self, t: ibis.Table) -> pa.Table:
+        """Return the result of a query, running it only if not cached."""
+
+        path = self.path(self.key(t))
+        now = time.time()
+
+        # a result's mtime is when it was fetched and its atime its last use
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            stat = None
+        if stat is not None and now - stat.st_mtime < self.ttl:
+            try:
+                os.utime(path, (now, stat.st_mtime))
+                return pa.ipc.open_file(pa.memory_map(path)).read_all()
+            except FileNotFoundError:
+                # evicted by another process in the meantime
+                pass
+
+        result = t.to_pyarrow()
+
+        # rename into place so other processes never read a partial file
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with pa.OSFile(tmp_path, "wb") as sink:
+            with pa.ipc.new_file(sink, result.schema) as writer:
+                writer.write_table(result)
+        os.replace(tmp_path, path)
+
+        self.evict()
+
+        return result
+
+    def evict(self):
+        """Remove expired results, then least recently used ones past the size."""
+
+        now = time.time()
+        entries = []
+        for path in glob.glob(os.path.join(self.cache_dir, "*.arrow")):
+            try:
+                stat = os.stat(path)
+                if now - stat.st_mtime >= self.ttl:
+                    os.remove(path)
+                else:
+                    entries.append((stat.st_atime, stat.st_size, path))
+            except FileNotFoundError:
+                continue
+
+        size = sum(entry[1] for entry in entries)
+        for _, entry_size, path in sorted(entries):
+            if size <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            size -= entry_size
+
+    def clear(self):
+        """Remove every cached result."""
+
+        for path in glob.glob(os.path.join(self.cache_dir, "*.arrow")):
+            os.remove(path)
@@ -0,0 +1,345 @@
+# imports
+import json
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from ibis_analytics.config import (
+    GH_PRS_TABLE,
+    GH_FORKS_TABLE,
+    GH_STARS_TABLE,
+    GH_ISSUES_TABLE,
+    GH_COMMITS_TABLE,
+    GH_WATCHERS_TABLE,
+    DOCS_TABLE,
+    ZULIP_MEMBERS_TABLE,
+    ZULIP_MESSAGES_TABLE,
+    PYPI_DOWNLOADS_TABLE,
+)
+
+# common types
+label_type = pa.struct(
+    [
+        (
+            "edges",
+            pa.list_(pa.struct([("node", pa.struct([("name", pa.string())]))])),
+        )
+    ]
+)
+comment_type = pa.struct(
+    [
+        (
+            "edges",
+            pa.list_(
+                pa.struct(
+                    [
+                        (
+                            "node",
+                            pa.struct(
+                                [
+                                    ("body", pa.string()),
+                                    ("author", pa.struct([("login", pa.string())])),
+                                ]
+                            ),
+                        )
+                    ]
+                )
+            ),
+        )
+    ]
+)
+git_actor_type = pa.struct(
+    [
+        ("name", pa.string()),
+        ("email", pa.string()),
+        ("date", pa.timestamp("us")),
+    ]
+)
+
+# raw GitHub schemas, one per GraphQL query, with the edge's `node` and the
+# node's `author`/`owner` already flattened into top-level columns
+GH_RAW_SCHEMAS = {
+    "issues": pa.schema(
+        [
+            ("title", pa.string()),
+            ("number", pa.int64()),
+            ("id", pa.string()),
+            ("url", pa.string()),
+            ("labels", label_type),
+            ("state", pa.string()),
+            ("stateReason", pa.string()),
+            ("closed", pa.bool_()),
+            ("body", pa.string()),
+            ("comments", comment_type),
+            ("createdAt", pa.timestamp("us")),
+            ("updatedAt", pa.timestamp("us")),
+            ("closedAt", pa.timestamp("us")),
+            ("login", pa.string()),
+        ]
+    ),
+    "pullRequests": pa.schema(
+        [
+            ("title", pa.string()),
+            ("number", pa.int64()),
+            ("id", pa.string()),
+            ("url", pa.string()),
+            ("labels", label_type),
+            ("createdAt", pa.timestamp("us")),
+            ("updatedAt", pa.timestamp("us")),
+            ("closedAt", pa.timestamp("us")),
+            ("mergedAt", pa.timestamp("us")),
+            ("login", pa.string()),
+        ]
+    ),
+    "commits": pa.schema(
+        [
+            ("id", pa.string()),
+            ("message", pa.string()),
+            ("name", pa.string()),
+            ("email", pa.string()),
+            ("date", pa.timestamp("us")),
+            ("committer", git_actor_type),
+            ("authoredDate", pa.timestamp("us")),
+            ("committedDate", pa.timestamp("us")),
+            ("additions", pa.int64()),
+            ("deletions", pa.int64()),
+            ("messageHeadline", pa.string()),
+            ("messageBody", pa.string()),
+        ]
+    ),
+    "forks": pa.schema(
+        [
+            ("login", pa.string()),
+            ("name", pa.string()),
+            ("createdAt", pa.timestamp("us")),
+            ("updatedAt", pa.timestamp("us")),
+        ]
+    ),
+    "stargazers": pa.schema(
+        [
+            ("starredAt", pa.timestamp("us")),
+            ("id", pa.string()),
+            ("login", pa.string()),
+            ("name", pa.string()),
+            ("bio", pa.string()),
+            ("company", pa.string()),
+            ("createdAt", pa.timestamp("us")),
+            ("updatedAt", pa.timestamp("us")),
+        ]
+    ),
+    "watchers": pa.schema(
+        [
+            ("id", pa.string()),
+            ("login", pa.string()),
+            ("name", pa.string()),
+            ("company", pa.string()),
+            ("createdAt", pa.timestamp("us")),
+            ("updatedAt", pa.timestamp("us")),
+        ]
+    ),
+}
+
+# nested structs hoisted into top-level columns, in order, for each query
+GH_RAW_FLATTEN = {
+    "issues": ["node", "author"],
+    "pullRequests": ["node", "author"],
+    "commits": ["node", "author"],
+    "forks": ["node", "owner"],
+    "stargazers": ["node"],
+    "watchers": ["node"],
+}
+
+# raw Zulip and docs schemas
+zulip_members_schema = pa.schema(
+    [
+        ("user_id", pa.int64()),
+        ("email", pa.string()),
+        ("full_name", pa.string()),
+        ("date_joined", pa.timestamp("us")),
+        ("is_active", pa.bool_()),
+        ("is_owner", pa.bool_()),
+        ("is_admin", pa.bool_()),
+        ("is_guest", pa.bool_()),
+        ("is_bot", pa.bool_()),
+        ("role", pa.int64()),
+        ("timezone", pa.string()),
+        ("avatar_url", pa.string()),
+    ]
+)
+zulip_messages_schema = pa.schema(
+    [
+        ("id", pa.int64()),
+        ("sender_id", pa.int64()),
+        ("sender_full_name", pa.string()),
+        ("sender_email", pa.string()),
+        ("content", pa.string()),
+        ("content_type", pa.string()),
+        ("client", pa.string()),
+        ("display_recipient", pa.string()),
+        ("stream_id", pa.int64()),
+        ("recipient_id", pa.int64()),
+        ("subject", pa.string()),
+        ("timestamp", pa.int64()),
+        ("last_edit_timestamp", pa.int64()),
+        ("type", pa.string()),
+        ("is_me_message", pa.bool_()),
+        ("flags", pa.list_(pa.string())),
+    ]
+)
+docs_schema = pa.schema(
+    [
+        ("2Path", pa.string()),
+        ("Title", pa.string()),
+        ("Event", pa.bool_()),
+        ("UserAgent", pa.string()),
+        ("Browser", pa.string()),
+        ("System", pa.string()),
+        ("Session", pa.string()),
+        ("Bot", pa.int64()),
+        ("Referrer", pa.string()),
+        ("Referrer scheme", pa.string()),
+        ("Screen size", pa.string()),
+        ("Location", pa.string()),
+        ("FirstVisit", pa.bool_()),
+        ("Date", pa.timestamp("us")),
+    ]
+)
+
+# raw PyPI schema; the project is the directory each package's files are in
+pypi_downloads_schema = pa.schema(
+    [
+        ("date", pa.date32()),
+        ("version", pa.string()),
+        ("system", pa.string()),
+        ("country_code", pa.string()),
+        ("count", pa.int64()),
+    ]
+)
+
+# schema registry, one schema per raw table; bump a table's version whenever
+# its schema changes so downstream consumers can tell the change apart
+RAW_SCHEMAS = {
+    GH_COMMITS_TABLE: GH_RAW_SCHEMAS["commits"],
+    GH_ISSUES_TABLE: GH_RAW_SCHEMAS["issues"],
+    GH_PRS_TABLE: GH_RAW_SCHEMAS["pullRequests"],
+    GH_FORKS_TABLE: GH_RAW_SCHEMAS["forks"],
+    GH_STARS_TABLE: GH_RAW_SCHEMAS["stargazers"],
+    GH_WATCHERS_TABLE: GH_RAW_SCHEMAS["watchers"],
+    DOCS_TABLE: docs_schema,
+    ZULIP_MEMBERS_TABLE: zulip_members_schema,
+    ZULIP_MESSAGES_TABLE: zulip_messages_schema,
+    PYPI_DOWNLOADS_TABLE: pypi_downloads_schema,
+}
+RAW_SCHEMA_VERSIONS = {
+    GH_COMMITS_TABLE: 1,
+    GH_ISSUES_TABLE: 1,
+    GH_PRS_TABLE: 1,
+    GH_FORKS_TABLE: 1,
+    GH_STARS_TABLE: 1,
+    GH_WATCHERS_TABLE: 1,
+    DOCS_TABLE: 1,
+    ZULIP_MEMBERS_TABLE: 1,
+    ZULIP_MESSAGES_TABLE: 1,
+    PYPI_DOWNLOADS_TABLE: 1,
+}
+
+
+# functions
+def raw_schema(table_name: str) -> pa.Schema:
+    """Return the registered schema of a raw table."""
+
+    return RAW_SCHEMAS[table_name]
+
+
+def raw_schema_version(table_name: str) -> int:
+    """Return the registered schema version of a raw table."""
+
+    return RAW_SCHEMA_VERSIONS[table_name]
+
+
+def schema_drift(table_name: str, path: str) -> list:
+    """
+    Compare a raw file against the registered schema of its table.
+
+    Only the cheap part of each file is read: the Parquet footer, the CSV
+    header or the first JSON record. Returns a list of human-readable
+    differences, empty when the file matches.
+    """
+
+    schema = raw_schema(table_name)
+
+    if path.endswith(".parquet"):
+        file_schema = pq.read_schema(path)
+        drift = [
+            f"{name}: expected {schema.field(name).type}, "
+            f"found {file_schema.field(name).type}"
+            for name in schema.names
+            if name in file_schema.names
+            and file_schema.field(name).type != schema.field(name).type
+        ]
+        drift += [
+            f"{name}: missing" for name in schema.names if name not in file_schema.names
+        ]
+        drift += [
+            f"{name}: unexpected"
+            for name in file_schema.names
+            if name not in schema.names
+        ]
+        return drift
+
+    if path.endswith(".csv.gz") or path.endswith(".csv"):
+        header = first_line(path).strip().split(",")
+        if header != schema.names:
+            return [f"header: expected {schema.names}, found {header}"]
+        return []
+
+    # JSON: records only carry the fields they have and ingest keeps more
+    # fields than extract reads, so only declared fields of a different kind
+    # count as drift
+    if path.endswith(".ndjson.zst") or path.endswith(".ndjson"):
+        record = json.loads(first_line(path) or "{}")
+    else:
+        with pa.input_stream(path, compression="detect") as f:
+            records = json.loads(f.read() or "[]")
+        record = records[0] if records else {}
+
+    return [
+        f"{name}: expected {schema.field(name).type}, found {value!r}"
+        for name, value in record.items()
+        if name in schema.names and not json_matches(value, schema.field(name).type)
+    ]
+
+
+def first_line(path: str, chunk_size: int = 64 * 1024) -> str:
+    """Read the first line of a possibly compressed file."""
+
+    line = b""
+    with pa.input_stream(path, compression="detect") as f:
+        while b"\n" not in line:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            line += chunk
+
+    return line.split(b"\n", 1)[0].decode()
+
+
+def json_matches(value, dtype: pa.DataType) -> bool:
+    """Check whether a decoded JSON value fits an Arrow type."""
+
+    if value is None:
+        return True
+    if pa.types.is_boolean(dtype):
+        return isinstance(value, bool)
+    if pa.types.is_integer(dtype):
+        return isinstance(value, int) and not isinstance(value, bool)
+    if pa.types.is_floating(dtype):
+        return isinstance(value, (int, float)) and not isinstance(value, bool)
+    if pa.types.is_string(dtype) or pa.types.is_timestamp(dtype):
+        return isinstance(value, str)
+    if pa.types.is_list(dtype):
+        return isinstance(value, list)
+    if pa.types.is_struct(dtype):
+        return isinstance(value, dict)
+
+    return True
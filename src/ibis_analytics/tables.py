@@ -1,8 +1,19 @@
 # imports
+import os
 import ibis
+import logging as log
+import functools
+import threading
 
 from ibis_analytics.config import (
     PYPI_PACKAGES,
+    PYPI_CLICKHOUSE,
+    PYPI_SOURCE_TABLE,
+    PYPI_DOWNLOADS_TABLE,
+    GH_STARS_DAILY_TABLE,
+    DOCS_DAILY_TABLE,
+    PYPI_DOWNLOADS_DAILY_TABLE,
+    ROLLUPS,
     GH_PRS_TABLE,
     GH_FORKS_TABLE,
     GH_STARS_TABLE,
@@ -12,38 +23,317 @@ from ibis_analytics.config import (
     DOCS_TABLE,
     ZULIP_MEMBERS_TABLE,
     ZULIP_MESSAGES_TABLE,
+    TABLE_PARTITIONS,
+    DASHBOARD_CACHE,
+    DASHBOARD_DATABASE,
+    DASHBOARD_MEMORY_LIMIT,
+    DASHBOARD_COLUMNS,
 )
-from ibis_analytics.catalog import Catalog
+from ibis_analytics.catalog import Catalog, projection_id
+from ibis_analytics.results import ResultCache
+from ibis_analytics.etl.transform import rollup
 
+# connect to catalog
+catalog = Catalog()
 
-# connect to PyPI data in the ClickHouse Cloud playground
-host = "clickpy-clickhouse.clickhouse.com"
-port = 443
-user = "play"
-database = "pypi"
+# results of queries to ClickHouse, shared by every session on the machine
+result_cache = ResultCache()
 
-ch_con = ibis.clickhouse.connect(
-    host=host,
-    port=port,
-    user=user,
-    database=database,
-)
 
-# connect to catalog
-catalog = Catalog()
+# classes
+class Lazy:
+    """
+    Handle to a connection or table that is only created when first used.
+
+    Attribute access and indexing create the object with `create` once and
+    forward to it, so the handle can be used in its place. `prefetch` does
+    the part of the work that is safe to run in a background thread.
+    """
+
+    def __init__(self, create, prefetch=None, table_name=None):
+        self._create = create
+        self._prefetch = prefetch
+        self._table_name = table_name
+        self._value = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Create the object, or return the one already created."""
+
+        with self._lock:
+            if self._value is None:
+                self._value = self._create()
+
+        return self._value
+
+    def prefetch(self):
+        """Do the background-safe part of creating the object."""
+
+        if self._prefetch is not None and self._value is None:
+            self._prefetch()
+
+    def __getattr__(self, name):
+        # only reached for names the handle itself doesn't have
+        if name.startswith("_"):
+            raise AttributeError(name)
+
+        return getattr(self.load(), name)
+
+    def __getitem__(self, key):
+        return self.load()[key]
+
+    def __repr__(self):
+        return repr(self.load())
+
+
+# functions
+@functools.cache
+def manifest() -> dict:
+    """Read the statistics the ETL recorded for each table, once per process."""
+
+    return catalog.manifest()
+
+
+@functools.cache
+def dashboard_database():
+    """Open the persistent dashboard database, None when not using one."""
+
+    if DASHBOARD_CACHE != "database":
+        return None
+
+    path = os.path.expanduser(DASHBOARD_DATABASE)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    config = {"memory_limit": DASHBOARD_MEMORY_LIMIT} if DASHBOARD_MEMORY_LIMIT else {}
+
+    # only one process can open the database for writing
+    try:
+        return ibis.duckdb.connect(path, **config)
+    except Exception as e:
+        log.warning(f"cannot open {path}, keeping tables in memory: {e}")
+        return None
+
+
+@functools.cache
+def persisted_tables(con) -> set:
+    # list the database once per process, restarts only look tables up
+    return set(con.list_tables())
+
+
+def current_version(table_name: str) -> int:
+    # the manifest has every table's version without reading its log
+    version = manifest().get(table_name, {}).get("version")
+    if version is None:
+        version = catalog.version(table_name)
+
+    return version
+
+
+def persisted_name(table_name: str, version: int) -> str:
+    name = f"{table_name}__v{version}"
+    if table_name in DASHBOARD_COLUMNS:
+        name = f"{name}__{projection_id(DASHBOARD_COLUMNS[table_name])}"
+
+    return name
+
+
+def dashboard_view(t: ibis.Table, table_name: str) -> ibis.Table:
+    """Select the columns of a table that the dashboard reads."""
+
+    if table_name not in DASHBOARD_COLUMNS:
+        return t
+
+    return t.select(*DASHBOARD_COLUMNS[table_name])
+
+
+def persisted_table(con, table_name: str) -> ibis.Table:
+    """
+    Read a catalog table from its copy in the persistent database.
+
+    Copies are named after the lake version and columns they were
+    materialized from, so a restart reuses the copy until the ETL writes a
+    new version, or the dashboard reads other columns, which replaces it.
+    """
+
+    version = current_version(table_name)
+    persisted = persisted_tables(con)
+    name = persisted_name(table_name, version)
+    if name not in persisted:
+        t = catalog.table(table_name, con=con, version=version)
+        con.create_table(name, dashboard_view(t, table_name))
+        # reading the lake registers a view the copy doesn't need
+        con.drop_view(t.get_name())
+        for old in [t for t in persisted if t.startswith(f"{table_name}__v")]:
+            con.drop_table(old)
+            persisted.discard(old)
+        persisted.add(name)
+
+    return con.table(name)
+
+
+def source_table(table_name: str) -> ibis.Table:
+    """Read the columns of a catalog table the dashboard uses."""
+
+    if DASHBOARD_CACHE == "snapshot":
+        return catalog.snapshot(
+            table_name,
+            current_version(table_name),
+            columns=DASHBOARD_COLUMNS.get(table_name),
+        ).alias(table_name)
+
+    con = dashboard_database()
+    if con is not None:
+        return persisted_table(con, table_name).alias(table_name)
+
+    t = dashboard_view(catalog.table(table_name), table_name)
+
+    # partitioned tables stay lazy so repo and date filters only read the
+    # matching files; the rest are small enough to cache in memory
+    if table_name not in TABLE_PARTITIONS:
+        t = t.cache()
+
+    return t.alias(table_name)
+
+
+def prefetch_source_table(table_name: str):
+    # mirroring cloud files and exporting snapshots can run in the
+    # background; DuckDB connections can't be shared across threads, so
+    # reading into DuckDB waits for first use
+    if DASHBOARD_CACHE == "snapshot":
+        catalog.export_snapshot(
+            table_name,
+            current_version(table_name),
+            columns=DASHBOARD_COLUMNS.get(table_name),
+        )
+    else:
+        catalog.prefetch(table_name)
+
+
+def lazy_source_table(table_name: str) -> Lazy:
+    return Lazy(
+        lambda: source_table(table_name),
+        prefetch=lambda: prefetch_source_table(table_name),
+        table_name=table_name,
+    )
+
+
+def lazy_rollup(rollup_name: str, handle: Lazy) -> Lazy:
+    """
+    Handle to a daily rollup of the table behind another handle.
+
+    Rollups the ETL hasn't built yet are computed from the table instead.
+    """
+
+    table = lazy_source_table(rollup_name)
+    _, *spec = ROLLUPS[rollup_name]
+
+    def create():
+        if rollup_name in manifest():
+            return table.load()
+
+        return rollup(handle.load(), *spec)
+
+    def prefetch():
+        (table if rollup_name in manifest() else handle).prefetch()
+
+    return Lazy(create, prefetch=prefetch, table_name=rollup_name)
+
+
+def downloads_table() -> ibis.Table:
+    # downloads come from the lake once ingested, else from ClickHouse
+    if PYPI_DOWNLOADS_TABLE in manifest():
+        return source_table(PYPI_DOWNLOADS_TABLE)
+
+    return ch_con.table(PYPI_SOURCE_TABLE).filter(ibis._["project"].isin(PYPI_PACKAGES))
+
+
+def prefetch_downloads_table():
+    # the ClickHouse client is separate from DuckDB, so it can connect early
+    if PYPI_DOWNLOADS_TABLE in manifest():
+        prefetch_source_table(PYPI_DOWNLOADS_TABLE)
+    else:
+        ch_con.load()
+
+
+def cached(t: ibis.Table) -> ibis.Table:
+    """
+    Run a query of a remote table through the result cache.
+
+    Returns the result as an in-memory table, so repeated queries with the
+    same SQL are answered locally until the cached result expires. Queries
+    of local tables are returned as they are.
+    """
+
+    if ibis.get_backend(t).name == "duckdb":
+        return t
+
+    return ibis.memtable(result_cache.fetch(t))
+
+
+def warm_up(handles: list = None):
+    """
+    Prefetch table handles in a background thread.
+
+    Meant to run once the first page has rendered, so tables not shown yet
+    are ready by the time they are opened without delaying the first page.
+    """
+
+    handles = handles or HANDLES
+
+    # tables already materialized for the current lake version need no
+    # files; the database is only used from this thread
+    con = dashboard_database()
+    persisted = persisted_tables(con) if con is not None else set()
+
+    def prefetch():
+        for handle in handles:
+            try:
+                # the manifest is read here rather than while serving a page
+                name = handle._table_name
+                if name is not None and persisted:
+                    version = manifest().get(name, {}).get("version")
+                    if persisted_name(name, version) in persisted:
+                        continue
+                handle.prefetch()
+            except Exception as e:
+                log.warning(f"warm up failed: {e}")
+
+    threading.Thread(target=prefetch, daemon=True).start()
+
 
 # define source tables
-pulls_t = catalog.table(GH_PRS_TABLE).cache().alias(GH_PRS_TABLE)
-stars_t = catalog.table(GH_STARS_TABLE).cache().alias(GH_STARS_TABLE)
-forks_t = catalog.table(GH_FORKS_TABLE).cache().alias(GH_FORKS_TABLE)
-issues_t = catalog.table(GH_ISSUES_TABLE).cache().alias(GH_ISSUES_TABLE)
-commits_t = catalog.table(GH_COMMITS_TABLE).cache().alias(GH_COMMITS_TABLE)
-watchers_t = catalog.table(GH_WATCHERS_TABLE).cache().alias(GH_WATCHERS_TABLE)
-downloads_t = ch_con.table(
-    "pypi_downloads_per_day_by_version_by_system_by_country"
-).filter(ibis._["project"].isin(PYPI_PACKAGES))
-docs_t = catalog.table(DOCS_TABLE).cache().alias(DOCS_TABLE)
-zulip_members_t = catalog.table(ZULIP_MEMBERS_TABLE).cache().alias(ZULIP_MEMBERS_TABLE)
-zulip_messages_t = (
-    catalog.table(ZULIP_MESSAGES_TABLE).cache().alias(ZULIP_MESSAGES_TABLE)
+ch_con = Lazy(lambda: ibis.clickhouse.connect(**PYPI_CLICKHOUSE))
+pulls_t = lazy_source_table(GH_PRS_TABLE)
+stars_t = lazy_source_table(GH_STARS_TABLE)
+forks_t = lazy_source_table(GH_FORKS_TABLE)
+issues_t = lazy_source_table(GH_ISSUES_TABLE)
+commits_t = lazy_source_table(GH_COMMITS_TABLE)
+watchers_t = lazy_source_table(GH_WATCHERS_TABLE)
+downloads_t = Lazy(
+    downloads_table,
+    prefetch=prefetch_downloads_table,
+    table_name=PYPI_DOWNLOADS_TABLE,
 )
+docs_t = lazy_source_table(DOCS_TABLE)
+zulip_members_t = lazy_source_table(ZULIP_MEMBERS_TABLE)
+zulip_messages_t = lazy_source_table(ZULIP_MESSAGES_TABLE)
+
+# define daily rollups
+stars_daily_t = lazy_rollup(GH_STARS_DAILY_TABLE, stars_t)
+docs_daily_t = lazy_rollup(DOCS_DAILY_TABLE, docs_t)
+downloads_daily_t = lazy_rollup(PYPI_DOWNLOADS_DAILY_TABLE, downloads_t)
+
+HANDLES = [
+    stars_daily_t,
+    docs_daily_t,
+    downloads_daily_t,
+    stars_t,
+    pulls_t,
+    issues_t,
+    forks_t,
+    commits_t,
+    watchers_t,
+    downloads_t,
+    docs_t,
+    zulip_messages_t,
+    zulip_members_t,
+]
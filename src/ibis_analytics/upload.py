@@ -0,0 +1,170 @@
+# imports
+import os
+import uuid
+import shutil
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from ibis_analytics.cache import DiskCache, mirror_delta_table
+from ibis_analytics.config import CLOUD_UPLOAD_CONCURRENCY, CLOUD_COMMIT_RETRIES
+
+
+# functions
+def list_files(path: str) -> dict:
+    """List the files under a local directory with their sizes and mtimes."""
+
+    files = {}
+    for root, _, names in os.walk(path):
+        for name in names:
+            local_path = os.path.join(root, name)
+            stat = os.stat(local_path)
+            files[os.path.relpath(local_path, path)] = (stat.st_size, stat.st_mtime_ns)
+
+    return files
+
+
+def stage_delta_table(fs, table_path: str, cache=None, data=False) -> str:
+    """
+    Copy a remote Delta table's log into a local staging directory.
+
+    The log, and the current data files when `data` is set, are mirrored
+    through the disk cache and hard-linked into the staging directory, so a
+    local write on top of it commits the next version of the remote table.
+    """
+
+    cache = cache or DiskCache(fs)
+    local_path, version = mirror_delta_table(fs, table_path, cache=cache, data=data)
+
+    # stage next to the cache so linking doesn't copy
+    staging_path = os.path.join(cache.cache_dir, "_staging", uuid.uuid4().hex)
+    if version is None:
+        os.makedirs(staging_path)
+    else:
+        shutil.copytree(local_path, staging_path, copy_function=link_or_copy)
+
+    return staging_path
+
+
+def link_or_copy(src: str, dst: str):
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def upload_files(fs, files: list, concurrency: int = CLOUD_UPLOAD_CONCURRENCY):
+    """
+    Upload (local path, remote path) pairs, at most `concurrency` at a time.
+
+    Returns the remote paths uploaded. If any upload fails, the ones that
+    already landed are deleted before raising.
+    """
+
+    uploaded = []
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        futures = {
+            executor.submit(fs.put_file, local_path, remote_path): remote_path
+            for local_path, remote_path in files
+        }
+        errors = []
+        for future in as_completed(futures):
+            try:
+                future.result()
+                uploaded.append(futures[future])
+            except Exception as e:
+                errors.append(e)
+
+    if errors:
+        for remote_path in uploaded:
+            fs.rm_file(remote_path)
+        raise errors[0]
+
+    return uploaded
+
+
+def write_remote_delta(
+    fs,
+    table_path: str,
+    write,
+    data: bool = False,
+    concurrency: int = CLOUD_UPLOAD_CONCURRENCY,
+    cache=None,
+    retries: int = CLOUD_COMMIT_RETRIES,
+) -> int:
+    """
+    Write to a remote Delta table, returning the new version.
+
+    `write` writes to a local Delta table path and returns its version; it
+    runs against a staging copy of the remote table's log, plus its data
+    when `data` is set. The new data files are then uploaded concurrently
+    and, once every one has landed, the new commit file. Readers only see a
+    version once its commit file exists, so a failed or interrupted write
+    never exposes partial data.
+
+    The commit file is only created if no other writer created it first.
+    When one did, the write is staged again on top of their version and
+    retried, up to `retries` times.
+    """
+
+    table_path = fs._strip_protocol(table_path)
+
+    for _ in range(retries + 1):
+        version = commit_remote_delta(fs, table_path, write, data, concurrency, cache)
+        if version is not None:
+            return version
+
+    raise RuntimeError(
+        f"{table_path} was committed concurrently {retries + 1} times, giving up"
+    )
+
+
+def commit_remote_delta(fs, table_path, write, data, concurrency, cache):
+    """Stage, write and commit one version, None if another writer won it."""
+
+    staging_path = stage_delta_table(fs, table_path, cache=cache, data=data)
+
+    try:
+        before = list_files(staging_path)
+        version = write(staging_path)
+        changed = [
+            path
+            for path, stat in list_files(staging_path).items()
+            if before.get(path) != stat
+        ]
+
+        commit = os.path.join("_delta_log", f"{version:020}.json")
+        data_files = [path for path in changed if not path.startswith("_delta_log")]
+        log_files = sorted(
+            (path for path in changed if path.startswith("_delta_log")),
+            # checkpoints go after their commit and before the pointer to them
+            key=lambda path: (path != commit, path.endswith("_last_checkpoint")),
+        )
+
+        def remote(path):
+            return f"{table_path}/{path.replace(os.sep, '/')}"
+
+        uploaded = upload_files(
+            fs,
+            [(os.path.join(staging_path, path), remote(path)) for path in data_files],
+            concurrency=concurrency,
+        )
+
+        # the commit flips readers to the new version; creating it only if
+        # it doesn't exist makes it atomic against other writers, whose
+        # version stays intact when they win
+        try:
+            fs.put_file(
+                os.path.join(staging_path, commit), remote(commit), mode="create"
+            )
+        except FileExistsError:
+            for remote_path in uploaded:
+                fs.rm_file(remote_path)
+            return None
+
+        for path in log_files:
+            if path != commit:
+                fs.put_file(os.path.join(staging_path, path), remote(path))
+    finally:
+        shutil.rmtree(staging_path, ignore_errors=True)
+
+    return version
@@ -0,0 +1,49 @@
+# imports
+import ibis
+
+import pyarrow as pa
+
+from datetime import date, timedelta
+
+from ibis_analytics.bench import bench_storage, timestamp_column
+from ibis_analytics.config import GH_STARS_DAILY_TABLE, GH_STARS_TABLE
+
+
+# classes
+class FakeCatalog:
+    """Serve one in-memory table in place of the lake."""
+
+    def __init__(self, data: pa.Table):
+        self.data = data
+
+    def table(self, table_name):
+        return ibis.memtable(self.data)
+
+
+# tests
+def test_timestamp_column_covers_rollups():
+    assert timestamp_column(GH_STARS_TABLE) == "starred_at"
+    assert timestamp_column(GH_STARS_DAILY_TABLE) == "starred_at"
+    assert timestamp_column("unknown") is None
+
+
+def test_bench_storage_runs_on_a_rollup():
+    data = pa.table(
+        {
+            "starred_at": [date(2024, 1, 1) + timedelta(days=i) for i in range(60)],
+            "repo_name": ["ibis", "ibis-ml"] * 30,
+            "company": ["x"] * 60,
+            "stars": list(range(60)),
+        }
+    )
+
+    results = bench_storage(
+        FakeCatalog(data),
+        GH_STARS_DAILY_TABLE,
+        layouts=["current", "zstd-sorted"],
+        repeat=1,
+    )
+
+    assert list(results) == ["current", "zstd-sorted"]
+    assert all(result["size"] > 0 for result in results.values())
+    assert {"total_28d", "daily_all"} <= set(results["current"])
@@ -0,0 +1,51 @@
+# imports
+import json
+import fsspec
+
+from ibis_analytics.cache import DiskCache
+
+
+# functions
+def memory_fs(tmp_path):
+    """Create an in-memory filesystem with two remote objects."""
+
+    fs = fsspec.filesystem("memory")
+    root = f"/{tmp_path.name}"
+    fs.pipe(f"{root}/a", b"a")
+    fs.pipe(f"{root}/b", b"bb")
+
+    return fs, root
+
+
+# tests
+def test_concurrent_saves_keep_every_entry(tmp_path):
+    fs, root = memory_fs(tmp_path)
+    cache_dir = str(tmp_path / "cache")
+
+    # two caches opened before either saves, like two dashboard workers
+    first, second = DiskCache(fs, cache_dir), DiskCache(fs, cache_dir)
+    first.get(f"{root}/a")
+    second.get(f"{root}/b")
+    first.save()
+    second.save()
+
+    with open(first.index_path) as f:
+        assert sorted(json.load(f)) == [f"{root}/a", f"{root}/b"]
+    assert not list((tmp_path / "cache").rglob("*.tmp"))
+
+
+def test_evicted_entries_leave_the_saved_index(tmp_path):
+    fs, root = memory_fs(tmp_path)
+    cache_dir = str(tmp_path / "cache")
+
+    cache = DiskCache(fs, cache_dir)
+    cache.get(f"{root}/a")
+    cache.get(f"{root}/b")
+    cache.save()
+
+    cache = DiskCache(fs, cache_dir, max_bytes=1)
+    cache.evict()
+    cache.save()
+
+    with open(cache.index_path) as f:
+        assert json.load(f) == {}
@@ -0,0 +1,150 @@
+# imports
+import os
+import ibis
+import fsspec
+import pytest
+
+import pyarrow as pa
+
+from deltalake import DeltaTable
+
+from ibis_analytics import catalog
+from ibis_analytics.catalog import write_delta
+from ibis_analytics.config import DATA_DIR, DEFAULT_TABLE_LAYOUT, ZULIP_MEMBERS_TABLE
+from ibis_analytics.etl.run import write_manifest
+
+
+# fixtures
+@pytest.fixture
+def lake(tmp_path, monkeypatch):
+    """Write lake tables and snapshots locally, under a temporary directory."""
+
+    # lake tables are written relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(catalog, "CLOUD_STORAGE", False)
+    monkeypatch.setattr(catalog, "SNAPSHOT_DIR", str(tmp_path / "snapshots"))
+
+    return tmp_path
+
+
+# functions
+def write(table_name: str, start: int) -> int:
+    """Overwrite a lake table with two rows, returning its new version."""
+
+    t = ibis.memtable(pa.table({"x": [start, start + 1], "y": ["a", "b"]}))
+
+    # the default layout, since the rows aren't the table's own columns
+    return catalog.write_table(t, table_name, layout=DEFAULT_TABLE_LAYOUT)
+
+
+def snapshots(lake) -> list:
+    """List the snapshot files, by name."""
+
+    return sorted(os.listdir(lake / "snapshots"))
+
+
+# tests
+def test_export_snapshot_keeps_other_projections_and_versions(lake):
+    v0 = write("t", 0)
+    all_v0 = catalog.export_snapshot("t", v0)
+    x_v0 = catalog.export_snapshot("t", v0, ["x"])
+    y_v0 = catalog.export_snapshot("t", v0, ["y"])
+
+    v1 = write("t", 10)
+    x_v1 = catalog.export_snapshot("t", v1, ["x"])
+
+    # only the older version of the exported projection goes
+    assert snapshots(lake) == sorted(
+        os.path.basename(path) for path in [all_v0, y_v0, x_v1]
+    )
+    assert not os.path.exists(x_v0)
+
+    # a worker still on the older version keeps its snapshot
+    catalog.export_snapshot("t", v0, ["y"])
+    assert os.path.exists(y_v0)
+
+
+def test_manifest_leaves_out_tables_never_loaded(lake):
+    write(ZULIP_MEMBERS_TABLE, 0)
+    write_manifest(catalog.Catalog())
+
+    assert list(catalog.Catalog().manifest()) == [ZULIP_MEMBERS_TABLE]
+    assert catalog.Catalog().manifest()[ZULIP_MEMBERS_TABLE]["num_rows"] == 2
+    # checking for the other tables doesn't create them
+    assert sorted(os.listdir(lake / DATA_DIR)) == [
+        "_catalog",
+        catalog.delta_table_filename(ZULIP_MEMBERS_TABLE),
+    ]
+
+
+def test_cloud_reads_only_fetch_the_files_a_query_touches(tmp_path, monkeypatch):
+    # a remote table in an in-memory bucket, read through an empty disk cache
+    fs = fsspec.filesystem("memory")
+    monkeypatch.setattr(catalog, "CLOUD_STORAGE", True)
+    monkeypatch.setattr(catalog, "CLOUD_BUCKET", tmp_path.name)
+    monkeypatch.setattr(catalog, "cloud_filesystem", lambda: fs)
+    monkeypatch.setenv("HOME", str(tmp_path))
+
+    repos = ["ibis", "ibis-ml", "ibis-analytics"]
+    t = ibis.memtable(pa.table({"repo_name": repos, "x": [1, 2, 3]}))
+    local_uri = str(tmp_path / "t.delta")
+    write_delta(t, local_uri, partition_by=["repo_name"], layout=DEFAULT_TABLE_LAYOUT)
+    fs.put(
+        local_uri, f"/{tmp_path.name}/{catalog.delta_table_path('t')}", recursive=True
+    )
+
+    opened = []
+    open_file = fs._open
+
+    def counting_open(path, *args, **kwargs):
+        opened.append(path)
+        return open_file(path, *args, **kwargs)
+
+    monkeypatch.setattr(fs, "_open", counting_open)
+
+    t = catalog.read_table("t", con=ibis.duckdb.connect())
+    assert t.schema() == ibis.schema({"repo_name": "string", "x": "int64"})
+
+    ibis_ml = t.filter(t.repo_name == "ibis-ml").to_pyarrow()
+    assert ibis_ml["x"].to_pylist() == [2]
+
+    # only the log is mirrored, and of the data files only the selected one
+    # is read, plus the first listed for its schema
+    assert list(tmp_path.glob(".cache/**/_delta_log/*.json"))
+    assert not list(tmp_path.glob(".cache/**/*.parquet"))
+    data_files = {path for path in opened if path.endswith(".parquet")}
+    assert any("repo_name=ibis-ml" in path for path in data_files)
+    assert len(data_files) <= 2
+
+
+def test_merge_upserts_on_the_merge_columns(lake):
+    write("t", 0)
+    t = ibis.memtable(pa.table({"x": [1, 2], "y": ["B", "c"]}))
+    catalog.write_table(
+        t, "t", mode="merge", merge_on=["x"], layout=DEFAULT_TABLE_LAYOUT
+    )
+
+    rows = catalog.read_table("t", con=ibis.duckdb.connect()).order_by("x")
+    assert rows.to_pyarrow().to_pydict() == {"x": [0, 1, 2], "y": ["a", "B", "c"]}
+
+
+def test_maintain_table_compacts_and_vacuums(lake, monkeypatch):
+    monkeypatch.setattr(catalog, "TABLE_RETENTION_HOURS", 0)
+
+    write("t", 0)
+    for start in range(2, 10, 2):
+        t = ibis.memtable(pa.table({"x": [start, start + 1], "y": ["a", "b"]}))
+        catalog.write_table(t, "t", mode="append", layout=DEFAULT_TABLE_LAYOUT)
+    table_uri = catalog.delta_table_uri("t")
+    before = set(DeltaTable(table_uri).files())
+
+    result = catalog.maintain_table("t", compact=True)
+
+    # the small files are merged, and vacuumed once no version needs them
+    after = set(DeltaTable(table_uri).files())
+    assert len(after) < len(before)
+    assert set(result["vacuumed"]) == before
+    assert all(not os.path.exists(os.path.join(table_uri, path)) for path in before)
+
+    rows = catalog.read_table("t", con=ibis.duckdb.connect()).order_by("x")
+    assert rows["x"].to_pyarrow().to_pylist() == list(range(10))
@@ -0,0 +1,67 @@
+# imports
+import os
+import pytest
+
+from ibis_analytics.config import (
+    ROLLUPS,
+    NATURAL_KEYS,
+    GH_STARS_TABLE,
+    GH_STARS_DAILY_TABLE,
+)
+from ibis_analytics.etl.extract import raw_data_glob
+from ibis_analytics.etl.fingerprint import fingerprint
+
+
+# fixtures
+@pytest.fixture
+def raw_file(tmp_path, monkeypatch):
+    """Write one raw stars file under a temporary directory, returning its path."""
+
+    # raw data is read relative to the working directory
+    monkeypatch.chdir(tmp_path)
+
+    path = raw_data_glob(GH_STARS_TABLE).replace("*", "x")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write("stars")
+
+    return path
+
+
+# tests
+def test_fingerprint_is_stable(raw_file):
+    assert fingerprint(GH_STARS_TABLE) == fingerprint(GH_STARS_TABLE)
+
+
+def test_fingerprint_changes_with_the_natural_keys(raw_file, monkeypatch):
+    before = fingerprint(GH_STARS_TABLE)
+    monkeypatch.setitem(NATURAL_KEYS, GH_STARS_TABLE, ["repo_name", "login"])
+
+    assert fingerprint(GH_STARS_TABLE) != before
+
+
+def test_fingerprint_changes_with_a_rollup(raw_file, monkeypatch):
+    before = fingerprint(GH_STARS_TABLE)
+    table, column, groups, count, summed = ROLLUPS[GH_STARS_DAILY_TABLE]
+    monkeypatch.setitem(
+        ROLLUPS, GH_STARS_DAILY_TABLE, (table, column, groups[:1], count, summed)
+    )
+
+    assert fingerprint(GH_STARS_TABLE) != before
+
+
+def test_fingerprint_changes_with_the_raw_files(raw_file):
+    before = fingerprint(GH_STARS_TABLE)
+
+    # a rewritten file
+    with open(raw_file, "a") as f:
+        f.write(" and more stars")
+    rewritten = fingerprint(GH_STARS_TABLE)
+    assert rewritten != before
+
+    # a new file
+    with open(
+        os.path.join(os.path.dirname(raw_file), "stargazers.y.parquet"), "w"
+    ) as f:
+        f.write("stars")
+    assert fingerprint(GH_STARS_TABLE) != rewritten
@@ -0,0 +1,320 @@
+# imports
+import os
+import glob
+import ibis
+import pytest
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from types import SimpleNamespace
+from datetime import date, datetime, timedelta
+
+from ibis_analytics.config import (
+    DATA_DIR,
+    RAW_DATA_DIR,
+    RAW_DATA_GH_DIR,
+    RAW_DATA_PYPI_DIR,
+    RAW_DATA_ZULIP_DIR,
+    PYPI_SOURCE_TABLE,
+)
+from ibis_analytics.ingest import run
+from ibis_analytics.ingest.state import read_state, state_path
+
+
+# classes
+class FakeResponse:
+    """A GraphQL response without rate-limit headers."""
+
+    def __init__(self, status_code: int, json_data: dict = None):
+        self.status_code = status_code
+        self.json_data = json_data
+        self.headers = {}
+        self.text = "" if json_data else "bad gateway"
+
+    def json(self):
+        if self.json_data is None:
+            raise run.json.JSONDecodeError("not JSON", "", 0)
+
+        return self.json_data
+
+
+class FakeGitHub:
+    """
+    Serve stargazers newest first, two per page, and no other records.
+
+    `failures` maps a page's cursor to the number of 502 responses served
+    for it before it succeeds.
+    """
+
+    def __init__(self, stars: list, failures: dict = None):
+        self.stars = stars
+        self.failures = dict(failures or {})
+        self.cursors = []
+
+    # stands in for the httpx.AsyncClient class and instance
+    def __call__(self, **kwargs):
+        return self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return None
+
+    async def post(self, url, json):
+        query_name = QUERY_NAMES[json["query"]]
+        if query_name != "stargazers":
+            return FakeResponse(200, page(query_name, [], None))
+
+        cursor = json["variables"].get("cursor") or "0"
+        self.cursors.append(cursor)
+        if self.failures.get(cursor, 0) > 0:
+            self.failures[cursor] -= 1
+            return FakeResponse(502)
+
+        start = int(cursor)
+        edges = [
+            {
+                "starredAt": starred_at.isoformat() + "Z",
+                "node": {"id": f"U{starred_at:%m%d}", "login": f"{starred_at:%m%d}"},
+            }
+            for starred_at in self.stars[start : start + 2]
+        ]
+        end = start + 2
+        return FakeResponse(
+            200, page(query_name, edges, str(end) if end < len(self.stars) else None)
+        )
+
+
+class FakeZulip:
+    """Serve 250 messages in pages of 100, failing the page at `fail_at`."""
+
+    def __init__(self, fail_at=None, **kwargs):
+        self.fail_at = fail_at
+        self.pages = 0
+
+    def get_members(self):
+        return {"result": "success", "members": []}
+
+    def get_messages(self, request):
+        self.pages += 1
+        if self.pages == self.fail_at:
+            return {"result": "error", "msg": "flaky"}
+
+        anchor = 250 if request["anchor"] == "newest" else request["anchor"]
+        ids = range(max(anchor - 100, 0), anchor)
+        return {"result": "success", "messages": [{"id": i} for i in ids]}
+
+
+# constants
+QUERY_NAMES = {
+    run.issues_query: "issues",
+    run.pulls_query: "pullRequests",
+    run.commits_query: "commits",
+    run.forks_query: "forks",
+    run.stargazers_query: "stargazers",
+    run.watchers_query: "watchers",
+}
+
+
+# fixtures
+@pytest.fixture
+def github(tmp_path, monkeypatch):
+    """Ingest GitHub data from a fake API into a temporary directory."""
+
+    # raw data is written relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("GITHUB_TOKEN", "token")
+    # retry without waiting, and checkpoint every other page
+    monkeypatch.setattr(run, "GH_BACKOFF_BASE", 0)
+    monkeypatch.setattr(run, "GH_CHECKPOINT_PAGES", 2)
+
+    def ingest(api: FakeGitHub, **kwargs):
+        monkeypatch.setattr(run.httpx, "AsyncClient", api)
+        run.ingest_gh(["ibis-project/ibis"], **kwargs)
+
+    return ingest
+
+
+# functions
+def page(query_name: str, edges: list, cursor) -> dict:
+    """Build a GraphQL response body holding one page of a connection."""
+
+    connection = {
+        "edges": edges,
+        "pageInfo": {"endCursor": cursor, "hasNextPage": cursor is not None},
+    }
+    if query_name == "commits":
+        connection = {"defaultBranchRef": {"target": {"history": connection}}}
+    else:
+        connection = {query_name: connection}
+
+    return {"data": {"repository": connection}}
+
+
+def days(start: datetime, n: int) -> list:
+    """Return `n` star times a day apart, newest first, ending at `start`."""
+
+    return [start - timedelta(days=i) for i in range(n)]
+
+
+def at(monkeypatch, when: datetime):
+    """Start the next ingest run at `when`, which sets its run id."""
+
+    class clock(datetime):
+        @classmethod
+        def utcnow(cls):
+            return when
+
+    monkeypatch.setattr(run, "datetime", clock)
+
+
+def gh_dir() -> str:
+    return os.path.join(DATA_DIR, RAW_DATA_DIR, RAW_DATA_GH_DIR, "repo_name=ibis")
+
+
+def stargazers(run_id: str = "*") -> list:
+    """Read the logins of the raw stargazers a run wrote, in file order."""
+
+    paths = sorted(glob.glob(os.path.join(gh_dir(), f"stargazers.{run_id}.*.parquet")))
+
+    return [
+        login for path in paths for login in pq.read_table(path)["login"].to_pylist()
+    ]
+
+
+def zulip_files() -> list:
+    """List the raw Zulip files."""
+
+    return sorted(os.listdir(os.path.join(DATA_DIR, RAW_DATA_DIR, RAW_DATA_ZULIP_DIR)))
+
+
+# tests
+def test_gh_resume_continues_after_the_last_checkpoint(github):
+    stars = days(datetime(2024, 1, 10), 10)
+
+    # the fourth page fails for good, after the second page was checkpointed
+    api = FakeGitHub(stars, failures={"6": run.GH_MAX_RETRIES + 1})
+    github(api)
+    checkpoint = read_state(state_path(gh_dir(), "stargazers"))["checkpoint"]
+    assert (checkpoint["page"], checkpoint["cursor"]) == (2, "4")
+    assert stargazers() == ["0110", "0109", "0108", "0107"]
+
+    # the resumed run only fetches the pages after the checkpoint
+    api = FakeGitHub(stars)
+    github(api, resume=True)
+    assert api.cursors == ["4", "6", "8"]
+
+    # every star lands once, in the interrupted run's segments
+    assert stargazers(checkpoint["run_id"]) == [f"{ts:%m%d}" for ts in stars]
+    state = read_state(state_path(gh_dir(), "stargazers"))
+    assert "checkpoint" not in state
+    assert state["watermarks"]["starredAt"] == "2024-01-10T00:00:00Z"
+
+
+def test_gh_stops_at_the_high_water_mark(github, monkeypatch):
+    stars = days(datetime(2024, 1, 10), 10)
+    at(monkeypatch, datetime(2024, 1, 10))
+    github(FakeGitHub(stars))
+
+    # two new stars since the last run
+    at(monkeypatch, datetime(2024, 1, 12))
+    api = FakeGitHub(days(datetime(2024, 1, 12), 2) + stars)
+    github(api)
+
+    # records at the mark are kept, and the stream stops at the first page
+    # reaching below it
+    assert api.cursors == ["0", "2"]
+    assert stargazers("20240112T000000") == ["0112", "0111", "0110"]
+    assert len(stargazers()) == 13
+
+
+def test_gh_retries_failed_pages(github):
+    stars = days(datetime(2024, 1, 10), 4)
+    api = FakeGitHub(stars, failures={"0": 1, "2": 2})
+    github(api)
+
+    assert api.cursors == ["0", "0", "2", "2", "2"]
+    assert stargazers() == [f"{ts:%m%d}" for ts in stars]
+
+
+def test_pypi_continues_from_the_last_stored_date(tmp_path, monkeypatch):
+    # raw data is written relative to the working directory
+    monkeypatch.chdir(tmp_path)
+
+    # a local DuckDB table stands in for the ClickHouse source
+    con = ibis.duckdb.connect()
+    # the ClickHouse backend may not be installed, so it is replaced whole
+    clickhouse = SimpleNamespace(connect=lambda **kwargs: con)
+    monkeypatch.setattr(run, "ibis", SimpleNamespace(_=ibis._, clickhouse=clickhouse))
+
+    def downloads(first: date, n: int) -> pa.Table:
+        return pa.table(
+            {
+                "date": [first + timedelta(days=i) for i in range(n)],
+                "project": ["ibis-framework"] * n,
+                "version": ["9.0.0"] * n,
+                "system": ["Linux"] * n,
+                "country_code": ["US"] * n,
+                "count": [1] * n,
+            }
+        )
+
+    output_dir = os.path.join(
+        DATA_DIR, RAW_DATA_DIR, RAW_DATA_PYPI_DIR, "project=ibis-framework"
+    )
+    con.create_table(PYPI_SOURCE_TABLE, downloads(date(2024, 1, 1), 10))
+    run.ingest_pypi(["ibis-framework"], jobs=1)
+
+    assert sorted(os.listdir(output_dir)) == [
+        "_state",
+        "week=2024-01-01.parquet",
+        "week=2024-01-08.parquet",
+    ]
+    assert read_state(state_path(output_dir, "downloads")) == {
+        "last_date": "2024-01-10"
+    }
+
+    # a week removed after the first run stays removed: later runs start
+    # from the week of the last stored date
+    os.remove(os.path.join(output_dir, "week=2024-01-01.parquet"))
+    con.insert(PYPI_SOURCE_TABLE, downloads(date(2024, 1, 11), 10))
+    run.ingest_pypi(["ibis-framework"], jobs=1)
+
+    assert sorted(os.listdir(output_dir)) == [
+        "_state",
+        "week=2024-01-08.parquet",
+        "week=2024-01-15.parquet",
+    ]
+    week = pq.read_table(os.path.join(output_dir, "week=2024-01-08.parquet"))
+    assert week.num_rows == 7
+    assert read_state(state_path(output_dir, "downloads")) == {
+        "last_date": "2024-01-20"
+    }
+
+
+def test_zulip_keeps_earlier_runs_after_a_failed_page(tmp_path, monkeypatch):
+    # raw data is written relative to the working directory
+    monkeypatch.chdir(tmp_path)
+
+    at(monkeypatch, datetime(2024, 1, 1))
+    monkeypatch.setattr(run.zulip, "Client", lambda **kwargs: FakeZulip())
+    run.ingest_zulip("https://zulip.example.com")
+    complete = zulip_files()
+
+    at(monkeypatch, datetime(2024, 2, 1))
+    monkeypatch.setattr(run.zulip, "Client", lambda **kwargs: FakeZulip(fail_at=2))
+    run.ingest_zulip("https://zulip.example.com")
+
+    assert zulip_files() == complete
+
+    # a complete run replaces the earlier ones
+    at(monkeypatch, datetime(2024, 3, 1))
+    monkeypatch.setattr(run.zulip, "Client", lambda **kwargs: FakeZulip())
+    run.ingest_zulip("https://zulip.example.com")
+
+    assert zulip_files() == [
+        "members.json",
+        "messages.20240301T000000.000001.ndjson.zst",
+    ]
@@ -0,0 +1,79 @@
+# imports
+import ibis
+import pytest
+
+import pyarrow as pa
+
+from datetime import date, datetime, timedelta
+
+from ibis_analytics import catalog, metrics
+from ibis_analytics.config import (
+    ROLLUPS,
+    GH_STARS_TABLE,
+    GH_STARS_DAILY_TABLE,
+    DEFAULT_TABLE_LAYOUT,
+)
+from ibis_analytics.etl.transform import rollup
+
+
+# functions
+def stars(n: int) -> pa.Table:
+    """Generate stars every 7 hours, over two repos."""
+
+    return pa.table(
+        {
+            "starred_at": [
+                datetime(2024, 1, 1) + timedelta(hours=7 * i) for i in range(n)
+            ],
+            "repo_name": ["ibis", "ibis-ml"] * (n // 2),
+            "company": ["a", "b", "c", "d"] * (n // 4),
+        }
+    )
+
+
+# tests
+@pytest.mark.parametrize(
+    "start_date, end_date",
+    [
+        # edges inside months, a whole month, and a single day
+        (date(2024, 1, 10), date(2024, 2, 20)),
+        (date(2024, 2, 1), date(2024, 2, 29)),
+        (date(2024, 3, 5), date(2024, 3, 5)),
+    ],
+)
+def test_rollup_totals_match_the_raw_table(tmp_path, monkeypatch, start_date, end_date):
+    # lake tables are written relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(catalog, "CLOUD_STORAGE", False)
+
+    catalog.write_table(
+        ibis.memtable(stars(400)), GH_STARS_TABLE, layout=DEFAULT_TABLE_LAYOUT
+    )
+    months = catalog.table_manifest(GH_STARS_TABLE)["repos"]["ibis"]["months"]
+
+    con = ibis.duckdb.connect()
+    raw = catalog.read_table(GH_STARS_TABLE, con=con)
+    raw = raw.filter(raw["repo_name"] == "ibis")
+    daily = rollup(raw, *ROLLUPS[GH_STARS_DAILY_TABLE][1:])
+
+    raw_total = metrics.total_in_range(
+        metrics.in_range(raw, "starred_at", start_date, end_date),
+        months,
+        start_date,
+        end_date,
+    )
+    daily_total = (
+        metrics.in_range(daily, "starred_at", start_date, end_date)["stars"]
+        .sum()
+        .to_pyarrow()
+        .as_py()
+    )
+    # every star on the days of the range, end day included
+    rows = stars(400).to_pylist()
+    expected = sum(
+        start_date <= row["starred_at"].date() <= end_date
+        for row in rows
+        if row["repo_name"] == "ibis"
+    )
+
+    assert raw_total == daily_total == expected
@@ -0,0 +1,64 @@
+# imports
+import time
+import asyncio
+
+from ibis_analytics.ingest.rate_limit import RateLimiter
+
+
+# classes
+class FakeResponse:
+    """A GitHub response carrying only rate-limit headers."""
+
+    def __init__(self, remaining: int, reset_at: float, status_code: int = 200):
+        self.status_code = status_code
+        self.text = ""
+        self.headers = {
+            "x-ratelimit-remaining": str(remaining),
+            "x-ratelimit-reset": str(reset_at),
+        }
+
+
+# tests
+def test_waits_are_not_held_behind_a_sleeping_stream():
+    async def scenario():
+        limiter = RateLimiter(reserve=100)
+        limiter.update(FakeResponse(50, time.time() + 30))
+
+        # one stream sleeps until the window resets
+        sleeper = asyncio.create_task(limiter.wait())
+        await asyncio.sleep(0.01)
+        assert not sleeper.done()
+
+        # another stream's response shows the budget was refilled
+        limiter.update(FakeResponse(5000, time.time() + 3600))
+        start = time.perf_counter()
+        await asyncio.wait_for(limiter.wait(), timeout=1)
+        elapsed = time.perf_counter() - start
+
+        sleeper.cancel()
+        return elapsed
+
+    assert asyncio.run(scenario()) < 0.5
+
+
+def test_budget_of_an_elapsed_window_is_ignored():
+    limiter = RateLimiter(reserve=100)
+    limiter.update(FakeResponse(50, time.time() - 5))
+
+    assert limiter.delay() == 0
+
+
+def test_budget_follows_the_newest_window():
+    limiter = RateLimiter(reserve=100)
+    old_window, new_window = time.time() + 10, time.time() + 3600
+
+    limiter.update(FakeResponse(50, old_window))
+    limiter.update(FakeResponse(4000, new_window))
+    # a late response from the old window doesn't bring its budget back
+    limiter.update(FakeResponse(40, old_window))
+
+    assert (limiter.remaining, limiter.reset_at) == (4000, new_window)
+    assert limiter.delay() == 0
+
+    limiter.update(FakeResponse(3000, new_window))
+    assert limiter.remaining == 3000
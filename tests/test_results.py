@@ -0,0 +1,96 @@
+# imports
+import os
+import ibis
+import time
+
+from ibis_analytics.results import ResultCache
+
+
+# functions
+def duckdb_table(rows: int = 3) -> ibis.Table:
+    """Create a local DuckDB table to stand in for a remote source."""
+
+    con = ibis.duckdb.connect()
+    con.raw_sql(f"create table t as select range as x from range({rows})")
+
+    return con.table("t")
+
+
+def insert(t: ibis.Table, x: int):
+    """Change the source after a result is cached."""
+
+    ibis.get_backend(t).raw_sql(f"insert into t values ({x})")
+
+
+def age(cache: ResultCache, t: ibis.Table, seconds: float):
+    """Make a cached result look fetched and last used `seconds` ago."""
+
+    path = cache.path(cache.key(t))
+    then = time.time() - seconds
+    os.utime(path, (then, then))
+
+
+# tests
+def test_fetch_reuses_cached_result(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    t = duckdb_table()
+
+    assert cache.fetch(t)["x"].to_pylist() == [0, 1, 2]
+    insert(t, 3)
+
+    # the same query is answered from disk, not the changed source
+    assert cache.fetch(t)["x"].to_pylist() == [0, 1, 2]
+    assert len(list(tmp_path.glob("*.arrow"))) == 1
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_key_is_stable_and_distinguishes_queries(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    t = duckdb_table()
+
+    # rebuilding the same expression, even on another connection, hits the cache
+    assert cache.key(t.filter(t.x > 0)) == cache.key(t.filter(t.x > 0))
+    assert cache.key(t) == cache.key(duckdb_table())
+    assert cache.key(t.filter(t.x > 0)) != cache.key(t.filter(t.x > 1))
+
+
+def test_expired_result_is_fetched_again(tmp_path):
+    cache = ResultCache(str(tmp_path), ttl=60)
+    t = duckdb_table()
+
+    cache.fetch(t)
+    insert(t, 3)
+    age(cache, t, 120)
+
+    assert cache.fetch(t)["x"].to_pylist() == [0, 1, 2, 3]
+
+
+def test_evict_removes_least_recently_used(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    t = duckdb_table()
+    old, used, new = t.filter(t.x == 0), t.filter(t.x == 1), t.filter(t.x == 2)
+
+    for query, seconds in [(used, 30), (old, 20), (new, 10)]:
+        cache.fetch(query)
+        age(cache, query, seconds)
+    # reading the oldest result refreshes its last use
+    cache.fetch(used)
+
+    # room for two results: the one used longest ago goes
+    cache.max_bytes = 2 * os.path.getsize(cache.path(cache.key(old)))
+    cache.evict()
+
+    assert not os.path.exists(cache.path(cache.key(old)))
+    assert os.path.exists(cache.path(cache.key(used)))
+    assert os.path.exists(cache.path(cache.key(new)))
+
+
+def test_evict_removes_expired_results(tmp_path):
+    cache = ResultCache(str(tmp_path), ttl=60)
+    t = duckdb_table()
+
+    cache.fetch(t)
+    age(cache, t, 120)
+    cache.evict()
+
+    assert not list(tmp_path.glob("*.arrow"))
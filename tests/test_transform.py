@@ -0,0 +1,51 @@
+# imports
+import os
+import ibis
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from datetime import datetime
+
+from ibis_analytics.config import DATA_DIR, RAW_DATA_DIR, RAW_DATA_GH_DIR
+from ibis_analytics.schemas import GH_RAW_SCHEMAS
+from ibis_analytics.etl import extract, transform
+
+
+# functions
+def write_stars(run_id: str, company: str):
+    """Write one run's raw stargazers of a repo, all from `company`."""
+
+    output_dir = os.path.join(DATA_DIR, RAW_DATA_DIR, RAW_DATA_GH_DIR, "repo_name=ibis")
+    os.makedirs(output_dir, exist_ok=True)
+
+    rows = [
+        {
+            "starredAt": datetime(2024, 1, 1, i),
+            "id": f"U{i}",
+            "login": f"user{i}",
+            "company": company,
+        }
+        for i in range(5)
+    ]
+    pq.write_table(
+        pa.Table.from_pylist(rows, schema=GH_RAW_SCHEMAS["stargazers"]),
+        os.path.join(output_dir, f"stargazers.{run_id}.000001.parquet"),
+    )
+
+
+# tests
+def test_preprocess_keeps_latest_ingested_record(tmp_path, monkeypatch):
+    # raw data is read relative to the working directory
+    monkeypatch.chdir(tmp_path)
+
+    # every run sees the same stargazers; the later run has their new company
+    write_stars("20240301T000000", "new")
+    write_stars("20240101T000000", "old")
+
+    con = ibis.duckdb.connect()
+    t = transform.gh_stars(extract.gh_stars(con)).to_pyarrow()
+
+    assert t.num_rows == 5
+    assert set(t["company"].to_pylist()) == {"new"}
+    assert extract.SOURCE_FILE not in t.column_names
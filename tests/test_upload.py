@@ -0,0 +1,83 @@
+# imports
+import ibis
+import fsspec
+import pytest
+
+import pyarrow as pa
+
+from deltalake import DeltaTable
+
+from ibis_analytics.cache import DiskCache, mirror_delta_table
+from ibis_analytics.upload import write_remote_delta
+from ibis_analytics.catalog import write_delta
+
+
+# functions
+def records(start: int, n: int) -> ibis.Table:
+    return ibis.memtable(pa.table({"x": list(range(start, start + n))}))
+
+
+def read_remote(fs, table_path, cache_dir) -> list:
+    """Read a remote table's current values through a fresh disk cache."""
+
+    local_path, _ = mirror_delta_table(
+        fs, table_path, cache=DiskCache(fs, str(cache_dir))
+    )
+
+    return sorted(DeltaTable(local_path).to_pyarrow_table()["x"].to_pylist())
+
+
+# tests
+def test_conflicting_commit_retries_on_the_new_version(tmp_path):
+    fs = fsspec.filesystem("memory")
+    table_path = f"/{tmp_path.name}/t.delta"
+    cache = DiskCache(fs, str(tmp_path / "cache"))
+
+    write_remote_delta(
+        fs, table_path, lambda uri: write_delta(records(0, 2), uri), cache=cache
+    )
+
+    # another writer commits the next version while this one is staged
+    raced = []
+
+    def append(uri):
+        if not raced:
+            raced.append(
+                write_remote_delta(
+                    fs,
+                    table_path,
+                    lambda uri: write_delta(records(10, 2), uri, mode="append"),
+                    cache=DiskCache(fs, str(tmp_path / "other")),
+                )
+            )
+        return write_delta(records(20, 2), uri, mode="append")
+
+    version = write_remote_delta(fs, table_path, append, cache=cache)
+
+    assert raced == [1]
+    assert version == 2
+    assert read_remote(fs, table_path, tmp_path / "read") == [0, 1, 10, 11, 20, 21]
+
+
+def test_commit_gives_up_after_retries(tmp_path):
+    fs = fsspec.filesystem("memory")
+    table_path = f"/{tmp_path.name}/t.delta"
+    cache = DiskCache(fs, str(tmp_path / "cache"))
+
+    write_remote_delta(
+        fs, table_path, lambda uri: write_delta(records(0, 2), uri), cache=cache
+    )
+    files = set(fs.find(table_path))
+
+    # every version is taken by the time it is committed
+    def append(uri):
+        version = write_delta(records(10, 2), uri, mode="append")
+        fs.pipe(f"{table_path}/_delta_log/{version:020}.json", b"{}")
+        files.add(f"{table_path}/_delta_log/{version:020}.json")
+        return version
+
+    with pytest.raises(RuntimeError, match="committed concurrently"):
+        write_remote_delta(fs, table_path, append, cache=cache, retries=1)
+
+    # the data files of the failed attempts are removed
+    assert set(fs.find(table_path)) == files